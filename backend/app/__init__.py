@@ -1,12 +1,20 @@
+import asyncio
 from contextlib import asynccontextmanager
 import os
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
 
-from .database import engine, async_session, Base
-from sqlalchemy import select
-from .models import Company
+from .database import engine, replica_engine, async_session, monitor_replica_lag
+from .auth import run_denylist_sync
+from .instrumentation import TimingMiddleware, instrument_engine
+from .migrations import check_schema_version
+from .ratelimit import RateLimitMiddleware
+from .compression import CompressionMiddleware
+from .static import AssetFiles, STATIC_DIR
+from . import metrics, watchdog
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from .routers import (
     companies,
     categories,
@@ -20,25 +28,30 @@ from .routers import (
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # migrações rodam uma vez via upgrade_db.py antes dos workers; aqui só
+    # conferimos a versão (com AUTO_MIGRATE=true, num worker único, aplica as pendentes)
     try:
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-
-        async with async_session() as session:
-            # Seed companies if not exist
-            result = await session.execute(select(Company))
-            if not result.scalars().first():
-                companies = [
-                    Company(name="3 Corações"),
-                    Company(name="Itambé"),
-                    Company(name="DPA"),
-                ]
-                session.add_all(companies)
-                await session.commit()
+        await check_schema_version(engine)
     except Exception as e:
         print(f"AVISO: Erro ao inicializar banco de dados: {e}")
         print("O servidor continuará rodando para servir o frontend, mas a API pode estar instável.")
-    yield
+
+    metrics.instrument_pool(engine)
+    lag_monitor = asyncio.create_task(metrics.monitor_event_loop_lag())
+    denylist_sync = asyncio.create_task(run_denylist_sync(async_session))
+    replica_monitor = asyncio.create_task(monitor_replica_lag()) if replica_engine is not None else None
+    watchdog.start()
+    print(f"Worker {os.getpid()} pronto em {(time.perf_counter() - started) * 1000:.0f} ms")
+    try:
+        yield
+    finally:
+        watchdog.stop()
+        if replica_monitor is not None:
+            replica_monitor.cancel()
+        denylist_sync.cancel()
+        lag_monitor.cancel()
+        metrics.mark_process_dead()
 
 
 def create_app() -> FastAPI:
@@ -46,6 +59,9 @@ def create_app() -> FastAPI:
 
     cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
 
+    # token bucket por cliente + concorrência por rota (ver app/ratelimit.py);
+    # fica dentro do CORS para que o navegador consiga ler os 429
+    app.add_middleware(RateLimitMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=cors_origins,
@@ -54,9 +70,30 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    @app.exception_handler(PoolTimeoutError)
+    async def pool_exhausted(request: Request, exc: PoolTimeoutError):
+        # pool saturado: melhor falhar rápido do que empilhar requisições
+        metrics.POOL_TIMEOUTS.inc()
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Servidor sobrecarregado. Tente novamente em instantes."},
+            headers={"Retry-After": "1"},
+        )
+
+    # Server-Timing + histogramas por rota (ver app/instrumentation.py)
+    instrument_engine(engine)
+    if replica_engine is not None:
+        instrument_engine(replica_engine)
+    # zstd/br/gzip negociado (ver app/compression.py); dentro do TimingMiddleware
+    # para que o tempo e o tamanho medidos sejam os da resposta comprimida
+    app.add_middleware(CompressionMiddleware)
+    app.add_middleware(TimingMiddleware)
+    # detector de código bloqueando o event loop (só com BLOCKING_WATCHDOG/DEBUG)
+    watchdog.install(app)
+
     # Mount Static Files (Assets do Vite)
-    if os.path.exists("static/assets"):
-        app.mount("/assets", StaticFiles(directory="static/assets"), name="assets")
+    if (STATIC_DIR / "assets").is_dir():
+        app.mount("/assets", AssetFiles(STATIC_DIR / "assets"), name="assets")
 
     # include routers
     app.include_router(companies.router, prefix="/api")
@@ -1,22 +1,45 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+import asyncio
+import hashlib
 import os
+import secrets
+import time
+import uuid
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 import bcrypt
-from sqlalchemy import select
+from sqlalchemy import select, update, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .database import get_session
-from .models import User
+from . import metrics
+from .models import User, RefreshToken
 
 SECRET_KEY = os.getenv("SECRET_KEY", "sua_chave_secreta_padrao_desenvolvimento")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60 * 24))
+# access tokens curtos + refresh tokens: a revogação só é consultada no refresh
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+DENYLIST_SYNC_SECONDS = float(os.getenv("DENYLIST_SYNC_SECONDS", 10))
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")  # Senha Mestra (compatibilidade)
 COLLAB_PASSWORD = os.getenv("COLLAB_PASSWORD")  # Senha do colaborador (compatibilidade)
 
+# bcrypt roda num pool de threads próprio (a lib libera o GIL) para não travar o
+# event loop; a fila é limitada e, quando cheia, o login responde 429.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 8))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+# rotas abertas que só variam limites conforme o papel (ver query_guard.py)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
+
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_pending = 0
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -24,6 +47,46 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
 
 
+def hash_password(password: str) -> str:
+    """Gera o hash bcrypt da senha com o custo configurado em BCRYPT_ROUNDS."""
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True quando o hash foi gerado com custo diferente de BCRYPT_ROUNDS."""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+async def _run_in_hash_pool(fn, *args):
+    global _hash_pending
+    if _hash_pending >= PASSWORD_HASH_MAX_PENDING:
+        metrics.PASSWORD_HASH_REJECTED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitos logins simultâneos. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
+    _hash_pending += 1
+    metrics.PASSWORD_HASH_PENDING.inc()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_pending -= 1
+        metrics.PASSWORD_HASH_PENDING.dec()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """``verify_password`` executado no pool de hashing, fora do event loop."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+
 async def get_user_by_username(username: str, session: AsyncSession) -> User | None:
     """Busca um usuário pelo username no banco de dados."""
     result = await session.execute(select(User).where(User.username == username))
@@ -38,38 +101,186 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-async def verify_admin(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Credenciais inválidas",
-        headers={"WWW-Authenticate": "Bearer"},
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def issue_tokens(session: AsyncSession, role: str, user_id: int | None = None,
+                       session_id: str | None = None) -> dict:
+    """Cria um par access/refresh. ``session_id`` é mantido nas rotações."""
+    session_id = session_id or uuid.uuid4().hex
+    refresh_token = secrets.token_urlsafe(32)
+    session.add(RefreshToken(
+        token_hash=hash_refresh_token(refresh_token),
+        session_id=session_id,
+        user_id=user_id,
+        role=role,
+        expires_at=_utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    await session.commit()
+    return {
+        "access_token": create_access_token({"role": role, "sid": session_id, "uid": user_id}),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "role": role,
+    }
+
+
+async def rotate_refresh_token(session: AsyncSession, refresh_token: str) -> dict:
+    """Troca um refresh token válido por um novo par (o antigo fica marcado como usado).
+
+    A rotação não revoga nada: a sessão continua e os access tokens dela
+    seguem válidos. Apresentar um refresh token já usado ou revogado indica
+    vazamento: aí a sessão inteira é revogada e entra na denylist.
+    """
+    invalid = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Sessão expirada. Faça login novamente.")
+    result = await session.execute(
+        select(RefreshToken).where(RefreshToken.token_hash == hash_refresh_token(refresh_token))
     )
-    forbidden_exception = HTTPException(
-        status_code=status.HTTP_403_FORBIDDEN,
-        detail="Acesso negado: Requer privilégios de administrador",
+    stored = result.scalars().first()
+    if stored is None or stored.expires_at <= _utcnow():
+        raise invalid
+    if stored.revoked_at is not None or stored.rotated_at is not None:
+        await revoke_session(session, stored.session_id)
+        raise invalid
+    stored.rotated_at = _utcnow()
+    return await issue_tokens(session, stored.role, stored.user_id, stored.session_id)
+
+
+async def revoke_session(session: AsyncSession, session_id: str) -> None:
+    """Revoga todos os refresh tokens da sessão e bloqueia seus access tokens."""
+    await session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.session_id == session_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=_utcnow())
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        role: str = payload.get("role")
-        if role != "admin":
-            # Retorna 403 se o token for válido mas não for admin
-            raise forbidden_exception
-    except JWTError:
-        raise credentials_exception
-    return True
+    await session.commit()
+    _denylist.add(session_id)
+
+
+# --- Denylist ---
+# sessões revogadas cujos access tokens ainda podem estar dentro da validade.
+# Cada worker mantém a sua cópia em memória e a recarrega do banco só quando a
+# versão (maior revoked_at) muda, sem nenhuma query no caminho da requisição.
+_denylist: set = set()
+_denylist_version: datetime | None = None
+
+
+async def sync_denylist(session: AsyncSession) -> None:
+    # só revoked_at (revoke_session): rotações normais não bloqueiam a sessão
+    global _denylist, _denylist_version
+    version = (await session.execute(select(func.max(RefreshToken.revoked_at)))).scalar()
+    if version is None or version == _denylist_version:
+        return
+    window_start = _utcnow() - timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    result = await session.execute(
+        select(RefreshToken.session_id).where(RefreshToken.revoked_at >= window_start).distinct()
+    )
+    _denylist = set(result.scalars().all())
+    _denylist_version = version
 
 
-async def verify_collaborator(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+async def run_denylist_sync(session_factory, interval: float = DENYLIST_SYNC_SECONDS) -> None:
+    """Sincroniza a denylist periodicamente; roda até ser cancelada."""
+    while True:
+        try:
+            async with session_factory() as session:
+                await sync_denylist(session)
+        except Exception as e:
+            print(f"AVISO: Erro ao sincronizar denylist de sessões: {e}")
+        await asyncio.sleep(interval)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Quem está fazendo a requisição, extraído de um token já verificado."""
+    role: str
+    expires_at: float
+    session_id: str | None = None
+    # NULL nos logins por ADMIN_PASSWORD/COLLAB_PASSWORD (e em tokens antigos)
+    user_id: int | None = None
+
+
+# tokens verificados recentemente: sha256(token) -> Principal (LRU, respeita o exp)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
+_token_cache: "OrderedDict[str, Principal]" = OrderedDict()
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciais inválidas",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_token(token: str) -> Principal:
+    """Verifica o JWT, reaproveitando verificações anteriores do mesmo token.
+
+    A chave do cache é o hash do token (o token em si não fica em memória) e a
+    entrada deixa de valer no ``exp`` do próprio token.
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    now = time.time()
+    principal = _token_cache.get(key)
+    if principal is not None:
+        if principal.expires_at > now:
+            _token_cache.move_to_end(key)
+            metrics.record_cache("token", hit=True)
+            return principal
+        del _token_cache[key]
+    metrics.record_cache("token", hit=False)
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        role: str = payload.get("role")
-        if role not in ("admin", "collab"):
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    principal = Principal(
+        role=payload.get("role"),
+        expires_at=float(payload.get("exp", now)),
+        session_id=payload.get("sid"),
+        user_id=payload.get("uid"),
+    )
+    _token_cache[key] = principal
+    if len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+    return principal
+
+
+async def get_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Dependência única de autenticação.
+
+    O FastAPI guarda o resultado de uma dependência durante a requisição, então
+    o token é verificado uma vez só mesmo que várias dependências o usem.
+    """
+    principal = decode_token(token)
+    if principal.session_id is not None and principal.session_id in _denylist:
+        raise _credentials_exception()
+    return principal
+
+
+async def get_optional_principal(token: str | None = Depends(optional_oauth2_scheme)) -> Principal | None:
+    """Como ``get_principal``, mas ``None`` sem token (um token inválido continua dando 401)."""
+    if token is None:
+        return None
+    return await get_principal(token)
+
+
+async def verify_admin(principal: Principal = Depends(get_principal)):
+    if principal.role != "admin":
+        # Retorna 403 se o token for válido mas não for admin
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso negado: Requer privilégios de administrador",
+        )
+    return True
+
+
+async def verify_collaborator(principal: Principal = Depends(get_principal)):
+    if principal.role not in ("admin", "collab"):
+        raise _credentials_exception()
     return True
@@ -0,0 +1,259 @@
+"""Carga em massa de agendamentos (migração de planilhas, backfill do TMS).
+
+As linhas chegam já separadas por tabela (``schedules``,
+``schedule_categories``, ``lost_plates``, ``schedule_capacities``) e ligadas
+por chaves locais: ``id`` de um agendamento/categoria da carga e
+``schedule_id``/``schedule_category_id`` apontando para elas. Os ids
+definitivos são atribuídos aqui.
+
+No Postgres cada lista vai por ``COPY`` (``copy_records_to_table`` do
+asyncpg) para uma tabela temporária ``bulk_<tabela>`` com as mesmas colunas;
+os ids de agendamentos e categorias são reservados de uma vez com
+``nextval`` numa tabela de mapeamento chave local -> id, e cada tabela
+recebe um ``INSERT ... SELECT`` juntando a staging ao mapeamento do pai.
+
+No SQLite não há COPY nem ganho com staging: os ids saem de ``MAX(id)`` e
+as linhas vão direto para as tabelas por executemany em lotes. Use uma
+conexão de escrita (``async_session``, que abre com BEGIN IMMEDIATE) para
+que nenhum outro escritor pegue os mesmos ids.
+
+Tudo roda na transação de quem chamou: ou a carga entra inteira ou nada
+entra. Com ``replace`` os agendamentos existentes com a mesma empresa, UF e
+data de algum agendamento da carga são apagados antes (recarregar um
+período não duplica). Cargas não passam pelo histórico de alterações
+(``app/history.py``) nem pelas validações do formulário.
+
+``records_to_rows`` converte agendamentos no formato da API
+(``ScheduleImport``) nessas listas; ``import_schedules.py`` é a linha de
+comando e ``generate_data.py`` também carrega por aqui.
+"""
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import Column, Date, MetaData, Table, bindparam, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from .models import CapacityProfile, Category, LostPlate, Schedule, ScheduleCapacity, ScheduleCategory
+from .schemas import ScheduleImport
+
+# (tabela, coluna com a chave local do pai, tabela do pai), na ordem de inserção
+LOAD_ORDER = (
+    (Schedule.__table__, None, None),
+    (ScheduleCategory.__table__, "schedule_id", "schedules"),
+    (LostPlate.__table__, "schedule_category_id", "schedule_categories"),
+    (ScheduleCapacity.__table__, "schedule_id", "schedules"),
+)
+# tabelas com filhos: os ids novos precisam de mapeamento
+MAPPED = ("schedules", "schedule_categories")
+
+# linhas por executemany no SQLite (padrão de ``batch_size``)
+SQLITE_BATCH = 5000
+
+_STAGING = MetaData()
+
+
+def _delete_existing_sql(existing: str) -> List[str]:
+    """DELETEs dos agendamentos selecionados por ``existing`` e dos seus filhos."""
+    return [
+        "DELETE FROM lost_plates WHERE schedule_category_id IN "
+        f"(SELECT id FROM schedule_categories WHERE schedule_id IN ({existing}))",
+        f"DELETE FROM schedule_categories WHERE schedule_id IN ({existing})",
+        f"DELETE FROM schedule_capacities WHERE schedule_id IN ({existing})",
+        f"DELETE FROM schedules WHERE id IN ({existing})",
+    ]
+
+
+def _defaults(table: Table) -> dict:
+    """Valores padrão das colunas (``created_at`` fica com o horário da carga)."""
+    defaults = {}
+    for column in table.columns:
+        default = column.default
+        if default is not None and (default.is_scalar or default.is_callable):
+            defaults[column.name] = default.arg(None) if default.is_callable else default.arg
+    return defaults
+
+
+def _complete(table: Table, rows: Sequence[dict]) -> List[dict]:
+    """Cópias das linhas com todas as colunas de ``table`` (padrões preenchidos)."""
+    defaults = dict.fromkeys(table.columns.keys())
+    defaults.update(_defaults(table))
+    # lost_plates/schedule_capacities podem vir sem chave local: vale a ordem
+    return [{**defaults, "id": position, **row} for position, row in enumerate(rows, 1)]
+
+
+# --- Postgres: COPY + INSERT ... SELECT ---
+def _staging_table(table: Table) -> Table:
+    """``bulk_<tabela>``: mesmas colunas e tipos, sem chaves nem constraints."""
+    name = f"bulk_{table.name}"
+    if name not in _STAGING.tables:
+        Table(
+            name, _STAGING, *[Column(c.name, c.type) for c in table.columns],
+            prefixes=["TEMPORARY"], postgresql_on_commit="DROP",
+        )
+    return _STAGING.tables[name]
+
+
+def _merge_sql(table: Table, parent_column, parent_table) -> str:
+    columns, values, joins = [], [], []
+    for column in table.columns:
+        if column.name == "id":
+            if table.name not in MAPPED:
+                continue  # id da sequence
+            values.append("m.id")
+            joins.append(f"JOIN bulk_ids_{table.name} m ON m.src = b.id")
+        elif column.name == parent_column:
+            values.append("p.id")
+            joins.append(f"JOIN bulk_ids_{parent_table} p ON p.src = b.{parent_column}")
+        else:
+            values.append(f"b.{column.name}")
+        columns.append(column.name)
+    # ORDER BY: ids crescentes na ordem da carga (os filhos são lidos por id)
+    return (
+        f"INSERT INTO {table.name} ({', '.join(columns)}) "
+        f"SELECT {', '.join(values)} FROM bulk_{table.name} b {' '.join(joins)} ORDER BY b.id"
+    )
+
+
+async def _load_copy(conn: AsyncConnection, tables: list, replace: bool) -> Dict[str, int]:
+    driver = (await conn.get_raw_connection()).driver_connection
+    counts = {}
+    # tabelas temporárias ON COMMIT DROP: nada fica para trás nas conexões do pool
+    for (table, _, _), rows in tables:
+        staging = _staging_table(table)
+        await conn.run_sync(staging.create)
+        names = table.columns.keys()
+        records = list(map(itemgetter(*names), _complete(table, rows)))
+        if records:
+            await driver.copy_records_to_table(staging.name, records=records, columns=names)
+        counts[table.name] = len(records)
+    if replace:
+        existing = (
+            "SELECT s.id FROM schedules s JOIN bulk_schedules b "
+            "ON b.company_id = s.company_id AND b.uf = s.uf AND b.schedule_date = s.schedule_date"
+        )
+        for sql in _delete_existing_sql(existing):
+            result = await conn.execute(text(sql))
+        counts["replaced"] = result.rowcount
+    for table in MAPPED:
+        await conn.execute(text(
+            f"CREATE TEMPORARY TABLE bulk_ids_{table} ON COMMIT DROP AS "
+            f"SELECT id AS src, nextval(pg_get_serial_sequence('{table}', 'id')) AS id "
+            f"FROM (SELECT id FROM bulk_{table} ORDER BY id) AS b"
+        ))
+    for (table, parent_column, parent_table), _ in tables:
+        inserted = (await conn.execute(text(_merge_sql(table, parent_column, parent_table)))).rowcount
+        if inserted != counts[table.name]:
+            # filho apontando para uma chave local que não veio na carga
+            raise ValueError(f"{table.name}: {counts[table.name] - inserted} linhas sem pai na carga")
+    return counts
+
+
+# --- SQLite: executemany ---
+async def _load_executemany(conn: AsyncConnection, tables: list, replace: bool, batch_size: int) -> Dict[str, int]:
+    counts = {}
+    if replace:
+        existing = "SELECT id FROM schedules WHERE company_id = :company_id AND uf = :uf AND schedule_date = :schedule_date"
+        keys = list({(r["company_id"], r["uf"], r["schedule_date"]) for r in tables[0][1]})
+        params = [{"company_id": c, "uf": u, "schedule_date": d} for c, u, d in keys]
+        if params:
+            for sql in _delete_existing_sql(existing):
+                result = await conn.execute(text(sql).bindparams(bindparam("schedule_date", type_=Date)), params)
+            counts["replaced"] = result.rowcount
+        else:
+            counts["replaced"] = 0
+
+    new_ids = {}
+    for (table, parent_column, parent_table), rows in tables:
+        if parent_column:
+            parents = new_ids[parent_table]
+            orphans = {row[parent_column] for row in rows} - parents.keys()
+            if orphans:
+                raise ValueError(f"{table.name}: {len(orphans)} chaves de {parent_column} sem pai na carga")
+        if table.name in MAPPED:
+            base = (await conn.execute(select(func.coalesce(func.max(table.c.id), 0)))).scalar()
+            rows = sorted(rows, key=itemgetter("id"))
+            ids = new_ids[table.name] = {row["id"]: n for n, row in enumerate(rows, base + 1)}
+            records = _complete(table, rows)
+            for record in records:
+                record["id"] = ids[record["id"]]
+        else:
+            records = _complete(table, rows)
+            for record in records:
+                del record["id"]
+        if parent_column:
+            for record in records:
+                record[parent_column] = parents[record[parent_column]]
+        for i in range(0, len(records), batch_size):
+            await conn.execute(insert(table), records[i:i + batch_size])
+        counts[table.name] = len(records)
+    return counts
+
+
+async def load_rows(conn: AsyncConnection, schedules: Sequence[dict], categories: Sequence[dict],
+                    lost_plates: Sequence[dict], capacities: Sequence[dict],
+                    replace: bool = False, batch_size: int = SQLITE_BATCH) -> Dict[str, int]:
+    """Carrega as quatro listas na transação de ``conn``; retorna linhas inseridas (e apagadas) por tabela."""
+    tables = list(zip(LOAD_ORDER, (schedules, categories, lost_plates, capacities)))
+    if conn.dialect.name == "postgresql":
+        return await _load_copy(conn, tables, replace)
+    return await _load_executemany(conn, tables, replace, batch_size)
+
+
+async def load_lookups(conn: AsyncConnection) -> Tuple[dict, dict]:
+    """({categoria: id}, {perfil: (id, peso)}) para ``records_to_rows``."""
+    categories = dict((await conn.execute(select(Category.name, Category.id))).all())
+    profiles = {
+        name: (profile_id, weight)
+        for name, profile_id, weight in (await conn.execute(
+            select(CapacityProfile.name, CapacityProfile.id, CapacityProfile.weight)
+        )).all()
+    }
+    return categories, profiles
+
+
+def records_to_rows(records: Iterable[ScheduleImport], category_ids: dict, profiles: dict) -> tuple:
+    """Agendamentos no formato da API -> as quatro listas de ``load_rows``.
+
+    Como no POST /api/schedules: UF em maiúsculas, categorias com count 0
+    ignoradas e peso total = veículos x peso do perfil. Nome de categoria ou
+    perfil desconhecido gera ``KeyError`` com o nome.
+    """
+    schedules, categories, plates, capacities = [], [], [], []
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for record in records:
+        schedule_id = len(schedules) + 1
+        schedules.append({
+            "id": schedule_id,
+            "company_id": record.company_id,
+            "uf": record.uf.upper(),
+            "schedule_date": record.schedule_date,
+            "created_at": record.created_at or now,
+            "updated_at": record.updated_at,
+        })
+        for cat in record.categories:
+            if cat.count <= 0:
+                continue
+            category_id = len(categories) + 1
+            categories.append({
+                "id": category_id,
+                "schedule_id": schedule_id,
+                "category_id": category_ids[cat.category_name],
+                "count": cat.count,
+                "profile_id": profiles[cat.profile_name][0] if cat.profile_name else None,
+            })
+            plates.extend(
+                {"schedule_category_id": category_id, "plate_number": lp.plate_number, "reason": lp.reason}
+                for lp in cat.lost_plates
+            )
+        for items, spot in ((record.capacities, False), (record.capacities_spot, True)):
+            for cap in items:
+                profile_id, weight = profiles[cap.profile_name]
+                capacities.append({
+                    "schedule_id": schedule_id,
+                    "profile_id": profile_id,
+                    "vehicle_count": cap.vehicle_count,
+                    "total_weight_kg": cap.vehicle_count * weight,
+                    "spot": spot,
+                })
+    return schedules, categories, plates, capacities
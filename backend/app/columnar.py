@@ -0,0 +1,125 @@
+"""Formato colunar de ``GET /api/schedules?format=columnar``.
+
+No formato padrão cada agendamento repete as chaves e os nomes de
+categoria/perfil em todos os filhos. Aqui cada tabela vira um objeto de
+colunas (listas paralelas) e os textos repetidos viram índices numa tabela
+de strings::
+
+    {
+      "format": "columnar",
+      "count": 2,
+      "strings": {"uf": [...], "date": [...], "category": [...], "profile": [...]},
+      "schedules": {"id": [...], "company_id": [...], "uf": [0, 0], "schedule_date": [3, 3], ...},
+      "categories": {"offsets": [0, 3, 5], "id": [...], "category_name": [...], "count": [...], "profile_name": [...]},
+      "lost_plates": {"offsets": [0, 0, 2, 2, 2, 2], "plate_number": [...], "reason": [...]},
+      "capacities": {"offsets": [...], "id": [...], "profile_name": [...], "vehicle_count": [...], "total_weight_kg": [...]},
+      "capacities_spot": {...}
+    }
+
+Os filhos do agendamento ``i`` ficam em ``offsets[i]:offsets[i + 1]`` (as
+placas são aninhadas nas categorias do mesmo jeito). Índice ``-1`` numa
+coluna de strings representa ``null``. O frontend decodifica em
+``src/columnarSchedules.js`` para os mesmos objetos de ``ScheduleResponse``.
+"""
+from typing import Dict, List, Optional, Sequence
+
+from .models import Schedule
+from .references import References
+
+
+class StringTable:
+    """Dicionário string -> índice, na ordem da primeira ocorrência."""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+
+    def __call__(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.index)
+        return position
+
+    def values(self) -> List[str]:
+        return list(self.index)
+
+
+def _child_columns(*names: str) -> Dict[str, list]:
+    return {"offsets": [0], **{name: [] for name in names}}
+
+
+def encode_schedules(schedules: Sequence[Schedule], refs: References) -> dict:
+    ufs, dates, category_names, profile_names = StringTable(), StringTable(), StringTable(), StringTable()
+    rows = {
+        name: [] for name in (
+            "id", "company_id", "uf", "schedule_date", "created_at",
+            "total_capacity_kg", "total_capacity_spot_kg", "total_vehicles", "total_vehicles_spot",
+        )
+    }
+    categories = _child_columns("id", "category_name", "count", "profile_name")
+    lost_plates = _child_columns("plate_number", "reason")
+    capacities = _child_columns("id", "profile_name", "vehicle_count", "total_weight_kg")
+    capacities_spot = _child_columns("id", "profile_name", "vehicle_count", "total_weight_kg")
+    active = refs.category_id_set(["Carros em rota", "Reentrega", "Em viagem", "Diária"])
+
+    for schedule in schedules:
+        rows["id"].append(schedule.id)
+        rows["company_id"].append(schedule.company_id)
+        rows["uf"].append(ufs(schedule.uf))
+        rows["schedule_date"].append(dates(schedule.schedule_date.isoformat()))
+        rows["created_at"].append(schedule.created_at.isoformat() if schedule.created_at else None)
+
+        total_vehicles = 0
+        for cat in schedule.categories:
+            categories["id"].append(cat.id)
+            categories["category_name"].append(category_names(refs.category(cat.category_id)))
+            categories["count"].append(cat.count)
+            categories["profile_name"].append(profile_names(refs.profile(cat.profile_id)))
+            if cat.category_id in active:
+                total_vehicles += cat.count
+            for lp in cat.lost_plates:
+                lost_plates["plate_number"].append(lp.plate_number)
+                lost_plates["reason"].append(lp.reason)
+            lost_plates["offsets"].append(len(lost_plates["reason"]))
+        categories["offsets"].append(len(categories["id"]))
+
+        total_capacity = 0
+        for cap in schedule.capacities:
+            capacities["id"].append(cap.id)
+            capacities["profile_name"].append(profile_names(refs.profile(cap.profile_id)))
+            capacities["vehicle_count"].append(cap.vehicle_count)
+            capacities["total_weight_kg"].append(cap.total_weight_kg)
+            total_capacity += cap.total_weight_kg
+        capacities["offsets"].append(len(capacities["id"]))
+
+        total_capacity_spot = total_vehicles_spot = 0
+        for cap in schedule.capacities_spot:
+            capacities_spot["id"].append(cap.id)
+            capacities_spot["profile_name"].append(profile_names(refs.profile(cap.profile_id)))
+            capacities_spot["vehicle_count"].append(cap.vehicle_count)
+            capacities_spot["total_weight_kg"].append(cap.total_weight_kg)
+            total_capacity_spot += cap.total_weight_kg
+            total_vehicles_spot += cap.vehicle_count
+        capacities_spot["offsets"].append(len(capacities_spot["id"]))
+
+        rows["total_capacity_kg"].append(total_capacity)
+        rows["total_capacity_spot_kg"].append(total_capacity_spot)
+        rows["total_vehicles"].append(total_vehicles)
+        rows["total_vehicles_spot"].append(total_vehicles_spot)
+
+    return {
+        "format": "columnar",
+        "count": len(rows["id"]),
+        "strings": {
+            "uf": ufs.values(),
+            "date": dates.values(),
+            "category": category_names.values(),
+            "profile": profile_names.values(),
+        },
+        "schedules": rows,
+        "categories": categories,
+        "lost_plates": lost_plates,
+        "capacities": capacities,
+        "capacities_spot": capacities_spot,
+    }
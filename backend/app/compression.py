@@ -0,0 +1,181 @@
+"""Compressão negociada das respostas (zstd, brotli ou gzip).
+
+A lista de agendamentos e as métricas do dashboard são JSON grandes e
+muito repetitivos (nomes de categoria e perfil em cada item), que encolhem
+para uma fração do tamanho. A codificação é escolhida pelo ``Accept-Encoding``
+na ordem de ``COMPRESSION_ENCODINGS``; respostas menores que
+``COMPRESSION_MIN_SIZE``, já codificadas (assets pré-comprimidos) ou de tipos
+que não comprimem (xlsx, imagens) passam direto.
+
+Respostas em streaming são comprimidas pedaço a pedaço, com flush a cada
+pedaço, para o cliente continuar recebendo dados enquanto são gerados.
+Pedaços a partir de ``COMPRESSION_THREAD_MIN_SIZE`` são comprimidos numa
+thread (as três bibliotecas liberam o GIL): uma exportação grande leva
+dezenas de ms de CPU, que travariam as outras requisições do worker.
+
+zstd requer o pacote ``zstandard`` e brotli o pacote ``brotli``; sem eles a
+codificação correspondente é simplesmente ignorada.
+"""
+import os
+import zlib
+
+import anyio
+
+from . import metrics
+from .static import accepted_encodings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() != "false"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+# preferência do servidor: brotli comprime um pouco melhor a lista de agendamentos
+# (links lentos), zstd gasta ~3x menos CPU; níveis medidos em benchmarks/compression.py
+COMPRESSION_ENCODINGS = [
+    e.strip() for e in os.getenv("COMPRESSION_ENCODINGS", "br,zstd,gzip").split(",") if e.strip()
+]
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 5))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))
+# abaixo disso comprimir leva menos que o custo de passar para uma thread
+COMPRESSION_THREAD_MIN_SIZE = int(os.getenv("COMPRESSION_THREAD_MIN_SIZE", 64 * 1024))
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+class Encoder:
+    """Compressor incremental com a mesma interface para as três codificações."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, last: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._obj.process(data)
+            return out + (self._obj.finish() if last else self._obj.flush())
+        out = self._obj.compress(data)
+        if last:
+            return out + self._obj.flush()
+        if self.encoding == "zstd":
+            return out + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return out + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    async def compress_async(self, data: bytes, last: bool) -> bytes:
+        """``compress`` fora do event loop quando o pedaço é grande."""
+        if len(data) < COMPRESSION_THREAD_MIN_SIZE:
+            return self.compress(data, last)
+        return await anyio.to_thread.run_sync(self.compress, data, last)
+
+
+def available_encodings():
+    for encoding in COMPRESSION_ENCODINGS:
+        if encoding == "zstd" and zstandard is None:
+            continue
+        if encoding == "br" and brotli is None:
+            continue
+        if encoding in ("zstd", "br", "gzip"):
+            yield encoding
+
+
+def negotiate(scope) -> str | None:
+    accepted = accepted_encodings(scope)
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def _compressible(headers) -> bool:
+    content_type = ""
+    for name, value in headers:
+        if name == b"content-encoding":
+            return False
+        if name == b"content-type":
+            content_type = value.decode("latin-1").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """Middleware ASGI puro (o ``GZipMiddleware`` do Starlette só faz gzip)."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # decide só no primeiro pedaço do corpo, quando o tamanho é conhecido
+                start = message
+                if message["status"] < 200 or message["status"] in (204, 304) or not _compressible(message.get("headers", [])):
+                    passthrough = True
+                    await send(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                encoder = Encoder(encoding)
+                headers = [
+                    (name, value) for name, value in start.get("headers", [])
+                    if name not in (b"content-length", b"vary")
+                ]
+                vary = [value for name, value in start.get("headers", []) if name == b"vary"]
+                # AssetFiles já manda Vary: Accept-Encoding
+                if b"accept-encoding" not in (v.strip().lower() for value in vary for v in value.split(b",")):
+                    vary.append(b"Accept-Encoding")
+                headers.append((b"vary", b", ".join(vary)))
+                headers.append((b"content-encoding", encoding.encode()))
+                compressed = await encoder.compress_async(body, last=not more_body)
+                if not more_body:
+                    headers.append((b"content-length", str(len(compressed)).encode()))
+                await send({**start, "headers": headers})
+            else:
+                compressed = await encoder.compress_async(body, last=not more_body)
+            metrics.observe_compression(encoding, len(body), len(compressed))
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,8 +1,19 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 import os
 from pathlib import Path
+import time
+from typing import Annotated, AsyncIterator
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from sqlalchemy.orm import DeclarativeBase, Session
+
+from . import metrics
 
 # try loading .env automatically for local development
 try:
@@ -20,30 +31,333 @@ if not DATABASE_URL:
     print("WARNING: DATABASE_URL not set, falling back to sqlite for local testing")
     DATABASE_URL = "sqlite+aiosqlite:///./local.db"
 
-# choose connection arguments depending on dialect
-connect_args = {}
-if DATABASE_URL.startswith("postgresql") or DATABASE_URL.startswith("postgresql+asyncpg"):
-    connect_args = {
-        "server_settings": {"statement_timeout": "10000"},
+# réplica de leitura opcional para dashboard, listagem e exportação
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+# depois de salvar, o mesmo navegador lê do primário por esta janela
+REPLICA_READ_AFTER_WRITE_SECONDS = float(os.getenv("REPLICA_READ_AFTER_WRITE_SECONDS", 5))
+# acima deste atraso de replicação todas as leituras voltam ao primário
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 30))
+LAST_WRITE_COOKIE = "logisched_last_write"
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# SQLite em produção (filiais pequenas): pragmas aplicados a cada conexão
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_CACHE_SIZE_MB = int(os.getenv("SQLITE_CACHE_SIZE_MB", 64))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", 256))
+# escritas do worker uma de cada vez, na ordem de chegada (ver sqlite_writer)
+SQLITE_WRITE_QUEUE = os.getenv("SQLITE_WRITE_QUEUE", "true").lower() != "false"
+SQLITE_WRITE_QUEUE_TIMEOUT = float(os.getenv("SQLITE_WRITE_QUEUE_TIMEOUT", 10))
+
+
+def connect_args_for(url: str) -> dict:
+    # choose connection arguments depending on dialect
+    if url.startswith("postgresql"):
+        return {"server_settings": {"statement_timeout": "10000"}}
+    return {}
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Pool padrão do engine assíncrono, medindo quanto cada checkout esperou.
+
+    A espera (fila cheia, ou a conexão nova sendo aberta) vai para o
+    histograma ``logisched_db_pool_wait_seconds``; os timeouts também
+    entram, com o tempo até desistir.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.POOL_WAIT.observe(time.perf_counter() - started)
+
+
+def pool_options(url: str) -> dict:
+    """Opções de pool conforme o dialeto e as variáveis DB_*.
+
+    Postgres usa o pool com fila padrão. Cada worker do uvicorn tem o seu, então
+    com ``DB_MAX_CONNECTIONS`` o total é dividido entre os ``WEB_CONCURRENCY``
+    workers (2/3 fixo, 1/3 overflow); ``DB_POOL_SIZE``/``DB_MAX_OVERFLOW``
+    explícitos têm precedência. ``DB_POOL_TIMEOUT`` é quanto uma requisição
+    espera por conexão antes de receber 503.
+
+    SQLite em arquivo mantém ``SQLITE_POOL_SIZE`` conexões abertas: os
+    pragmas, o cache de páginas e o mmap são por conexão e se perderiam a
+    cada requisição. ``:memory:`` usa StaticPool para todos verem o mesmo
+    banco.
+    """
+    if url.startswith("sqlite"):
+        if make_url(url).database in (None, "", ":memory:"):
+            return {"poolclass": StaticPool}
+        return {
+            "poolclass": TimedQueuePool,
+            "pool_size": _env_int("SQLITE_POOL_SIZE", 5),
+            "max_overflow": _env_int("SQLITE_POOL_MAX_OVERFLOW", 10),
+            "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 5)),
+        }
+
+    pool_size, max_overflow = 10, 5
+    max_connections = os.getenv("DB_MAX_CONNECTIONS")
+    if max_connections:
+        workers = max(1, _env_int("WEB_CONCURRENCY", 1))
+        per_worker = max(2, int(max_connections) // workers)
+        pool_size = max(1, per_worker * 2 // 3)
+        max_overflow = per_worker - pool_size
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": _env_int("DB_POOL_SIZE", pool_size),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", max_overflow),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 5)),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 300),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() != "false",
     }
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True,
-    pool_size=20,
-    max_overflow=10,
-    pool_recycle=300,
-    connect_args=connect_args,
+
+def _sqlite_pragmas(dbapi_conn, record):
+    # WAL deixa leituras rodarem durante uma escrita; busy_timeout espera
+    # o lock em vez de falhar com "database is locked". Com WAL,
+    # synchronous=NORMAL só sincroniza o disco nos checkpoints: um commit pode
+    # se perder numa queda de energia, mas o arquivo nunca corrompe.
+    # O driver abriria as transações sozinho (BEGIN adiado até o primeiro
+    # INSERT); desligado aqui, o BEGIN sai de _sqlite_begin.
+    dbapi_conn.isolation_level = None
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    # cache_size negativo é em KiB; mmap_size em bytes
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_MB * 1024}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 2**20}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    # o -wal volta a este tamanho depois de cada checkpoint
+    cursor.execute(f"PRAGMA journal_size_limit={64 * 2**20}")
+    cursor.close()
+
+
+def _sqlite_begin(conn):
+    # Sessões de escrita pegam o lock do arquivo já no BEGIN (ver _writer).
+    # Com BEGIN adiado, duas transações que leram antes de escrever se
+    # bloqueiam na hora de escrever e uma falha na hora, sem esperar o
+    # busy_timeout.
+    options = conn.get_execution_options()
+    if options.get("isolation_level") == "AUTOCOMMIT":
+        return
+    conn.exec_driver_sql("BEGIN IMMEDIATE" if options.get("sqlite_write") else "BEGIN")
+
+
+def make_engine(url: str):
+    new_engine = create_async_engine(
+        url,
+        echo=False,
+        connect_args=connect_args_for(url),
+        **pool_options(url),
+    )
+    if url.startswith("sqlite"):
+        event.listen(new_engine.sync_engine, "connect", _sqlite_pragmas)
+        event.listen(new_engine.sync_engine, "begin", _sqlite_begin)
+    return new_engine
+
+
+def _read_only(async_engine):
+    # no Postgres a transação abre como READ ONLY (o asyncpg passa
+    # readonly=True no BEGIN, sem round-trip extra)
+    if async_engine.dialect.name == "postgresql":
+        return async_engine.execution_options(postgresql_readonly=True)
+    return async_engine
+
+
+def _writer(async_engine):
+    if async_engine.dialect.name == "sqlite":
+        return async_engine.execution_options(sqlite_write=True)
+    return async_engine
+
+
+engine = make_engine(DATABASE_URL)
+replica_engine = make_engine(DATABASE_READ_URL) if DATABASE_READ_URL else None
+
+
+def pool_stats(async_engine=engine) -> dict:
+    """Estado atual do pool deste worker (para diagnóstico)."""
+    pool = async_engine.sync_engine.pool
+    stats = {"class": type(pool).__name__}
+    if hasattr(pool, "checkedout"):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    return stats
+
+
+class WriteSession(Session):
+    """Sessão das requisições de escrita (ver ``get_session``)."""
+
+
+@event.listens_for(WriteSession, "after_commit")
+def _mark_last_write(session):
+    response = session.info.get("response")
+    if response is not None:
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            f"{time.time():.3f}",
+            max_age=int(max(REPLICA_READ_AFTER_WRITE_SECONDS, REPLICA_MAX_LAG_SECONDS)) + 1,
+            httponly=True,
+            samesite="lax",
+        )
+
+
+async_session = async_sessionmaker(
+    _writer(engine), class_=AsyncSession, sync_session_class=WriteSession, expire_on_commit=False
+)
+
+# sessões de leitura nunca são confirmadas
+read_session = async_sessionmaker(
+    _read_only(engine), class_=AsyncSession, expire_on_commit=False, autoflush=False
 )
-async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+replica_session = async_sessionmaker(
+    _read_only(replica_engine), class_=AsyncSession, expire_on_commit=False, autoflush=False
+) if replica_engine is not None else read_session
+
+# atraso da réplica em segundos, atualizado por monitor_replica_lag()
+replica_lag = 0.0
 
 
 class Base(DeclarativeBase):
     pass
 
 
-async def get_session() -> AsyncSession:
-    """Dependency para fornecer sessão do banco de dados."""
+# um escritor por vez no SQLite; asyncio.Lock atende na ordem de chegada
+_sqlite_write_lock = asyncio.Lock()
+
+
+@asynccontextmanager
+async def sqlite_writer():
+    """Fila de escrita do worker quando o banco é SQLite (no-op no Postgres).
+
+    O SQLite aceita um escritor por vez: em vez de várias transações
+    disputando o lock do arquivo (cada uma numa thread do aiosqlite,
+    esperando o busy_timeout), a criação e a edição de agendamentos (o
+    grosso das escritas, ver ``WriteQueueDep``) esperam aqui e entram uma
+    de cada vez. Quem espera mais que ``SQLITE_WRITE_QUEUE_TIMEOUT``
+    recebe 503, como no pool do Postgres. Entre workers (ou scripts rodando
+    ao mesmo tempo) quem ordena é o ``BEGIN IMMEDIATE`` + busy_timeout.
+    """
+    if not (IS_SQLITE and SQLITE_WRITE_QUEUE):
+        yield
+        return
+    started = time.perf_counter()
+    metrics.SQLITE_WRITE_QUEUE.inc()
+    try:
+        await asyncio.wait_for(_sqlite_write_lock.acquire(), SQLITE_WRITE_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor sobrecarregado. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
+    finally:
+        metrics.SQLITE_WRITE_QUEUE.dec()
+    metrics.SQLITE_WRITE_WAIT.observe(time.perf_counter() - started)
+    try:
+        yield
+    finally:
+        _sqlite_write_lock.release()
+
+
+async def get_session(response: Response) -> AsyncIterator[AsyncSession]:
+    """Unidade de trabalho da requisição.
+
+    A conexão só sai do pool no primeiro comando; o endpoint chama
+    ``commit()`` e tudo que não foi confirmado é desfeito ao final. Depois de
+    um commit o navegador recebe ``LAST_WRITE_COOKIE`` para ler os próprios
+    dados do primário enquanto a réplica alcança.
+    """
     async with async_session() as session:
+        if replica_engine is not None:
+            session.info["response"] = response
+        yield session
+
+
+async def write_queue() -> AsyncIterator[None]:
+    """Vez na fila de escrita do SQLite (``sqlite_writer``) até o fim do endpoint.
+
+    Só para endpoints de escrita curtos (criar/editar agendamento); login e
+    CRUD do admin não entram na fila.
+    """
+    async with sqlite_writer():
+        yield
+
+
+async def get_read_session() -> AsyncIterator[AsyncSession]:
+    """Sessão para endpoints que só leem."""
+    async with read_session() as session:
+        yield session
+
+
+def _prefer_primary(request: Request) -> bool:
+    if replica_lag > REPLICA_MAX_LAG_SECONDS:
+        return True
+    try:
+        since_write = time.time() - float(request.cookies[LAST_WRITE_COOKIE])
+    except (KeyError, ValueError):
+        return False
+    return since_write < max(REPLICA_READ_AFTER_WRITE_SECONDS, replica_lag)
+
+
+async def get_replica_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """Sessão para leituras pesadas: usa a réplica quando configurada.
+
+    Volta ao primário logo após um save do próprio navegador (read-your-writes)
+    e enquanto o atraso de replicação passar de ``REPLICA_MAX_LAG_SECONDS``.
+    """
+    target = "replica"
+    factory = replica_session
+    if replica_engine is None or _prefer_primary(request):
+        target = "primary"
+        factory = read_session
+    metrics.DB_READ_ROUTING.labels(target).inc()
+    async with factory() as session:
         yield session
+
+
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+async def monitor_replica_lag(interval: float = 5) -> None:
+    """Atualiza ``replica_lag`` periodicamente; roda até ser cancelada.
+
+    Só o Postgres informa o atraso; se a réplica não responde ela é tratada
+    como atrasada e as leituras vão para o primário.
+    """
+    global replica_lag
+    while True:
+        if replica_engine.dialect.name == "postgresql":
+            try:
+                async with replica_engine.connect() as conn:
+                    replica_lag = float((await conn.execute(_REPLICA_LAG_SQL)).scalar() or 0)
+            except Exception as e:
+                print(f"Réplica de leitura indisponível: {e}")
+                replica_lag = float("inf")
+            metrics.REPLICA_LAG.set(min(replica_lag, 1e6))
+        await asyncio.sleep(interval)
+
+
+# scope="function" devolve a conexão ao pool assim que a resposta é montada,
+# sem esperar o envio ao cliente
+SessionDep = Annotated[AsyncSession, Depends(get_session, scope="function")]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session, scope="function")]
+ReplicaSessionDep = Annotated[AsyncSession, Depends(get_replica_session, scope="function")]
+WriteQueueDep = Annotated[None, Depends(write_queue, scope="function")]
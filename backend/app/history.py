@@ -0,0 +1,123 @@
+"""Histórico de alterações dos agendamentos (tabela ``schedule_history``).
+
+Só recebe INSERTs: cada create/update de agendamento grava uma linha na
+mesma transação da alteração, com quem alterou, quando e um diff compacto
+(JSON em texto) entre o estado anterior e o novo::
+
+    {"uf": ["BAHIA", "CEARÁ"],
+     "categories": {"Reentrega": [[[3, "", []]], [[5, "", []]]]},
+     "capacities": {"Toco": [null, [[10, 70000]]]}}
+
+Cada chave alterada guarda ``[antes, depois]`` (``null`` = não existia).
+Categorias e capacidades são agrupadas por nome (categoria ou perfil), com
+a lista de entradas daquele nome: ``[count, perfil, [[placa, motivo], ...]]``
+nas categorias e ``[veículos, kg]`` nas capacidades. Os nomes são gravados
+como estavam na hora da alteração.
+
+Nada aponta para esta tabela (sem relationship em ``Schedule``, sem FK),
+então as leituras de agendamentos não passam por ela. No Postgres ela é
+particionada por mês de ``changed_at`` (migração 7 e
+``migrations.ensure_monthly_partitions``); por isso é uma ``Table`` do Core
+fora de ``Base.metadata``: o ``create_all`` do baseline a criaria sem
+partições.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+import json
+from typing import List, Optional
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, MetaData, String, Table, Text, insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from .migrations import table_exists
+from .models import User
+from .references import References
+
+HISTORY_METADATA = MetaData()
+
+schedule_history = Table(
+    "schedule_history",
+    HISTORY_METADATA,
+    # no Postgres a chave primária é (id, changed_at), exigência do particionamento
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+    Column("schedule_id", Integer, nullable=False),
+    Column("changed_at", DateTime, nullable=False),
+    Column("action", String(16), nullable=False),
+    Column("user_id", Integer, nullable=True),  # NULL nos logins por senha mestra
+    Column("role", String(16), nullable=True),
+    Column("changes", Text, nullable=False),
+)
+
+
+def snapshot(schedule, refs: References) -> dict:
+    """Estado de um agendamento (modelo ou ``ScheduleRow``) no formato do diff."""
+    categories = defaultdict(list)
+    for cat in schedule.categories:
+        categories[refs.category(cat.category_id)].append(
+            [cat.count, refs.profile(cat.profile_id), [[lp.plate_number, lp.reason] for lp in cat.lost_plates]]
+        )
+    capacities, capacities_spot = defaultdict(list), defaultdict(list)
+    for cap in schedule.all_capacities:
+        (capacities_spot if cap.spot else capacities)[refs.profile(cap.profile_id)].append(
+            [cap.vehicle_count, cap.total_weight_kg]
+        )
+    return {
+        "uf": schedule.uf,
+        "schedule_date": schedule.schedule_date.isoformat(),
+        "categories": dict(categories),
+        "capacities": dict(capacities),
+        "capacities_spot": dict(capacities_spot),
+    }
+
+
+def diff(old: dict, new: dict) -> dict:
+    """Só as chaves que mudaram, como ``[antes, depois]``."""
+    changes = {}
+    for key in ("uf", "schedule_date"):
+        if old.get(key) != new.get(key):
+            changes[key] = [old.get(key), new.get(key)]
+    for key in ("categories", "capacities", "capacities_spot"):
+        before, after = old.get(key, {}), new.get(key, {})
+        changed = {
+            name: [before.get(name), after.get(name)]
+            for name in {**before, **after}
+            if before.get(name) != after.get(name)
+        }
+        if changed:
+            changes[key] = changed
+    return changes
+
+
+async def record(session: AsyncSession, schedule_id: int, action: str, old: dict, new: dict,
+                 user_id: Optional[int], role: Optional[str]) -> None:
+    """Adiciona a entrada na transação da sessão (o commit é de quem chamou)."""
+    await session.execute(insert(schedule_history).values(
+        schedule_id=schedule_id,
+        changed_at=datetime.now(timezone.utc).replace(tzinfo=None),
+        action=action,
+        user_id=user_id,
+        role=role,
+        changes=json.dumps(diff(old, new), ensure_ascii=False, separators=(",", ":")),
+    ))
+
+
+async def load_history(session: AsyncSession, schedule_id: int) -> List[dict]:
+    """Entradas de um agendamento, mais antigas primeiro, com o username de quem alterou."""
+    query = (
+        select(schedule_history, User.username)
+        .outerjoin(User, User.id == schedule_history.c.user_id)
+        .where(schedule_history.c.schedule_id == schedule_id)
+        .order_by(schedule_history.c.changed_at, schedule_history.c.id)
+    )
+    entries = []
+    for row in (await session.execute(query)).mappings():
+        entry = dict(row)
+        entry["changes"] = json.loads(entry["changes"])
+        entries.append(entry)
+    return entries
+
+
+async def clear(conn: AsyncConnection) -> None:
+    """Apaga o histórico quando os agendamentos são recriados (reset_db.py, generate_data.py --reset)."""
+    if await table_exists(conn, schedule_history.name):
+        await conn.execute(schedule_history.delete())
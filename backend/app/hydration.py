@@ -0,0 +1,144 @@
+"""Leitura rápida de agendamentos: uma query, filhos já aninhados em JSON.
+
+O caminho do ORM (``subqueryload``) custa uma query por relacionamento
+(agendamentos, categorias, placas, capacidades) e cria um objeto mapeado e
+uma entrada no identity map para cada linha. Nas rotas só de leitura isso é
+desperdício: aqui cada agendamento vem numa linha só, com subqueries
+correlacionadas que montam os filhos no próprio banco::
+
+    categories = [[id, category_id, count, profile_id, [[plate_number, reason], ...]], ...]
+    capacities = [[id, profile_id, vehicle_count, total_weight_kg, spot], ...]
+
+- Postgres: ``json_agg(json_build_array(...) ORDER BY id)``;
+- SQLite: ``json_group_array(json(...))`` sobre uma subquery ``ORDER BY id``.
+
+Arrays em vez de ``jsonb_build_object``: as chaves não se repetem em cada
+filho e o ``json.loads`` tem menos texto para ler. As linhas viram tuplas
+(``ScheduleRow`` e companhia) com os mesmos atributos dos modelos, então
+``references_for``, ``encode_schedules`` e os montadores de resposta
+funcionam sem alteração. Nada disso entra na sessão: para alterar um
+agendamento continue usando os modelos.
+"""
+from datetime import date, datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import JSON, func, literal_column, select, type_coerce
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import LostPlate, Schedule, ScheduleCapacity, ScheduleCategory
+
+
+class LostPlateRow(NamedTuple):
+    plate_number: str
+    reason: str
+
+
+class CategoryRow(NamedTuple):
+    id: int
+    category_id: int
+    count: int
+    profile_id: Optional[int]
+    lost_plates: List[LostPlateRow]
+
+
+class CapacityRow(NamedTuple):
+    id: int
+    profile_id: int
+    vehicle_count: int
+    total_weight_kg: int
+    spot: bool
+
+
+class ScheduleRow(NamedTuple):
+    id: int
+    company_id: int
+    uf: str
+    schedule_date: date
+    created_at: datetime
+    updated_at: Optional[datetime]
+    categories: List[CategoryRow]
+    all_capacities: List[CapacityRow]
+
+    # mesma interface de Schedule.capacities/capacities_spot
+    @property
+    def capacities(self) -> List[CapacityRow]:
+        return [cap for cap in self.all_capacities if not cap.spot]
+
+    @property
+    def capacities_spot(self) -> List[CapacityRow]:
+        return [cap for cap in self.all_capacities if cap.spot]
+
+
+def _json_list(dialect: str, row, *where, order_by):
+    """Subquery correlacionada que agrega ``row`` (um array JSON por filho) numa lista."""
+    if dialect == "postgresql":
+        aggregated = func.coalesce(
+            func.json_agg(aggregate_order_by(row, order_by)), literal_column("'[]'::json")
+        )
+    else:
+        # json_group_array não aceita ORDER BY antes do SQLite 3.44: agrega uma
+        # subquery já ordenada (correlacionada com o pai mesmo estando no FROM);
+        # json() mantém cada filho como array (e não texto)
+        children = (
+            select(row.label("child")).where(*where).order_by(order_by)
+            .correlate_except(order_by.table).subquery()
+        )
+        # o json() de fora vale para as placas, aninhadas dentro de outro json_array
+        return func.json(select(func.json_group_array(func.json(children.c.child))).scalar_subquery())
+    return select(aggregated).where(*where).scalar_subquery()
+
+
+def schedule_tree_query(dialect: str, *conditions):
+    """SELECT dos agendamentos filtrados por ``conditions`` com os filhos em JSON."""
+    build_array = func.json_build_array if dialect == "postgresql" else func.json_array
+    plates = _json_list(
+        dialect,
+        build_array(LostPlate.plate_number, LostPlate.reason),
+        LostPlate.schedule_category_id == ScheduleCategory.id,
+        order_by=LostPlate.id,
+    )
+    categories = _json_list(
+        dialect,
+        build_array(
+            ScheduleCategory.id, ScheduleCategory.category_id, ScheduleCategory.count,
+            ScheduleCategory.profile_id, plates,
+        ),
+        ScheduleCategory.schedule_id == Schedule.id,
+        order_by=ScheduleCategory.id,
+    )
+    capacities = _json_list(
+        dialect,
+        build_array(
+            ScheduleCapacity.id, ScheduleCapacity.profile_id, ScheduleCapacity.vehicle_count,
+            ScheduleCapacity.total_weight_kg, ScheduleCapacity.spot,
+        ),
+        ScheduleCapacity.schedule_id == Schedule.id,
+        order_by=ScheduleCapacity.id,
+    )
+    # type_coerce(JSON): o driver devolve texto e o SQLAlchemy decodifica em listas
+    return select(
+        Schedule.id, Schedule.company_id, Schedule.uf, Schedule.schedule_date,
+        Schedule.created_at, Schedule.updated_at,
+        type_coerce(categories, JSON), type_coerce(capacities, JSON),
+    ).where(*conditions)
+
+
+def _decode(row) -> ScheduleRow:
+    categories = [
+        CategoryRow(cat_id, category_id, count, profile_id, [LostPlateRow(*lp) for lp in plates])
+        for cat_id, category_id, count, profile_id, plates in row[6]
+    ]
+    # spot chega como 0/1 no SQLite
+    capacities = [CapacityRow(cap_id, profile_id, vehicles, kg, bool(spot)) for cap_id, profile_id, vehicles, kg, spot in row[7]]
+    return ScheduleRow(*row[:6], categories, capacities)
+
+
+async def load_schedules(session: AsyncSession, *conditions, order_by=None) -> List[ScheduleRow]:
+    """Agendamentos filtrados por ``conditions``, mais recentes primeiro, numa única query."""
+    dialect = session.bind.dialect.name
+    query = schedule_tree_query(dialect, *conditions).order_by(
+        Schedule.schedule_date.desc() if order_by is None else order_by
+    )
+    result = await session.execute(query)
+    return [_decode(row) for row in result.all()]
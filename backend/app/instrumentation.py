@@ -0,0 +1,318 @@
+"""Instrumentação por requisição: tempo total, SQL, serialização e tamanho.
+
+Cada requisição HTTP recebe um ``RequestStats`` guardado num ``ContextVar``.
+Os eventos de cursor do SQLAlchemy somam quantidade e duração das queries
+nesse objeto, a ``TimedRoute`` marca o fim do endpoint (o que vem depois é
+serialização/validação do response_model) e o ``TimingMiddleware`` fecha a
+conta: adiciona o header ``Server-Timing``, alimenta os histogramas por rota
+e registra no log as requisições lentas com as queries executadas.
+
+Configuração via ambiente:
+
+- ``REQUEST_TIMING``: ``false`` desliga header/histogramas (padrão ``true``)
+- ``SLOW_REQUEST_MS``: limiar do log de requisições lentas (padrão 1000)
+- ``SLOW_REQUEST_MAX_STATEMENTS``: máximo de queries guardadas por requisição
+- ``QUERY_BUDGET_STRICT``: ``true`` transforma estouro de ``query_budget`` em erro
+  (útil em desenvolvimento/CI; em produção apenas registra no log)
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from . import metrics
+
+logger = logging.getLogger("logisched.slow_requests")
+
+TIMING_ENABLED = os.getenv("REQUEST_TIMING", "true").lower() != "false"
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 1000))
+SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", 50))
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "false").lower() == "true"
+
+# limites superiores (ms) dos buckets do histograma de latência
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+@dataclass
+class RequestStats:
+    started: float = field(default_factory=time.perf_counter)
+    sql_count: int = 0
+    db_time: float = 0.0
+    endpoint_done: Optional[float] = None
+    response_started: Optional[float] = None
+    response_bytes: int = 0
+    statements: List[Tuple[float, str]] = field(default_factory=list)
+    # execuções extras de um mesmo executemany: no SQLite o ORM manda o
+    # INSERT ... RETURNING de uma coleção linha a linha, num único execute()
+    batched_rows: int = 0
+    last_context: Optional[object] = None
+
+    @property
+    def budget_count(self) -> int:
+        """Queries para o ``query_budget``: cada executemany conta uma vez.
+
+        Só linhas de uma mesma chamada são agrupadas; um loop que chama
+        ``execute()`` por linha conta cada uma (é o N+1 que o orçamento pega).
+        """
+        return self.sql_count - self.batched_rows
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Estatísticas da requisição em andamento (``None`` fora de uma requisição)."""
+    return _current.get()
+
+
+@contextmanager
+def count_queries():
+    """Conta as queries executadas dentro do bloco (scripts, benchmarks, testes).
+
+        with count_queries() as stats:
+            await session.execute(...)
+        assert stats.sql_count == 1
+    """
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# --- SQL ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.sql_count += 1
+    stats.db_time += elapsed
+    if executemany and context is not None and context is stats.last_context:
+        stats.batched_rows += 1
+    stats.last_context = context
+    if len(stats.statements) < SLOW_REQUEST_MAX_STATEMENTS:
+        stats.statements.append((elapsed, " ".join(statement.split())[:300]))
+
+
+def instrument_engine(async_engine) -> None:
+    """Registra os eventos de cursor no engine (idempotente)."""
+    sync_engine = async_engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- Rotas ---
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_statements: int):
+    """Declara quantas queries um endpoint pode executar, independente do input.
+
+    Deve ficar abaixo do ``@router.get/post/...``.  O número é verificado pela
+    ``TimedRoute`` ao fim do endpoint: estouros vão para o log e para a métrica
+    ``logisched_query_budget_exceeded_total`` (ou viram erro com
+    ``QUERY_BUDGET_STRICT=true``), o que pega regressões N+1 cedo.
+    """
+    def decorator(endpoint):
+        endpoint.__query_budget__ = max_statements
+        return endpoint
+    return decorator
+
+
+def _check_query_budget(path: str, stats: RequestStats, budget: int) -> None:
+    if stats.budget_count <= budget:
+        return
+    metrics.QUERY_BUDGET_EXCEEDED.labels(path).inc()
+    message = f"{path} executou {stats.budget_count} queries (orçamento: {budget})"
+    if QUERY_BUDGET_STRICT:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class TimedRoute(APIRoute):
+    """APIRoute que marca o instante em que o endpoint retornou.
+
+    O intervalo entre esse instante e o início da resposta é o custo de
+    validação/serialização do response_model pelo FastAPI.  Também aplica o
+    ``query_budget`` declarado no endpoint.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        # include_router recria a rota a partir do endpoint já embrulhado
+        endpoint = getattr(endpoint, "__timed_endpoint__", endpoint)
+        budget = getattr(endpoint, "__query_budget__", None)
+
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kw):
+            stats = _current.get()
+            try:
+                result = await endpoint(*args, **kw)
+            finally:
+                if stats is not None:
+                    stats.endpoint_done = time.perf_counter()
+            if budget is not None and stats is not None:
+                _check_query_budget(path, stats, budget)
+            return result
+
+        timed_endpoint.__timed_endpoint__ = endpoint
+        super().__init__(path, timed_endpoint, **kwargs)
+
+
+# --- Agregação ---
+class RouteHistogram:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.db_ms = 0.0
+        self.ser_ms = 0.0
+        self.sql_count = 0
+        self.response_bytes = 0
+        self.max_ms = 0.0
+
+    def observe(self, total_ms, db_ms, ser_ms, sql_count, response_bytes):
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, total_ms)] += 1
+        self.count += 1
+        self.total_ms += total_ms
+        self.db_ms += db_ms
+        self.ser_ms += ser_ms
+        self.sql_count += sql_count
+        self.response_bytes += response_bytes
+        self.max_ms = max(self.max_ms, total_ms)
+
+    def as_dict(self) -> dict:
+        n = self.count or 1
+        labels = [f"le_{b}" for b in LATENCY_BUCKETS_MS] + ["le_inf"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / n, 2),
+            "max_ms": round(self.max_ms, 2),
+            "avg_db_ms": round(self.db_ms / n, 2),
+            "avg_serialization_ms": round(self.ser_ms / n, 2),
+            "avg_sql_statements": round(self.sql_count / n, 2),
+            "avg_response_bytes": round(self.response_bytes / n),
+            "latency_buckets_ms": dict(zip(labels, self.buckets)),
+        }
+
+
+_histograms: Dict[Tuple[str, str], RouteHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def route_timings() -> List[dict]:
+    """Histogramas agregados deste processo, por método e rota."""
+    with _histograms_lock:
+        return [
+            {"method": method, "route": route, **hist.as_dict()}
+            for (method, route), hist in sorted(_histograms.items())
+        ]
+
+
+def reset_route_timings() -> None:
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def route_template(scope) -> str:
+    """Caminho da rota (com placeholders); ``other`` quando não houve match.
+
+    Nunca usa o path cru para não explodir a cardinalidade das métricas.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "other"
+
+
+# --- Middleware ---
+class TimingMiddleware:
+    """Middleware ASGI puro que mede cada requisição HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TIMING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                stats.response_started = time.perf_counter()
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats).encode("latin-1")))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                stats.response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._record(scope, stats, status_code)
+
+    def _record(self, scope, stats: RequestStats, status_code: int):
+        finished = time.perf_counter()
+        total_ms = (finished - stats.started) * 1000
+        ser_ms = _serialization_ms(stats)
+        route = route_template(scope)
+        key = (scope["method"], route)
+        with _histograms_lock:
+            hist = _histograms.get(key)
+            if hist is None:
+                hist = _histograms[key] = RouteHistogram()
+            hist.observe(total_ms, stats.db_time * 1000, ser_ms, stats.sql_count, stats.response_bytes)
+        metrics.observe_request(
+            scope["method"], route, status_code, total_ms / 1000,
+            stats.db_time, stats.sql_count, stats.response_bytes,
+        )
+
+        if total_ms >= SLOW_REQUEST_MS:
+            statements = "\n".join(f"  [{d * 1000:.1f} ms] {s}" for d, s in stats.statements)
+            logger.warning(
+                "Requisição lenta: %s %s -> %s em %.1f ms (db %.1f ms / %d queries, "
+                "serialização %.1f ms, %d bytes)\n%s",
+                scope["method"], route, status_code, total_ms, stats.db_time * 1000,
+                stats.sql_count, ser_ms, stats.response_bytes, statements,
+            )
+
+
+def _serialization_ms(stats: RequestStats) -> float:
+    if stats.endpoint_done is None or stats.response_started is None:
+        return 0.0
+    return max(0.0, (stats.response_started - stats.endpoint_done) * 1000)
+
+
+def _server_timing(stats: RequestStats) -> str:
+    now = stats.response_started or time.perf_counter()
+    parts = [
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.sql_count} queries"',
+    ]
+    if stats.endpoint_done is not None:
+        handler_ms = (stats.endpoint_done - stats.started - stats.db_time) * 1000
+        parts.append(f"app;dur={max(0.0, handler_ms):.1f}")
+        parts.append(f"ser;dur={_serialization_ms(stats):.1f}")
+    parts.append(f"total;dur={(now - stats.started) * 1000:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,242 @@
+"""Métricas no formato Prometheus (endpoint ``/metrics`` em ``main.py``).
+
+Com vários workers do uvicorn cada processo tem seus próprios contadores;
+para agregá-los defina ``PROMETHEUS_MULTIPROC_DIR`` (diretório vazio e
+gravável, limpo a cada start do container) antes de subir o servidor. Sem a
+variável as métricas são apenas do processo que respondeu ao scrape.
+"""
+import asyncio
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", 0.5))
+
+REQUESTS = Counter(
+    "logisched_http_requests_total",
+    "Requisições HTTP atendidas",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "logisched_http_request_duration_seconds",
+    "Tempo total da requisição",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUEST_DB_TIME = Histogram(
+    "logisched_http_request_db_seconds",
+    "Tempo gasto em SQL por requisição",
+    ["method", "route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_SQL_STATEMENTS = Histogram(
+    "logisched_http_request_sql_statements",
+    "Quantidade de queries por requisição",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 250),
+)
+RESPONSE_SIZE = Histogram(
+    "logisched_http_response_size_bytes",
+    "Tamanho do corpo da resposta",
+    ["method", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+
+QUERY_BUDGET_EXCEEDED = Counter(
+    "logisched_query_budget_exceeded_total",
+    "Requisições que executaram mais queries que o query_budget do endpoint",
+    ["route"],
+)
+
+POOL_SIZE = Gauge("logisched_db_pool_size", "Tamanho configurado do pool", multiprocess_mode="livesum")
+POOL_CHECKED_OUT = Gauge(
+    "logisched_db_pool_checked_out", "Conexões em uso", multiprocess_mode="livesum"
+)
+POOL_OVERFLOW = Gauge(
+    "logisched_db_pool_overflow", "Conexões abertas além do pool_size", multiprocess_mode="livesum"
+)
+POOL_OVERFLOW_CHECKOUTS = Counter(
+    "logisched_db_pool_overflow_checkouts_total",
+    "Checkouts que só foram atendidos com conexões de overflow (pool saturado)",
+)
+DB_READ_ROUTING = Counter(
+    "logisched_db_read_routing_total",
+    "Sessões de leitura pesada por destino (replica ou primary)",
+    ["target"],
+)
+REPLICA_LAG = Gauge(
+    "logisched_db_replica_lag_seconds",
+    "Atraso de replicação da réplica de leitura",
+    multiprocess_mode="livemax",
+)
+POOL_WAIT = Histogram(
+    "logisched_db_pool_wait_seconds",
+    "Espera por uma conexão do pool (inclui abrir uma nova)",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+POOL_TIMEOUTS = Counter(
+    "logisched_db_pool_timeouts_total",
+    "Requisições respondidas com 503 por esperar mais que DB_POOL_TIMEOUT por conexão",
+)
+SQLITE_WRITE_QUEUE = Gauge(
+    "logisched_sqlite_write_queue",
+    "Requisições esperando a vez de escrever no SQLite",
+    multiprocess_mode="livesum",
+)
+SQLITE_WRITE_WAIT = Histogram(
+    "logisched_sqlite_write_wait_seconds",
+    "Espera na fila de escrita do SQLite",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+CACHE_REQUESTS = Counter(
+    "logisched_cache_requests_total",
+    "Consultas a caches em memória",
+    ["cache", "result"],
+)
+
+EXPORT_DURATION = Histogram(
+    "logisched_export_duration_seconds",
+    "Tempo de geração das exportações",
+    ["format"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+EXPORT_SIZE = Histogram(
+    "logisched_export_size_bytes",
+    "Tamanho dos arquivos exportados",
+    ["format"],
+    buckets=(16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864),
+)
+EXPORT_ROWS = Counter("logisched_export_rows_total", "Linhas exportadas", ["format"])
+
+EVENT_LOOP_LAG = Histogram(
+    "logisched_event_loop_lag_seconds",
+    "Atraso do event loop em relação ao agendado",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float,
+                    db_seconds: float, sql_count: int, response_bytes: int) -> None:
+    REQUESTS.labels(method, route, str(status)).inc()
+    REQUEST_LATENCY.labels(method, route).observe(seconds)
+    REQUEST_DB_TIME.labels(method, route).observe(db_seconds)
+    REQUEST_SQL_STATEMENTS.labels(method, route).observe(sql_count)
+    RESPONSE_SIZE.labels(method, route).observe(response_bytes)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_export(fmt: str, seconds: float, size_bytes: int, rows: int) -> None:
+    EXPORT_DURATION.labels(fmt).observe(seconds)
+    EXPORT_SIZE.labels(fmt).observe(size_bytes)
+    EXPORT_ROWS.labels(fmt).inc(rows)
+
+PASSWORD_HASH_PENDING = Gauge(
+    "logisched_password_hash_pending",
+    "Verificações bcrypt em execução ou aguardando o pool de hashing",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "logisched_password_hash_rejected_total",
+    "Logins recusados com 429 porque a fila de hashing estava cheia",
+)
+
+
+# --- Pool ---
+def _update_pool_gauges(pool, returning: int = 0) -> None:
+    # NullPool/StaticPool não têm contadores
+    if not hasattr(pool, "checkedout"):
+        return
+    POOL_SIZE.set(pool.size())
+    # o evento de checkin dispara antes de a conexão voltar à fila
+    POOL_CHECKED_OUT.set(pool.checkedout() - returning)
+    POOL_OVERFLOW.set(max(0, pool.overflow()))
+
+
+def instrument_pool(async_engine) -> None:
+    """Mantém os gauges do pool atualizados a cada checkout/checkin (idempotente)."""
+    pool = async_engine.sync_engine.pool
+
+    def on_checkout(dbapi_conn, record, proxy):
+        if hasattr(pool, "checkedout") and pool.checkedout() > pool.size():
+            POOL_OVERFLOW_CHECKOUTS.inc()
+        _update_pool_gauges(pool)
+
+    def on_checkin(dbapi_conn, record):
+        _update_pool_gauges(pool, returning=1)
+
+    if getattr(pool, "_logisched_instrumented", False):
+        return
+    event.listen(pool, "checkout", on_checkout)
+    event.listen(pool, "checkin", on_checkin)
+    pool._logisched_instrumented = True
+    _update_pool_gauges(pool)
+
+
+# --- Event loop ---
+async def monitor_event_loop_lag(interval: float = EVENT_LOOP_LAG_INTERVAL) -> None:
+    """Mede o atraso entre o wake-up agendado e o real; roda até ser cancelada."""
+    while True:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - expected))
+
+EVENT_LOOP_BLOCKED = Counter(
+    "logisched_event_loop_blocked_total",
+    "Travamentos do event loop acima de BLOCKING_THRESHOLD_MS (watchdog de debug)",
+    ["route"],
+)
+
+RATE_LIMITED = Counter(
+    "logisched_rate_limited_total",
+    "Requisições recusadas com 429 pelo rate limiter",
+    ["rule", "reason"],
+)
+
+QUERY_GUARD_REJECTED = Counter(
+    "logisched_query_guard_rejected_total",
+    "Leituras recusadas por período longo demais (range) ou agendamentos demais (size)",
+    ["endpoint", "reason"],
+)
+
+COMPRESSION_BYTES = Counter(
+    "logisched_compression_bytes_total",
+    "Bytes antes (in) e depois (out) da compressão das respostas",
+    ["encoding", "stage"],
+)
+
+
+def observe_compression(encoding: str, bytes_in: int, bytes_out: int) -> None:
+    COMPRESSION_BYTES.labels(encoding, "in").inc(bytes_in)
+    COMPRESSION_BYTES.labels(encoding, "out").inc(bytes_out)
+
+
+# --- Exposição ---
+def render_latest() -> tuple[bytes, str]:
+    """Corpo e content-type do scrape, agregando os workers quando em modo multiprocess."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Remove os gauges "live" deste worker ao encerrar (modo multiprocess)."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
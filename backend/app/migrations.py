@@ -0,0 +1,506 @@
+"""Migrações versionadas do schema.
+
+Cada migração tem um número de versão crescente e é registrada na tabela
+``schema_migrations`` quando aplicada. ``upgrade_db.py`` roda as pendentes
+uma única vez antes de os workers subirem (ver Dockerfile); no startup cada
+worker só confere a versão com ``check_schema_version`` (uma query).
+
+A migração 1 é o baseline (``create_all``), então bancos novos já nascem
+com as colunas e índices recentes: migrações que alteram tabelas existentes
+devem ser idempotentes (``add_column``/``create_index`` só criam o que falta).
+
+Cada migração aplicada guarda o checksum do seu código; se uma migração já
+aplicada for editada depois, o runner recusa continuar. Migrações com
+``transactional=False`` rodam em autocommit, o que permite
+``CREATE INDEX CONCURRENTLY`` no Postgres sem travar escritas nas tabelas
+grandes.
+"""
+from dataclasses import dataclass
+from datetime import date
+import hashlib
+import inspect
+import os
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import inspect as inspect_db, text
+from sqlalchemy.exc import DBAPIError, OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from .constants import CATEGORIES
+from .database import Base
+from . import models
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[AsyncConnection], Awaitable[None]]
+    transactional: bool = True
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(inspect.getsource(self.upgrade).encode()).hexdigest()
+
+    @property
+    def description(self) -> str:
+        return (inspect.getdoc(self.upgrade) or "").split("\n")[0]
+
+
+class MigrationError(Exception):
+    pass
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str, transactional: bool = True):
+    def register(fn):
+        if any(m.version == version for m in MIGRATIONS):
+            raise MigrationError(f"Versão de migração duplicada: {version}")
+        MIGRATIONS.append(Migration(version, name, fn, transactional))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return fn
+    return register
+
+
+# --- Helpers ---
+# add_column/drop_column/set_not_null/create_index ignoram tabelas que não
+# existem: o baseline cria o schema atual, sem as tabelas removidas por
+# migrações posteriores (ex.: schedule_capacity_spots), e as migrações
+# antigas que ainda as citam precisam continuar rodando em bancos novos.
+async def table_exists(conn: AsyncConnection, table: str) -> bool:
+    return await conn.run_sync(lambda sync_conn: inspect_db(sync_conn).has_table(table))
+
+
+async def column_exists(conn: AsyncConnection, table: str, column: str) -> bool:
+    if conn.dialect.name == "sqlite":
+        result = await conn.execute(text(f"PRAGMA table_info('{table}')"))
+        return column in [row[1] for row in result.all()]
+    result = await conn.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = :table AND column_name = :column)"
+        ),
+        {"table": table, "column": column},
+    )
+    return bool(result.scalar())
+
+
+async def add_column(conn: AsyncConnection, table: str, column: str, ddl: str,
+                     sqlite_ddl: Optional[str] = None) -> None:
+    """``ALTER TABLE ... ADD COLUMN`` somente se a coluna ainda não existir."""
+    if not await table_exists(conn, table) or await column_exists(conn, table, column):
+        return
+    if conn.dialect.name == "sqlite" and sqlite_ddl:
+        ddl = sqlite_ddl
+    print(f"  Adding '{column}' column to {table} table")
+    await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+async def drop_column(conn: AsyncConnection, table: str, column: str) -> None:
+    """``ALTER TABLE ... DROP COLUMN`` somente se a coluna existir (SQLite >= 3.35)."""
+    if not await column_exists(conn, table, column):
+        return
+    print(f"  Dropping '{column}' column from {table} table")
+    await conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+
+
+async def set_not_null(conn: AsyncConnection, table: str, column: str) -> None:
+    """``ALTER COLUMN ... SET NOT NULL`` no Postgres, se a coluna existir.
+
+    No SQLite não há ALTER COLUMN: a coluna adicionada fica anulável e o
+    modelo garante o valor.
+    """
+    if conn.dialect.name != "postgresql" or not await column_exists(conn, table, column):
+        return
+    await conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL"))
+
+
+async def create_index(conn: AsyncConnection, name: str, table: str, columns: List[str]) -> None:
+    """Cria o índice se faltar; no Postgres com CONCURRENTLY (migração não transacional).
+
+    Um ``CREATE INDEX CONCURRENTLY`` interrompido deixa o índice INVALID, que
+    ``IF NOT EXISTS`` pularia: nesse caso ele é removido e recriado.
+    """
+    if not await table_exists(conn, table):
+        return
+    cols = ", ".join(columns)
+    if conn.dialect.name != "postgresql":
+        await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
+        return
+    invalid = await conn.execute(
+        text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    )
+    if invalid.first() is not None:
+        print(f"  Dropping invalid index {name}")
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    await conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({cols})"))
+
+
+# --- Partições mensais (Postgres) ---
+# tabelas particionadas por mês (schedules só depois do partition_schedules.py,
+# que é opcional); upgrade_db.py cria as partições dos próximos meses a cada
+# execução (sem elas as linhas novas caem na partição DEFAULT)
+PARTITIONED_TABLES = ("schedule_history", "schedules")
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+
+
+def month_start(day: date, offset: int = 0) -> date:
+    """Primeiro dia do mês de ``day`` deslocado ``offset`` meses."""
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def is_partitioned(conn: AsyncConnection, table: str) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    result = await conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table"),
+        {"table": table},
+    )
+    return result.first() is not None
+
+
+async def ensure_monthly_partitions(conn: AsyncConnection, table: str, first_month: Optional[date] = None,
+                                    months_ahead: int = PARTITION_MONTHS_AHEAD) -> None:
+    """Cria as partições ``<table>_yAAAAmMM`` de ``first_month`` (padrão: mês atual) até ``months_ahead`` meses à frente.
+
+    Não faz nada se a tabela não for particionada (ex.: SQLite). Um mês que
+    já tem linhas na partição DEFAULT não pode ganhar partição própria: fica
+    um aviso e as linhas continuam na DEFAULT.
+    """
+    if not await is_partitioned(conn, table):
+        return
+    today = date.today()
+    start, last = month_start(first_month or today), month_start(today, months_ahead)
+    while start <= last:
+        end = month_start(start, 1)
+        name = f"{table}_y{start.year}m{start.month:02d}"
+        if not await table_exists(conn, name):
+            print(f"  Creating partition {name}")
+            try:
+                async with conn.begin_nested():
+                    await conn.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"
+                    ))
+            except DBAPIError as e:
+                print(f"AVISO: partição {name} não criada: {e.orig}")
+        start = end
+
+
+# --- Migrações ---
+@migration(1, "baseline")
+async def _baseline(conn: AsyncConnection) -> None:
+    """Tabelas do modelo e colunas antigas que faltarem."""
+    await conn.run_sync(Base.metadata.create_all)
+    # colunas que antes eram adicionadas pelo upgrade_db.py
+    await add_column(conn, "lost_plates", "reason", "VARCHAR(255) DEFAULT ''", "TEXT DEFAULT ''")
+    await add_column(conn, "schedule_categories", "profile_name", "VARCHAR(255) DEFAULT ''", "TEXT DEFAULT ''")
+    await add_column(conn, "companies", "vehicle_goal", "INTEGER DEFAULT 0")
+
+
+@migration(2, "seed_companies")
+async def _seed_companies(conn: AsyncConnection) -> None:
+    """Empresas padrão em banco vazio."""
+    # antes feito no lifespan de cada worker
+    if (await conn.execute(text("SELECT 1 FROM companies LIMIT 1"))).first() is None:
+        await conn.execute(
+            models.Company.__table__.insert(),
+            [{"name": "3 Corações"}, {"name": "Itambé"}, {"name": "DPA"}],
+        )
+
+
+@migration(3, "schedule_indexes", transactional=False)
+async def _schedule_indexes(conn: AsyncConnection) -> None:
+    """Índices de data/empresa em schedules e das FKs das tabelas filhas."""
+    await create_index(conn, "ix_schedules_schedule_date", "schedules", ["schedule_date"])
+    await create_index(conn, "ix_schedules_company_id_schedule_date", "schedules", ["company_id", "schedule_date"])
+    await create_index(conn, "ix_schedule_categories_schedule_id", "schedule_categories", ["schedule_id"])
+    await create_index(conn, "ix_schedule_capacities_schedule_id", "schedule_capacities", ["schedule_id"])
+    await create_index(conn, "ix_schedule_capacity_spots_schedule_id", "schedule_capacity_spots", ["schedule_id"])
+    await create_index(conn, "ix_lost_plates_schedule_category_id", "lost_plates", ["schedule_category_id"])
+
+
+@migration(4, "reference_ids")
+async def _reference_ids(conn: AsyncConnection) -> None:
+    """Nomes de categoria/perfil nas tabelas filhas viram FKs inteiras.
+
+    Roda numa transação só: os UPDATEs e DROP COLUMNs travam as tabelas
+    filhas (escritas e leituras) até o commit, o que em bancos grandes leva
+    minutos. Aplique numa janela de manutenção, com o app parado.
+    """
+    # nomes usados no histórico (ou nas constantes) que faltam nas tabelas de referência
+    known = {name for (name,) in (await conn.execute(text("SELECT name FROM categories"))).all()}
+    names = [c for c in CATEGORIES if c not in known]
+    if await column_exists(conn, "schedule_categories", "category_name"):
+        used = await conn.execute(text("SELECT DISTINCT category_name FROM schedule_categories"))
+        names += [name for (name,) in used.all() if name not in known and name not in names]
+    if names:
+        await conn.execute(models.Category.__table__.insert(), [{"name": n} for n in names])
+
+    profile_sources = [
+        ("schedule_capacities", False),
+        ("schedule_capacity_spots", True),
+        ("schedule_categories", False),
+    ]
+    for table, spot in profile_sources:
+        if not await column_exists(conn, table, "profile_name"):
+            continue
+        # perfis removidos que ainda aparecem no histórico voltam com peso 0
+        await conn.execute(
+            text(
+                f"INSERT INTO capacity_profiles (name, weight, spot) "
+                f"SELECT DISTINCT profile_name, 0, CAST(:spot AS BOOLEAN) FROM {table} "
+                f"WHERE profile_name <> '' AND profile_name NOT IN (SELECT name FROM capacity_profiles)"
+            ),
+            {"spot": spot},
+        )
+
+    await add_column(conn, "schedule_categories", "category_id", "INTEGER REFERENCES categories(id)")
+    for table, _ in profile_sources:
+        await add_column(conn, table, "profile_id", "INTEGER REFERENCES capacity_profiles(id)")
+
+    if await column_exists(conn, "schedule_categories", "category_name"):
+        await conn.execute(text(
+            "UPDATE schedule_categories SET category_id = c.id FROM categories c "
+            "WHERE c.name = schedule_categories.category_name"
+        ))
+    for table, _ in profile_sources:
+        if await column_exists(conn, table, "profile_name"):
+            await conn.execute(text(
+                f"UPDATE {table} SET profile_id = p.id FROM capacity_profiles p "
+                f"WHERE p.name = {table}.profile_name"
+            ))
+        await drop_column(conn, table, "profile_name")
+    await drop_column(conn, "schedule_categories", "category_name")
+
+    await set_not_null(conn, "schedule_categories", "category_id")
+    await set_not_null(conn, "schedule_capacities", "profile_id")
+    await set_not_null(conn, "schedule_capacity_spots", "profile_id")
+
+
+@migration(5, "reference_indexes", transactional=False)
+async def _reference_indexes(conn: AsyncConnection) -> None:
+    """Índices de profile_id (filtro do dashboard e checagem de uso ao excluir perfis)."""
+    await create_index(conn, "ix_schedule_capacities_profile_id", "schedule_capacities", ["profile_id"])
+    await create_index(conn, "ix_schedule_capacity_spots_profile_id", "schedule_capacity_spots", ["profile_id"])
+
+
+@migration(6, "merge_spot_capacities")
+async def _merge_spot_capacities(conn: AsyncConnection) -> None:
+    """Capacidades spot passam para schedule_capacities com spot = true."""
+    await add_column(conn, "schedule_capacities", "spot", "BOOLEAN NOT NULL DEFAULT FALSE")
+    if not await table_exists(conn, "schedule_capacity_spots"):
+        return
+    # os ids das capacidades spot mudam (ganham ids da tabela única)
+    await conn.execute(text(
+        "INSERT INTO schedule_capacities (schedule_id, profile_id, vehicle_count, total_weight_kg, spot) "
+        "SELECT schedule_id, profile_id, vehicle_count, total_weight_kg, TRUE "
+        "FROM schedule_capacity_spots ORDER BY id"
+    ))
+    print("  Dropping schedule_capacity_spots table")
+    await conn.execute(text("DROP TABLE schedule_capacity_spots"))
+
+
+@migration(7, "schedule_history")
+async def _schedule_history(conn: AsyncConnection) -> None:
+    """Tabela append-only do histórico de alterações (ver app/history.py)."""
+    if conn.dialect.name != "postgresql":
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schedule_history ("
+            "id INTEGER PRIMARY KEY, schedule_id INTEGER NOT NULL, changed_at DATETIME NOT NULL, "
+            "action VARCHAR(16) NOT NULL, user_id INTEGER, role VARCHAR(16), changes TEXT NOT NULL)"
+        ))
+    else:
+        # particionada por mês; a PK precisa incluir a coluna de partição
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schedule_history ("
+            "id BIGINT GENERATED BY DEFAULT AS IDENTITY, schedule_id INTEGER NOT NULL, "
+            "changed_at TIMESTAMP NOT NULL, action VARCHAR(16) NOT NULL, user_id INTEGER, "
+            "role VARCHAR(16), changes TEXT NOT NULL, PRIMARY KEY (id, changed_at)"
+            ") PARTITION BY RANGE (changed_at)"
+        ))
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schedule_history_default PARTITION OF schedule_history DEFAULT"
+        ))
+        await ensure_monthly_partitions(conn, "schedule_history")
+    # tabela nova e vazia: índice criado na mesma transação
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_schedule_history_schedule_id ON schedule_history (schedule_id, changed_at)"
+    ))
+
+
+@migration(8, "schedule_archive")
+async def _schedule_archive(conn: AsyncConnection) -> None:
+    """Tabela de agendamentos arquivados (ver archive_schedules.py)."""
+    await conn.run_sync(lambda sync_conn: models.ScheduleArchive.__table__.create(sync_conn, checkfirst=True))
+
+
+@migration(9, "refresh_token_rotation")
+async def _refresh_token_rotation(conn: AsyncConnection) -> None:
+    """Refresh tokens trocados passam a ser marcados em rotated_at, não em revoked_at."""
+    await add_column(conn, "refresh_tokens", "rotated_at", "TIMESTAMP", "DATETIME")
+    # antes, a rotação preenchia revoked_at e a denylist bloqueava a sessão; um
+    # token com sucessor criado depois do seu revoked_at foi trocado, não revogado
+    await conn.execute(text(
+        "UPDATE refresh_tokens SET rotated_at = revoked_at, revoked_at = NULL "
+        "WHERE revoked_at IS NOT NULL AND EXISTS ("
+        "SELECT 1 FROM refresh_tokens newer WHERE newer.session_id = refresh_tokens.session_id "
+        "AND newer.id > refresh_tokens.id AND newer.created_at >= refresh_tokens.revoked_at)"
+    ))
+
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+_CREATE_MIGRATIONS_TABLE = text(
+    "CREATE TABLE IF NOT EXISTS schema_migrations ("
+    "version INTEGER PRIMARY KEY, "
+    "name VARCHAR(255) NOT NULL, "
+    "applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+    "checksum VARCHAR(64), "
+    "duration_ms INTEGER)"
+)
+
+
+async def current_version(engine: AsyncEngine) -> int:
+    """Maior versão aplicada; 0 se ``schema_migrations`` ainda não existe."""
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT MAX(version) FROM schema_migrations"))
+            return result.scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+
+async def _ensure_migrations_table(conn: AsyncConnection) -> dict:
+    """Cria/atualiza ``schema_migrations`` e retorna {versão: checksum}.
+
+    Registros sem checksum (anteriores a ele) recebem o da migração atual.
+    """
+    await conn.execute(_CREATE_MIGRATIONS_TABLE)
+    # tabelas criadas antes do checksum/duração
+    await add_column(conn, "schema_migrations", "checksum", "VARCHAR(64)")
+    await add_column(conn, "schema_migrations", "duration_ms", "INTEGER")
+    result = await conn.execute(text("SELECT version, checksum FROM schema_migrations"))
+    applied = {version: checksum for version, checksum in result.all()}
+    for m in MIGRATIONS:
+        if m.version in applied and applied[m.version] is None:
+            await conn.execute(
+                text("UPDATE schema_migrations SET checksum = :checksum WHERE version = :version"),
+                {"checksum": m.checksum, "version": m.version},
+            )
+            applied[m.version] = m.checksum
+    return applied
+
+
+async def _read_applied(conn: AsyncConnection) -> dict:
+    """Como ``_ensure_migrations_table``, mas sem escrever nada (dry-run)."""
+    for sql in (
+        "SELECT version, checksum FROM schema_migrations",
+        "SELECT version, NULL FROM schema_migrations",
+    ):
+        try:
+            async with conn.begin():
+                result = await conn.execute(text(sql))
+                return {version: checksum for version, checksum in result.all()}
+        except (OperationalError, ProgrammingError):
+            continue
+    return {}
+
+
+def _verify_checksums(applied: dict) -> None:
+    changed = []
+    for m in MIGRATIONS:
+        if applied.get(m.version, m.checksum) not in (None, m.checksum):
+            changed.append(f"{m.version:04d}_{m.name}")
+    if changed:
+        raise MigrationError(
+            "Migrações já aplicadas foram alteradas: " + ", ".join(changed)
+            + ". Crie uma nova migração em vez de editar uma existente."
+        )
+
+
+async def run_migrations(engine: AsyncEngine, dry_run: bool = False) -> List[Migration]:
+    """Aplica as migrações pendentes em ordem, mostrando o tempo de cada uma.
+
+    Migrações transacionais rodam cada uma na sua transação (junto com o
+    registro em ``schema_migrations``); as demais em autocommit. Com
+    ``dry_run`` apenas lista o que seria aplicado.
+    """
+    async with engine.connect() as conn:
+        if dry_run:
+            applied = await _read_applied(conn)
+        else:
+            async with conn.begin():
+                applied = await _ensure_migrations_table(conn)
+        _verify_checksums(applied)
+
+        pending = [m for m in MIGRATIONS if m.version not in applied]
+        for m in pending:
+            label = f"{m.version:04d}_{m.name}"
+            mode = "" if m.transactional else " [sem transação]"
+            if dry_run:
+                print(f"Pending migration {label}{mode}: {m.description}")
+                continue
+            print(f"Applying migration {label}{mode}...")
+            started = time.perf_counter()
+            if m.transactional:
+                async with conn.begin():
+                    await m.upgrade(conn)
+                    await _record(conn, m, started)
+            else:
+                async with engine.connect() as autocommit_conn:
+                    autocommit_conn = await autocommit_conn.execution_options(isolation_level="AUTOCOMMIT")
+                    await m.upgrade(autocommit_conn)
+                    await _record(autocommit_conn, m, started)
+                    await autocommit_conn.commit()
+            print(f"  done in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return pending
+
+
+async def ensure_partitions(engine: AsyncEngine) -> None:
+    """Partições dos próximos meses de todas as tabelas particionadas (roda no ``upgrade_db.py``)."""
+    async with engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            await ensure_monthly_partitions(conn, table)
+
+
+async def _record(conn: AsyncConnection, m: Migration, started: float) -> None:
+    await conn.execute(
+        text(
+            "INSERT INTO schema_migrations (version, name, checksum, duration_ms) "
+            "VALUES (:version, :name, :checksum, :duration_ms)"
+        ),
+        {
+            "version": m.version,
+            "name": m.name,
+            "checksum": m.checksum,
+            "duration_ms": int((time.perf_counter() - started) * 1000),
+        },
+    )
+
+
+# só para um worker único (ex.: uvicorn --reload): com vários, cada um
+# migraria ao mesmo tempo no startup
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() == "true"
+
+
+async def check_schema_version(engine: AsyncEngine) -> int:
+    """Checagem de startup: uma query; migra só com ``AUTO_MIGRATE=true``."""
+    version = await current_version(engine)
+    if version >= SCHEMA_VERSION:
+        return version
+    if AUTO_MIGRATE:
+        await run_migrations(engine)
+        return SCHEMA_VERSION
+    print(
+        f"AVISO: schema na versão {version}, código espera {SCHEMA_VERSION}. "
+        "Rode 'python upgrade_db.py' antes de subir os workers."
+    )
+    return version
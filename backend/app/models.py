@@ -1,6 +1,6 @@
 from typing import List, Optional
 from datetime import date, datetime, timezone
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
@@ -22,38 +22,64 @@ class Company(Base):
 
 class Schedule(Base):
     __tablename__ = "schedules"
+    __table_args__ = (
+        Index("ix_schedules_company_id_schedule_date", "company_id", "schedule_date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     company_id: Mapped[int] = mapped_column(ForeignKey("companies.id"))
     uf: Mapped[str] = mapped_column(default="BAHIA")
-    schedule_date: Mapped[date]
+    schedule_date: Mapped[date] = mapped_column(index=True)
     created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
     updated_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
 
     company: Mapped["Company"] = relationship(back_populates="schedules")
+    # children are ordered by id so every loader strategy returns them in entry order
     categories: Mapped[List["ScheduleCategory"]] = relationship(
-        back_populates="schedule", cascade="all, delete-orphan"
-    )
-    capacities: Mapped[List["ScheduleCapacity"]] = relationship(
-        back_populates="schedule", cascade="all, delete-orphan"
+        back_populates="schedule", cascade="all, delete-orphan", order_by="ScheduleCategory.id"
     )
-    capacities_spot: Mapped[List["ScheduleCapacitySpot"]] = relationship(
-        back_populates="schedule", cascade="all, delete-orphan"
+    # regular and spot capacities share one table (and one loader query);
+    # capacities/capacities_spot below keep the old two-collection interface
+    all_capacities: Mapped[List["ScheduleCapacity"]] = relationship(
+        back_populates="schedule", cascade="all, delete-orphan", order_by="ScheduleCapacity.id"
     )
 
+    @property
+    def capacities(self) -> List["ScheduleCapacity"]:
+        return [cap for cap in self.all_capacities if not cap.spot]
+
+    @capacities.setter
+    def capacities(self, rows: List["ScheduleCapacity"]) -> None:
+        self._replace_capacities(rows, spot=False)
+
+    @property
+    def capacities_spot(self) -> List["ScheduleCapacity"]:
+        return [cap for cap in self.all_capacities if cap.spot]
+
+    @capacities_spot.setter
+    def capacities_spot(self, rows: List["ScheduleCapacity"]) -> None:
+        self._replace_capacities(rows, spot=True)
+
+    def _replace_capacities(self, rows: List["ScheduleCapacity"], spot: bool) -> None:
+        for row in rows:
+            row.spot = spot
+        kept = [cap for cap in self.all_capacities if cap.spot != spot]
+        self.all_capacities = kept + list(rows)
+
 
 class ScheduleCategory(Base):
     __tablename__ = "schedule_categories"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    schedule_id: Mapped[int] = mapped_column(ForeignKey("schedules.id"))
-    category_name: Mapped[str]
+    schedule_id: Mapped[int] = mapped_column(ForeignKey("schedules.id"), index=True)
+    # nomes traduzidos pelo cache de app/references.py
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"))
     count: Mapped[int] = mapped_column(default=0)
-    profile_name: Mapped[str] = mapped_column(default="")  # filled when Perdidas
+    profile_id: Mapped[Optional[int]] = mapped_column(ForeignKey("capacity_profiles.id"), nullable=True)  # filled when Perdidas
 
     schedule: Mapped["Schedule"] = relationship(back_populates="categories")
     lost_plates: Mapped[List["LostPlate"]] = relationship(
-        back_populates="schedule_category", cascade="all, delete-orphan"
+        back_populates="schedule_category", cascade="all, delete-orphan", order_by="LostPlate.id"
     )
 
 
@@ -97,7 +123,7 @@ class LostPlate(Base):
     __tablename__ = "lost_plates"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    schedule_category_id: Mapped[int] = mapped_column(ForeignKey("schedule_categories.id"))
+    schedule_category_id: Mapped[int] = mapped_column(ForeignKey("schedule_categories.id"), index=True)
     plate_number: Mapped[str]
     reason: Mapped[str] = mapped_column(default="")
 
@@ -108,24 +134,51 @@ class ScheduleCapacity(Base):
     __tablename__ = "schedule_capacities"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    schedule_id: Mapped[int] = mapped_column(ForeignKey("schedules.id"))
-    profile_name: Mapped[str]
+    schedule_id: Mapped[int] = mapped_column(ForeignKey("schedules.id"), index=True)
+    profile_id: Mapped[int] = mapped_column(ForeignKey("capacity_profiles.id"), index=True)
     vehicle_count: Mapped[int] = mapped_column(default=0)
     total_weight_kg: Mapped[int] = mapped_column(default=0)
+    # spot capacities used to live in schedule_capacity_spots
+    spot: Mapped[bool] = mapped_column(default=False)
 
-    schedule: Mapped["Schedule"] = relationship(back_populates="capacities")
+    schedule: Mapped["Schedule"] = relationship(back_populates="all_capacities")
 
 
-class ScheduleCapacitySpot(Base):
-    __tablename__ = "schedule_capacity_spots"
+class ScheduleArchive(Base):
+    """Agendamentos de períodos fechados retirados das tabelas ativas (archive_schedules.py).
 
-    id: Mapped[int] = mapped_column(primary_key=True)
-    schedule_id: Mapped[int] = mapped_column(ForeignKey("schedules.id"))
-    profile_name: Mapped[str]
-    vehicle_count: Mapped[int] = mapped_column(default=0)
-    total_weight_kg: Mapped[int] = mapped_column(default=0)
+    ``snapshot`` guarda o agendamento com os filhos em JSON, no formato de
+    ``history.snapshot`` (nomes de categoria/perfil da época do arquivamento).
+    """
+    __tablename__ = "schedule_archive"
+    __table_args__ = (
+        Index("ix_schedule_archive_company_id_schedule_date", "company_id", "schedule_date"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)  # mesmo id que tinha em schedules
+    company_id: Mapped[int] = mapped_column(ForeignKey("companies.id"))
+    schedule_date: Mapped[date] = mapped_column(index=True)
+    archived_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+    snapshot: Mapped[str]
 
-    schedule: Mapped["Schedule"] = relationship(back_populates="capacities_spot")
+
+class RefreshToken(Base):
+    """Refresh tokens (opaque, stored hashed). Every rotation keeps the same
+    session_id so a whole login session can be revoked at once."""
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    token_hash: Mapped[str] = mapped_column(unique=True, index=True)
+    session_id: Mapped[str] = mapped_column(index=True)
+    # NULL for logins through the legacy ADMIN_PASSWORD/COLLAB_PASSWORD
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), nullable=True)
+    role: Mapped[str]
+    expires_at: Mapped[datetime]
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+    # exchanged for a new pair on /auth/refresh (presenting it again revokes the session)
+    rotated_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    # set only by revoke_session (logout, token reuse); feeds the denylist
+    revoked_at: Mapped[Optional[datetime]] = mapped_column(nullable=True, index=True)
 
 
 class User(Base):
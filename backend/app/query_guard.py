@@ -0,0 +1,87 @@
+"""Limites das leituras por período: listagem, dashboard e exportação.
+
+Essas rotas carregam todos os agendamentos do filtro de uma vez, então um
+pedido sem datas (ou com anos de período) monopolizaria o banco e o worker:
+
+- sem ``start_date`` nem ``end_date`` vale a janela padrão, os últimos
+  ``DEFAULT_WINDOW_DAYS`` dias (mais o que já está agendado à frente); só
+  ``end_date`` conta a janela para trás a partir dela;
+- o período pedido não pode passar do máximo do papel de quem pede
+  (``MAX_RANGE_DAYS``, ex. ``admin:1096,collab:366,anonymous:93``);
+- períodos maiores que a janela padrão passam antes por um ``COUNT(*)``
+  (índice de ``schedule_date``); acima do limite da rota a requisição é
+  recusada com a contagem, para o usuário reduzir o período ou filtrar.
+
+Recusas contam em ``logisched_query_guard_rejected_total``.
+"""
+from datetime import date, timedelta
+import os
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import metrics
+from .auth import Principal
+from .models import Schedule
+
+DEFAULT_WINDOW_DAYS = int(os.getenv("DEFAULT_WINDOW_DAYS", 30))
+# agendamentos por requisição; a exportação monta uma planilha por linha
+MAX_SCHEDULES_PER_REQUEST = int(os.getenv("MAX_SCHEDULES_PER_REQUEST", 20000))
+EXPORT_MAX_SCHEDULES = int(os.getenv("EXPORT_MAX_SCHEDULES", 10000))
+
+
+def _parse_ranges(value: str) -> Dict[str, int]:
+    ranges = {}
+    for item in value.split(","):
+        role, _, days = item.partition(":")
+        if role.strip() and days.strip():
+            ranges[role.strip()] = int(days)
+    return ranges
+
+
+MAX_RANGE_DAYS = _parse_ranges(os.getenv("MAX_RANGE_DAYS", "admin:1096,collab:366,anonymous:93"))
+
+
+def _role(principal: Optional[Principal]) -> str:
+    # listagem e dashboard também respondem sem login
+    return principal.role if principal is not None else "anonymous"
+
+
+def _days(start: date, end: Optional[date]) -> int:
+    return ((end or date.today()) - start).days + 1
+
+
+def resolve_window(endpoint: str, principal: Optional[Principal],
+                   start_date: Optional[date], end_date: Optional[date]) -> Tuple[date, Optional[date]]:
+    """Período efetivo da consulta (aplica a janela padrão) ou 400 se passar do máximo do papel."""
+    if start_date is None:
+        start_date = (end_date or date.today()) - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    if end_date is not None and end_date < start_date:
+        raise HTTPException(status_code=400, detail="A data final deve ser igual ou posterior à inicial")
+    role = _role(principal)
+    max_days = MAX_RANGE_DAYS.get(role, MAX_RANGE_DAYS.get("anonymous", DEFAULT_WINDOW_DAYS))
+    days = _days(start_date, end_date)
+    if days > max_days:
+        metrics.QUERY_GUARD_REJECTED.labels(endpoint, "range").inc()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Período de {days} dias acima do máximo de {max_days} dias. Reduza o período.",
+        )
+    return start_date, end_date
+
+
+async def check_size(session: AsyncSession, endpoint: str, conditions: list, start_date: date,
+                     end_date: Optional[date], limit: int = MAX_SCHEDULES_PER_REQUEST) -> None:
+    """``COUNT(*)`` antes de carregar períodos maiores que a janela padrão; 400 acima de ``limit``."""
+    if _days(start_date, end_date) <= DEFAULT_WINDOW_DAYS:
+        return
+    count = (await session.execute(select(func.count()).select_from(Schedule).where(*conditions))).scalar()
+    if count > limit:
+        metrics.QUERY_GUARD_REJECTED.labels(endpoint, "size").inc()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Consulta com {count} agendamentos, acima do limite de {limit}. "
+                   "Reduza o período ou filtre por empresa/UF.",
+        )
@@ -0,0 +1,238 @@
+"""Rate limiting (token bucket) e limite de concorrência por rota.
+
+Cada cliente tem um balde de ``RATE_LIMIT_CAPACITY`` fichas que se recarrega
+a ``RATE_LIMIT_REFILL_PER_SEC`` fichas/s. Cada requisição gasta o custo da
+primeira regra de ``RATE_LIMIT_RULES`` cujo método e prefixo de path batem
+(exportação e dashboard custam mais que leituras simples).
+
+O cliente é a sessão do token (``sid`` do JWT), mas só depois de o token
+ser verificado (``decode_token``, com cache); sem token, ou com um token
+inválido, o cliente é o IP. Além disso toda requisição gasta do balde do IP
+(``RATE_LIMIT_IP_CAPACITY``/``RATE_LIMIT_IP_REFILL_PER_SEC``, maior porque
+um escritório inteiro pode sair pelo mesmo IP): trocar de token a cada
+requisição não escapa do limite.
+
+Algumas rotas também têm um máximo de requisições simultâneas por worker,
+para que poucas exportações não ocupem todo o pool do banco.
+
+Por padrão os baldes ficam na memória de cada worker. Com
+``RATE_LIMIT_REDIS_URL`` (requer o pacote ``redis``) eles são compartilhados
+entre os workers; se o Redis falhar, o worker volta aos baldes locais.
+"""
+from dataclasses import dataclass
+import json
+import logging
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from . import metrics
+from .auth import decode_token
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # backend compartilhado é opcional
+    redis_asyncio = None
+
+logger = logging.getLogger("logisched.ratelimit")
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false"
+RATE_LIMIT_CAPACITY = float(os.getenv("RATE_LIMIT_CAPACITY", 60))
+RATE_LIMIT_REFILL_PER_SEC = float(os.getenv("RATE_LIMIT_REFILL_PER_SEC", 1))
+RATE_LIMIT_IP_CAPACITY = float(os.getenv("RATE_LIMIT_IP_CAPACITY", RATE_LIMIT_CAPACITY * 4))
+RATE_LIMIT_IP_REFILL_PER_SEC = float(os.getenv("RATE_LIMIT_IP_REFILL_PER_SEC", RATE_LIMIT_REFILL_PER_SEC * 4))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+
+
+@dataclass(frozen=True)
+class Rule:
+    method: str
+    prefix: str
+    cost: float
+    max_concurrent: Optional[int] = None
+
+
+# a primeira regra que casar vale; o que não é /api/ (frontend, assets) é livre
+DEFAULT_RULES = [
+    Rule("GET", "/api/schedules/export", cost=20, max_concurrent=2),
+    Rule("GET", "/api/dashboard/metrics", cost=5, max_concurrent=8),
+    Rule("GET", "/api/schedules", cost=2),
+    Rule("POST", "/api/auth/", cost=3),
+    Rule("*", "/api/", cost=1),
+]
+
+
+def _load_rules() -> List[Rule]:
+    """``RATE_LIMIT_RULES`` aceita uma lista JSON de objetos com os campos de ``Rule``."""
+    raw = os.getenv("RATE_LIMIT_RULES")
+    if not raw:
+        return DEFAULT_RULES
+    return [Rule(**item) for item in json.loads(raw)]
+
+
+RULES = _load_rules()
+
+
+def match_rule(method: str, path: str) -> Optional[Rule]:
+    for rule in RULES:
+        if (rule.method == "*" or rule.method == method) and path.startswith(rule.prefix):
+            return rule
+    return None
+
+
+class LocalBuckets:
+    """Baldes em memória do próprio worker."""
+
+    def __init__(self, capacity: float, refill_per_sec: float, max_keys: int = 10000):
+        self.capacity = capacity
+        self.refill = refill_per_sec
+        self.max_keys = max_keys
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, key: str, cost: float) -> float:
+        """Gasta ``cost`` fichas; retorna 0 se permitido ou os segundos até haver saldo."""
+        now = time.monotonic()
+        tokens, last = self.buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - last) * self.refill)
+        if tokens >= cost:
+            self.buckets[key] = (tokens - cost, now)
+            wait = 0.0
+        else:
+            self.buckets[key] = (tokens, now)
+            wait = (cost - tokens) / self.refill
+        if len(self.buckets) > self.max_keys:
+            self._prune(now)
+        return wait
+
+    def _prune(self, now: float) -> None:
+        # baldes que já estariam cheios equivalem a não existir
+        full_after = self.capacity / self.refill
+        self.buckets = {k: v for k, v in self.buckets.items() if now - v[1] < full_after}
+
+
+_TOKEN_BUCKET_LUA = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 't') or ARGV[1])
+local last = tonumber(redis.call('HGET', KEYS[1], 'ts') or ARGV[3])
+local capacity, refill, now, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+tokens = math.min(capacity, tokens + math.max(0, now - last) * refill)
+local wait = 0
+if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / refill end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """Baldes compartilhados entre workers (script Lua atômico no Redis)."""
+
+    def __init__(self, client, capacity: float, refill_per_sec: float, fallback: LocalBuckets):
+        self.script = client.register_script(_TOKEN_BUCKET_LUA)
+        self.capacity = capacity
+        self.refill = refill_per_sec
+        self.fallback = fallback
+
+    async def take(self, key: str, cost: float) -> float:
+        try:
+            wait = await self.script(
+                keys=[f"logisched:rl:{key}"],
+                args=[self.capacity, self.refill, time.time(), cost],
+            )
+            return float(wait)
+        except Exception as e:
+            logger.warning("Rate limit via Redis indisponível, usando baldes locais: %s", e)
+            return self.fallback.take(key, cost)
+
+
+def ip_key(scope) -> str:
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+def client_key(scope) -> str:
+    """Sessão do token já verificado; sem token válido, o IP (``anon:``)."""
+    for name, value in scope.get("headers", []):
+        if name == b"authorization" and value.lower().startswith(b"bearer "):
+            try:
+                principal = decode_token(value[7:].decode("latin-1"))
+            except HTTPException:
+                break  # token inválido ou expirado: o endpoint responde 401
+            if principal.session_id is not None:
+                return "sid:" + principal.session_id
+            if principal.user_id is not None:
+                return f"uid:{principal.user_id}"
+            break
+    return "anon:" + ip_key(scope)[3:]
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI puro: 429 quando o balde do cliente ou a rota estão cheios."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = LocalBuckets(RATE_LIMIT_CAPACITY, RATE_LIMIT_REFILL_PER_SEC)
+        self.local_ip = LocalBuckets(RATE_LIMIT_IP_CAPACITY, RATE_LIMIT_IP_REFILL_PER_SEC)
+        self.shared = self.shared_ip = None
+        if RATE_LIMIT_REDIS_URL:
+            if redis_asyncio is None:
+                logger.warning("RATE_LIMIT_REDIS_URL definido mas o pacote 'redis' não está instalado")
+            else:
+                client = redis_asyncio.from_url(RATE_LIMIT_REDIS_URL)
+                self.shared = RedisBuckets(client, RATE_LIMIT_CAPACITY, RATE_LIMIT_REFILL_PER_SEC, self.local)
+                self.shared_ip = RedisBuckets(
+                    client, RATE_LIMIT_IP_CAPACITY, RATE_LIMIT_IP_REFILL_PER_SEC, self.local_ip
+                )
+        self.in_flight: Dict[str, int] = {}
+
+    async def _take(self, scope, cost: float) -> float:
+        """Gasta dos dois baldes (cliente e IP); espera do mais vazio."""
+        key, ip = client_key(scope), ip_key(scope)
+        if self.shared is not None:
+            return max(await self.shared.take(key, cost), await self.shared_ip.take(ip, cost))
+        return max(self.local.take(key, cost), self.local_ip.take(ip, cost))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        rule = match_rule(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = await self._take(scope, rule.cost)
+        if wait > 0:
+            metrics.RATE_LIMITED.labels(rule.prefix, "rate").inc()
+            await _too_many_requests(send, wait, "Muitas requisições. Aguarde alguns segundos e tente novamente.")
+            return
+
+        if rule.max_concurrent is None:
+            await self.app(scope, receive, send)
+            return
+
+        if self.in_flight.get(rule.prefix, 0) >= rule.max_concurrent:
+            metrics.RATE_LIMITED.labels(rule.prefix, "concurrency").inc()
+            await _too_many_requests(send, 2, "Servidor ocupado com outras consultas pesadas. Tente novamente em instantes.")
+            return
+        self.in_flight[rule.prefix] = self.in_flight.get(rule.prefix, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight[rule.prefix] -= 1
+
+
+async def _too_many_requests(send, retry_after: float, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
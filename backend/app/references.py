@@ -0,0 +1,98 @@
+"""Cache das tabelas de referência: categorias e perfis de capacidade.
+
+As tabelas filhas de ``schedules`` guardam só ``category_id``/``profile_id``;
+a API continua recebendo e devolvendo nomes, traduzidos por este cache.
+As duas tabelas são pequenas e mudam raramente, então cada worker mantém
+uma cópia carregada numa única query e recarregada:
+
+- a cada ``REFERENCE_CACHE_TTL`` segundos (alterações feitas em outro worker);
+- imediatamente após create/update/delete no admin deste worker;
+- quando aparece um id ou nome desconhecido (registro criado em outro worker).
+"""
+from dataclasses import dataclass, field
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import metrics
+from .models import CapacityProfile, Category
+
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", 60))
+
+
+@dataclass(frozen=True)
+class References:
+    categories: Dict[int, str] = field(default_factory=dict)
+    profiles: Dict[int, str] = field(default_factory=dict)
+    category_ids: Dict[str, int] = field(default_factory=dict)
+    profile_ids: Dict[str, int] = field(default_factory=dict)
+    loaded_at: Optional[float] = None
+
+    def category(self, category_id: int) -> str:
+        return self.categories[category_id]
+
+    def profile(self, profile_id: Optional[int]) -> str:
+        # profile_id vazio em categorias que não são "Perdidas"
+        return self.profiles[profile_id] if profile_id is not None else ""
+
+    def category_id_set(self, names: Iterable[str]) -> frozenset:
+        return frozenset(self.category_ids[n] for n in names if n in self.category_ids)
+
+    def knows(self, category_ids: Iterable[int] = (), profile_ids: Iterable[int] = ()) -> bool:
+        return all(c in self.categories for c in category_ids) and all(
+            p is None or p in self.profiles for p in profile_ids
+        )
+
+
+_references = References()
+
+
+def invalidate() -> None:
+    """Chamado pelas rotas do admin que alteram categorias ou perfis."""
+    global _references
+    _references = References()
+
+
+async def _load(session: AsyncSession) -> References:
+    query = union_all(
+        select(literal("c").label("kind"), Category.id, Category.name),
+        select(literal("p").label("kind"), CapacityProfile.id, CapacityProfile.name),
+    )
+    categories, profiles = {}, {}
+    for kind, ref_id, name in (await session.execute(query)).all():
+        (categories if kind == "c" else profiles)[ref_id] = name
+    return References(
+        categories=categories,
+        profiles=profiles,
+        category_ids={name: ref_id for ref_id, name in categories.items()},
+        profile_ids={name: ref_id for ref_id, name in profiles.items()},
+        loaded_at=time.monotonic(),
+    )
+
+
+async def get_references(session: AsyncSession, refresh: bool = False) -> References:
+    """Snapshot atual do cache, recarregado se vencido (ou com ``refresh``)."""
+    global _references
+    loaded_at = _references.loaded_at
+    fresh = loaded_at is not None and time.monotonic() - loaded_at < REFERENCE_CACHE_TTL
+    metrics.record_cache("references", hit=fresh and not refresh)
+    if refresh or not fresh:
+        _references = await _load(session)
+    return _references
+
+
+async def references_for(session: AsyncSession, schedules) -> References:
+    """Como ``get_references``, recarregando se algum agendamento citar um id desconhecido."""
+    refs = await get_references(session)
+    category_ids, profile_ids = set(), set()
+    for schedule in schedules:
+        for cat in schedule.categories:
+            category_ids.add(cat.category_id)
+            profile_ids.add(cat.profile_id)
+        profile_ids.update(cap.profile_id for cap in schedule.all_capacities)
+    if not refs.knows(category_ids, profile_ids):
+        refs = await get_references(session, refresh=True)
+    return refs
@@ -1,13 +1,19 @@
 from typing import List
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, exists
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 
 from ..auth import verify_admin
-from ..database import async_session
-from ..models import Uf, Category, CapacityProfile, Company, CapacityProfileCompany
+from .. import database
+from ..database import SessionDep, ReadSessionDep, pool_stats
+from ..instrumentation import TimedRoute, query_budget, route_timings, reset_route_timings
+from ..models import (
+    Uf, Category, CapacityProfile, Company, CapacityProfileCompany,
+    ScheduleCategory, ScheduleCapacity,
+)
+from .. import references
 from ..schemas import (
     UfCreate, UfResponse,
     CategoryCreate, CategoryResponse,
@@ -15,183 +21,193 @@ from ..schemas import (
     CompanyResponse
 )
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 # --- UFs ---
 @router.get("/admin/ufs", response_model=List[UfResponse])
-async def list_ufs(authorized: bool = Depends(verify_admin)):
-    async with async_session() as session:
-        result = await session.execute(select(Uf))
-        return result.scalars().all()
+async def list_ufs(session: ReadSessionDep, authorized: bool = Depends(verify_admin)):
+    result = await session.execute(select(Uf))
+    return result.scalars().all()
 
 @router.post("/admin/ufs", response_model=UfResponse)
-async def create_uf(uf: UfCreate, authorized: bool = Depends(verify_admin)):
-    async with async_session() as session:
-        new = Uf(name=uf.name)
-        session.add(new)
-        try:
-            await session.commit()
-            return new
-        except IntegrityError:
-            await session.rollback()
-            raise HTTPException(status_code=400, detail="UF já existe")
+async def create_uf(uf: UfCreate, session: SessionDep, authorized: bool = Depends(verify_admin)):
+    new = Uf(name=uf.name)
+    session.add(new)
+    try:
+        await session.commit()
+        return new
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail="UF já existe")
 
 @router.delete("/admin/ufs/{uf_id}")
-async def delete_uf(uf_id: int, authorized: bool = Depends(verify_admin)):
-    async with async_session() as session:
-        stmt = delete(Uf).where(Uf.id == uf_id)
-        await session.execute(stmt)
-        await session.commit()
-        return {"ok": True}
+async def delete_uf(uf_id: int, session: SessionDep, authorized: bool = Depends(verify_admin)):
+    stmt = delete(Uf).where(Uf.id == uf_id)
+    await session.execute(stmt)
+    await session.commit()
+    return {"ok": True}
 
 # --- Categories ---
 @router.get("/admin/categories", response_model=List[CategoryResponse])
-async def list_categories(authorized: bool = Depends(verify_admin)):
-    async with async_session() as session:
-        result = await session.execute(select(Category))
-        return result.scalars().all()
+async def list_categories(session: ReadSessionDep, authorized: bool = Depends(verify_admin)):
+    result = await session.execute(select(Category))
+    return result.scalars().all()
 
 @router.post("/admin/categories", response_model=CategoryResponse)
-async def create_category(cat: CategoryCreate, authorized: bool = Depends(verify_admin)):
-    async with async_session() as session:
-        new = Category(name=cat.name)
-        session.add(new)
-        try:
-            await session.commit()
-            return new
-        except IntegrityError:
-            await session.rollback()
-            raise HTTPException(status_code=400, detail="Categoria já existe")
+async def create_category(cat: CategoryCreate, session: SessionDep, authorized: bool = Depends(verify_admin)):
+    new = Category(name=cat.name)
+    session.add(new)
+    try:
+        await session.commit()
+        references.invalidate()
+        return new
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail="Categoria já existe")
 
 @router.delete("/admin/categories/{cat_id}")
-async def delete_category(cat_id: int, authorized: bool = Depends(verify_admin)):
-    async with async_session() as session:
-        stmt = delete(Category).where(Category.id == cat_id)
-        await session.execute(stmt)
-        await session.commit()
-        return {"ok": True}
+async def delete_category(cat_id: int, session: SessionDep, authorized: bool = Depends(verify_admin)):
+    used = await session.execute(select(exists().where(ScheduleCategory.category_id == cat_id)))
+    if used.scalar():
+        raise HTTPException(status_code=400, detail="Categoria usada em agendamentos. Não é possível excluir.")
+    stmt = delete(Category).where(Category.id == cat_id)
+    await session.execute(stmt)
+    await session.commit()
+    references.invalidate()
+    return {"ok": True}
 
 # --- Capacity profiles ---
 @router.get("/admin/profiles", response_model=List[CapacityProfileResponse])
-async def list_profiles(authorized: bool = Depends(verify_admin)):
-    async with async_session() as session:
-        result = await session.execute(
-            select(CapacityProfile).options(selectinload(CapacityProfile.companies))
+async def list_profiles(session: ReadSessionDep, authorized: bool = Depends(verify_admin)):
+    result = await session.execute(
+        select(CapacityProfile).options(selectinload(CapacityProfile.companies))
+    )
+    profiles = result.scalars().unique().all()
+    return [
+        CapacityProfileResponse(
+            id=p.id,
+            name=p.name,
+            weight=p.weight,
+            spot=p.spot,
+            company_ids=[c.id for c in p.companies],
         )
-        profiles = result.scalars().unique().all()
-        return [
-            CapacityProfileResponse(
-                id=p.id,
-                name=p.name,
-                weight=p.weight,
-                spot=p.spot,
-                company_ids=[c.id for c in p.companies],
-            )
-            for p in profiles
-        ]
+        for p in profiles
+    ]
+
+async def _load_companies(session, company_ids: List[int]) -> List[Company]:
+    """Fetch all referenced companies in a single IN query (404 on the first missing id)."""
+    if not company_ids:
+        return []
+    result = await session.execute(select(Company).where(Company.id.in_(set(company_ids))))
+    by_id = {c.id: c for c in result.scalars().all()}
+    for cid in company_ids:
+        if cid not in by_id:
+            raise HTTPException(status_code=404, detail=f"Empresa {cid} não encontrada")
+    return [by_id[cid] for cid in dict.fromkeys(company_ids)]
 
 @router.post("/admin/profiles", response_model=CapacityProfileResponse)
-async def create_profile(profile: CapacityProfileCreate, authorized: bool = Depends(verify_admin)):
-    async with async_session() as session:
-        new = CapacityProfile(name=profile.name, weight=profile.weight, spot=profile.spot)
-        # attach companies (can be empty for global profiles)
-        for cid in profile.company_ids:
-            company = await session.get(Company, cid)
-            if not company:
-                raise HTTPException(status_code=404, detail=f"Empresa {cid} não encontrada")
-            new.companies.append(company)
-        session.add(new)
-        try:
-            await session.commit()
-            new.company_ids = profile.company_ids
-            return new
-        except IntegrityError:
-            await session.rollback()
-            raise HTTPException(status_code=400, detail="Perfil já existe")
+@query_budget(3)
+async def create_profile(profile: CapacityProfileCreate, session: SessionDep, authorized: bool = Depends(verify_admin)):
+    new = CapacityProfile(name=profile.name, weight=profile.weight, spot=profile.spot)
+    # attach companies (can be empty for global profiles)
+    new.companies = await _load_companies(session, profile.company_ids)
+    session.add(new)
+    try:
+        await session.commit()
+        references.invalidate()
+        new.company_ids = profile.company_ids
+        return new
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail="Perfil já existe")
 
 @router.put("/admin/profiles/{profile_id}", response_model=CapacityProfileResponse)
-async def update_profile(profile_id: int, profile: CapacityProfileCreate, authorized: bool = Depends(verify_admin)):
+@query_budget(6)
+async def update_profile(profile_id: int, profile: CapacityProfileCreate, session: SessionDep, authorized: bool = Depends(verify_admin)):
     """Update a capacity profile: name, weight, spot flag, and company associations."""
-    async with async_session() as session:
-        existing = await session.get(CapacityProfile, profile_id)
-        if not existing:
-            raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    # companies are loaded eagerly (lazy="selectin") together with the profile
+    existing = await session.get(CapacityProfile, profile_id)
+    if not existing:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
         
-        # update fields
-        existing.name = profile.name
-        existing.weight = profile.weight
-        existing.spot = profile.spot
+    # update fields
+    existing.name = profile.name
+    existing.weight = profile.weight
+    existing.spot = profile.spot
         
-        # update company associations
-        # remove all existing associations
-        await session.execute(
-            delete(CapacityProfileCompany).where(
-                CapacityProfileCompany.profile_id == profile_id
-            )
-        )
-        
-        # add new ones
-        if profile.company_ids:
-            for cid in profile.company_ids:
-                company = await session.get(Company, cid)
-                if not company:
-                    raise HTTPException(status_code=404, detail=f"Empresa {cid} não encontrada")
-                existing.companies.append(company)
+    # replace company associations; the ORM diffs the collection and only
+    # inserts/deletes the association rows that actually changed
+    existing.companies = await _load_companies(session, profile.company_ids)
         
-        try:
-            await session.commit()
-            return CapacityProfileResponse(
-                id=existing.id,
-                name=existing.name,
-                weight=existing.weight,
-                spot=existing.spot,
-                company_ids=profile.company_ids or [],
-            )
-        except IntegrityError:
-            await session.rollback()
-            raise HTTPException(status_code=400, detail="Erro ao atualizar perfil")
+    try:
+        await session.commit()
+        # schedules reference the profile by id: a rename shows up in their history too
+        references.invalidate()
+        return CapacityProfileResponse(
+            id=existing.id,
+            name=existing.name,
+            weight=existing.weight,
+            spot=existing.spot,
+            company_ids=profile.company_ids or [],
+        )
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail="Erro ao atualizar perfil")
 
 @router.delete("/admin/profiles/{profile_id}")
-async def delete_profile(profile_id: int, authorized: bool = Depends(verify_admin)):
+@query_budget(2)
+async def delete_profile(profile_id: int, session: SessionDep, authorized: bool = Depends(verify_admin)):
     """Remove a capacity profile after ensuring it's safe to delete.
 
     - forbid deletion if the profile is still linked to any company
       (capacity_profile_companies) or used in existing schedules.
-    - clean up association rows before deleting the profile itself.
+    - existence and both usage checks are answered by a single query.
     """
-    async with async_session() as session:
-        # ensure profile exists
-        profile = await session.get(CapacityProfile, profile_id)
-        if not profile:
-            raise HTTPException(status_code=404, detail="Perfil não encontrado")
-
-        # check for company associations
-        from ..models import CapacityProfileCompany, ScheduleCapacity
-
-        assoc = await session.execute(
-            select(CapacityProfileCompany).where(
-                CapacityProfileCompany.profile_id == profile_id
-            )
+    linked = exists().where(CapacityProfileCompany.profile_id == CapacityProfile.id)
+    used = (
+        exists().where(ScheduleCapacity.profile_id == CapacityProfile.id)
+        | exists().where(ScheduleCategory.profile_id == CapacityProfile.id)
+    )
+    result = await session.execute(
+        select(linked, used).where(CapacityProfile.id == profile_id)
+    )
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+
+    is_linked, is_used = row
+    if is_linked:
+        raise HTTPException(
+            status_code=400,
+            detail="Perfil está vinculado a uma ou mais empresas. Remova a ligação antes de excluir."
         )
-        if assoc.scalars().first():
-            raise HTTPException(
-                status_code=400,
-                detail="Perfil está vinculado a uma ou mais empresas. Remova a ligação antes de excluir."
-            )
-
-        # check for schedules using this profile by name
-        used = await session.execute(
-            select(ScheduleCapacity).where(
-                ScheduleCapacity.profile_name == profile.name
-            )
+    if is_used:
+        raise HTTPException(
+            status_code=400,
+            detail="Perfil usado em agendamentos. Não é possível excluir."
         )
-        if used.scalars().first():
-            raise HTTPException(
-                status_code=400,
-                detail="Perfil usado em agendamentos. Não é possível excluir."
-            )
-
-        # safe to delete
-        await session.execute(delete(CapacityProfile).where(CapacityProfile.id == profile_id))
-        await session.commit()
-        return {"ok": True}
+
+    # safe to delete
+    await session.execute(delete(CapacityProfile).where(CapacityProfile.id == profile_id))
+    await session.commit()
+    references.invalidate()
+    return {"ok": True}
+
+# --- Diagnostics ---
+@router.get("/admin/timings")
+async def get_route_timings(authorized: bool = Depends(verify_admin)):
+    """Per-route latency histograms, SQL counts and payload sizes for this worker."""
+    return route_timings()
+
+@router.delete("/admin/timings")
+async def clear_route_timings(authorized: bool = Depends(verify_admin)):
+    reset_route_timings()
+    return {"ok": True}
+
+@router.get("/admin/pool")
+async def get_pool_stats(authorized: bool = Depends(verify_admin)):
+    """Connection pool usage for this worker (and the read replica, if any)."""
+    stats = pool_stats()
+    if database.replica_engine is not None:
+        stats["replica"] = {**pool_stats(database.replica_engine), "lag_seconds": database.replica_lag}
+    return stats
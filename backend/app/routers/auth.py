@@ -1,32 +1,77 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, HTTPException
+from sqlalchemy import select
 
-from ..auth import create_access_token, verify_password, get_user_by_username, ADMIN_PASSWORD, COLLAB_PASSWORD
-from ..schemas import LoginRequest
-from ..database import get_session
+from ..auth import (
+    issue_tokens,
+    hash_refresh_token,
+    rotate_refresh_token,
+    revoke_session,
+    verify_password_async,
+    hash_password_async,
+    password_needs_rehash,
+    get_user_by_username,
+    ADMIN_PASSWORD,
+    COLLAB_PASSWORD,
+)
+from ..models import RefreshToken
+from ..schemas import LoginRequest, RefreshRequest
+from ..database import SessionDep
+from ..instrumentation import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/auth/login")
-async def login(payload: LoginRequest, session: AsyncSession = Depends(get_session)):
+async def login(payload: LoginRequest, session: SessionDep):
     """
     Autentica usuário contra a tabela users ou usa senhas de ambiente (compatibilidade).
     """
     # Tentar autenticar contra a tabela users
     user = await get_user_by_username(payload.username, session)
-    
-    if user and verify_password(payload.password, user.password):
-        token = create_access_token({"role": user.role})
-        return {"access_token": token, "token_type": "bearer", "role": user.role}
+    # encerra a transação antes do bcrypt: a conexão volta ao pool e, no
+    # SQLite, o lock do BEGIN IMMEDIATE não fica preso durante o hash
+    await session.commit()
+
+    if user and await verify_password_async(payload.password, user.password):
+        # BCRYPT_ROUNDS mudou desde que a senha foi gravada: regrava com o custo atual
+        if password_needs_rehash(user.password):
+            try:
+                user.password = await hash_password_async(payload.password)
+            except HTTPException:
+                # pool de hashing cheio (429): a senha já conferiu, regrava no próximo login
+                pass
+            else:
+                await session.commit()
+        return await issue_tokens(session, user.role, user_id=user.id)
     
     # Fallback: compatibilidade com senhas antigas de ambiente
     if ADMIN_PASSWORD and payload.password == ADMIN_PASSWORD:
-        token = create_access_token({"role": "admin"})
-        return {"access_token": token, "token_type": "bearer", "role": "admin"}
+        return await issue_tokens(session, "admin")
     
     if COLLAB_PASSWORD and payload.password == COLLAB_PASSWORD:
-        token = create_access_token({"role": "collab"})
-        return {"access_token": token, "token_type": "bearer", "role": "collab"}
+        return await issue_tokens(session, "collab")
     
     raise HTTPException(status_code=401, detail="Usuário ou senha inválida")
+
+
+@router.post("/auth/refresh")
+async def refresh(payload: RefreshRequest, session: SessionDep):
+    """
+    Troca o refresh token por um novo par de tokens (rotação). É o único ponto
+    em que a revogação é consultada no banco.
+    """
+    return await rotate_refresh_token(session, payload.refresh_token)
+
+
+@router.post("/auth/logout")
+async def logout(payload: RefreshRequest, session: SessionDep):
+    """Revoga a sessão do refresh token informado (e os access tokens dela)."""
+    result = await session.execute(
+        select(RefreshToken.session_id).where(
+            RefreshToken.token_hash == hash_refresh_token(payload.refresh_token)
+        )
+    )
+    session_id = result.scalar()
+    if session_id is not None:
+        await revoke_session(session, session_id)
+    return {"ok": True}
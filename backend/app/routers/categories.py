@@ -1,8 +1,9 @@
 from fastapi import APIRouter
 
 from ..constants import CATEGORIES
+from ..instrumentation import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/categories")
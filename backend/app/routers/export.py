@@ -1,103 +1,118 @@
 from datetime import date
 from io import BytesIO
+import time
 from typing import Optional
 
-import openpyxl
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 
-from ..database import async_session
-from ..models import Schedule, ScheduleCategory
+from .. import metrics
+from ..auth import Principal, get_optional_principal
+from ..database import ReplicaSessionDep
+from ..hydration import load_schedules
+from ..instrumentation import TimedRoute, query_budget
+from ..query_guard import EXPORT_MAX_SCHEDULES, check_size, resolve_window
+from ..models import Company, Schedule
+from ..references import references_for
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/schedules/export")
+@query_budget(5)
 async def export_schedules(
+    session: ReplicaSessionDep,
     company_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    uf: Optional[str] = None
+    uf: Optional[str] = None,
+    principal: Optional[Principal] = Depends(get_optional_principal),
 ):
-    async with async_session() as session:
-        query = select(Schedule).options(
-            selectinload(Schedule.capacities),
-            selectinload(Schedule.capacities_spot),
-            selectinload(Schedule.categories).selectinload(ScheduleCategory.lost_plates),
-            selectinload(Schedule.company)
-        )
-
-        if company_id:
-            query = query.where(Schedule.company_id == company_id)
-        if start_date:
-            query = query.where(Schedule.schedule_date >= start_date)
-        if end_date:
-            query = query.where(Schedule.schedule_date <= end_date)
-        if uf:                              # aplica filtro de UF
-            query = query.where(Schedule.uf == uf)
-
-        query = query.order_by(Schedule.schedule_date.desc())
-
-        result = await session.execute(query)
-        schedules = result.scalars().all()
-
-        # Create Excel
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Agendamentos"
-
-        # Tabela 1: Categorias
-        headers_categories = [
-            "Data", "Empresa", "Categoria", "Quantidade", "Perfil", "Placas (Indisponíveis)"
-        ]
-        ws.append(headers_categories)
-
-        for schedule in schedules:
-            company_name = schedule.company.name
-            date_str = schedule.schedule_date.strftime("%d/%m/%Y")
-
-            for cat in schedule.categories:
-                plates = ", ".join([f"{lp.plate_number} ({lp.reason})" for lp in cat.lost_plates])
-                ws.append([
-                    date_str,
-                    company_name,
-                    cat.category_name,
-                    cat.count,
-                    cat.profile_name or "",
-                    plates if cat.category_name == "Indisponíveis" else "-"
-                ])
-
-        # Espaço entre tabelas
-        ws.append([])
-        ws.append([])
-
-        # Tabela 2: Disponibilidade normais
-        headers_capacities = [
-            "Data", "Empresa", "Perfil", "Veículos", "Disponibilidade (kg)"
-        ]
-        ws.append(headers_capacities)
-
-        for schedule in schedules:
-            company_name = schedule.company.name
-            date_str = schedule.schedule_date.strftime("%d/%m/%Y")
-
-            for cap in schedule.capacities:
-                ws.append([
-                    date_str,
-                    company_name,
-                    cap.profile_name,
-                    cap.vehicle_count,
-                    cap.total_weight_kg
-                ])
-
-        # Save to bytes
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-
-        return Response(
-            content=buffer.getvalue(),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": "attachment; filename=agendamentos.xlsx"}
-        )
+    started = time.perf_counter()
+    # janela padrão e período máximo do papel (app/query_guard.py)
+    start_date, end_date = resolve_window("export", principal, start_date, end_date)
+    # período como intervalo direto em schedule_date: com schedules particionada
+    # (partition_schedules.py) o Postgres só lê as partições dos meses pedidos
+    conditions = [Schedule.schedule_date >= start_date]
+    if company_id:
+        conditions.append(Schedule.company_id == company_id)
+    if end_date:
+        conditions.append(Schedule.schedule_date <= end_date)
+    if uf:                              # aplica filtro de UF
+        conditions.append(Schedule.uf == uf)
+
+    # a planilha é montada linha a linha: limite menor que o da listagem
+    await check_size(session, "export", conditions, start_date, end_date, limit=EXPORT_MAX_SCHEDULES)
+
+    # uma query com os filhos aninhados em JSON, sem objetos do ORM (app/hydration.py)
+    schedules = await load_schedules(session, *conditions)
+    company_names = dict((await session.execute(select(Company.id, Company.name))).all())
+    refs = await references_for(session, schedules)
+    # everything is loaded: give the connection back before the slow workbook build
+    await session.close()
+
+    # openpyxl is imported on first use: it is the slowest import of the app
+    import openpyxl
+
+    # Create Excel
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Agendamentos"
+
+    # Tabela 1: Categorias
+    headers_categories = [
+        "Data", "Empresa", "Categoria", "Quantidade", "Perfil", "Placas (Indisponíveis)"
+    ]
+    ws.append(headers_categories)
+
+    for schedule in schedules:
+        company_name = company_names[schedule.company_id]
+        date_str = schedule.schedule_date.strftime("%d/%m/%Y")
+
+        for cat in schedule.categories:
+            plates = ", ".join([f"{lp.plate_number} ({lp.reason})" for lp in cat.lost_plates])
+            category_name = refs.category(cat.category_id)
+            ws.append([
+                date_str,
+                company_name,
+                category_name,
+                cat.count,
+                refs.profile(cat.profile_id),
+                plates if category_name == "Indisponíveis" else "-"
+            ])
+
+    # Espaço entre tabelas
+    ws.append([])
+    ws.append([])
+
+    # Tabela 2: Disponibilidade normais
+    headers_capacities = [
+        "Data", "Empresa", "Perfil", "Veículos", "Disponibilidade (kg)"
+    ]
+    ws.append(headers_capacities)
+
+    for schedule in schedules:
+        company_name = company_names[schedule.company_id]
+        date_str = schedule.schedule_date.strftime("%d/%m/%Y")
+
+        for cap in schedule.capacities:
+            ws.append([
+                date_str,
+                company_name,
+                refs.profile(cap.profile_id),
+                cap.vehicle_count,
+                cap.total_weight_kg
+            ])
+
+    # Save to bytes
+    buffer = BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    content = buffer.getvalue()
+    metrics.observe_export("xlsx", time.perf_counter() - started, len(content), ws.max_row)
+
+    return Response(
+        content=content,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": "attachment; filename=agendamentos.xlsx"}
+    )
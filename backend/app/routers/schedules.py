@@ -1,23 +1,30 @@
 from datetime import date, datetime, timezone
-from typing import List, Optional
+from typing import Annotated, List, Literal, Optional
 
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import JSONResponse
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
-from ..auth import verify_collaborator, verify_admin
-from ..database import async_session
+from .. import history
+from ..auth import Principal, get_optional_principal, get_principal, verify_collaborator, verify_admin
+from ..columnar import encode_schedules
+from ..database import SessionDep, ReplicaSessionDep, WriteQueueDep
+from ..hydration import load_schedules
+from ..instrumentation import TimedRoute, query_budget
+from ..query_guard import check_size, resolve_window
+from ..references import References, get_references, references_for
 from ..models import (
     Company,
     Schedule,
     ScheduleCategory,
     ScheduleCapacity,
-    ScheduleCapacitySpot,
     LostPlate,
     CapacityProfile,
 )
 from ..schemas import (
     ScheduleCreate,
+    ScheduleHistoryEntry,
     ScheduleResponse,
     ScheduleCategoryResponse,
     ScheduleCapacityResponse,
@@ -26,11 +33,58 @@ from ..schemas import (
     LostPlateCreate,
 )
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+
+async def _load_profiles(session, profile_names: set) -> dict:
+    """Validate referenced profiles and return {name: (id, weight)} using a single query."""
+    if not profile_names:
+        return {}
+    result = await session.execute(
+        select(CapacityProfile.name, CapacityProfile.id, CapacityProfile.weight).where(CapacityProfile.name.in_(profile_names))
+    )
+    profiles = {name: (profile_id, weight) for name, profile_id, weight in result.all()}
+    missing = profile_names - profiles.keys()
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Perfis não encontrados: {', '.join(sorted(missing))}")
+    return profiles
+
+
+def _build_capacities(items, profiles: dict, spot: bool):
+    """ScheduleCapacity rows for the payload items, with their total weight and vehicle count."""
+    rows = []
+    for cap in items:
+        profile_id, weight = profiles[cap.profile_name]
+        rows.append(ScheduleCapacity(
+            profile_id=profile_id,
+            vehicle_count=cap.vehicle_count,
+            total_weight_kg=cap.vehicle_count * weight,
+            spot=spot,
+        ))
+    return rows, sum(r.total_weight_kg for r in rows), sum(r.vehicle_count for r in rows)
+
+
+async def _load_references(session, category_names: set, profile_names: set) -> References:
+    """Reference cache for the names in the payload (reloaded once if any is unknown to this worker)."""
+    refs = await get_references(session)
+    if not (category_names <= refs.category_ids.keys() and profile_names <= refs.profile_ids.keys()):
+        refs = await get_references(session, refresh=True)
+    missing = category_names - refs.category_ids.keys()
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Categorias não encontradas: {', '.join(sorted(missing))}")
+    return refs
 
 
 @router.post("/schedules", response_model=ScheduleResponse)
-async def create_schedule(schedule_data: ScheduleCreate, authorized: bool = Depends(verify_collaborator)):
+@query_budget(10)
+async def create_schedule(
+    schedule_data: ScheduleCreate,
+    # autenticação antes da fila: sem token a requisição não ocupa a vez de ninguém
+    authorized: Annotated[bool, Depends(verify_collaborator)],
+    principal: Annotated[Principal, Depends(get_principal)],
+    queued: WriteQueueDep,
+    session: SessionDep,
+):
     # Validate lost plates (now called "Indisponíveis")
     for cat in schedule_data.categories:
         if cat.category_name == "Indisponíveis":
@@ -54,110 +108,254 @@ async def create_schedule(schedule_data: ScheduleCreate, authorized: bool = Depe
                     detail="Para viagens perdidas, informe o perfil do veículo"
                 )
 
-    async with async_session() as session:
-        # Verificar se a empresa existe
-        company = await session.get(Company, schedule_data.company_id)
-        if not company:
-            raise HTTPException(status_code=404, detail="Empresa não encontrada. Tente recarregar a página para atualizar a lista de empresas.")
-
-        # gather referenced profile names from capacities and categories
-        profile_names = {c.profile_name for c in schedule_data.capacities}
-        profile_names.update({c.profile_name for c in schedule_data.capacities_spot})
-        # include profiles referenced on categories (eg. Perdidas)
-        profile_names.update({c.profile_name for c in schedule_data.categories if c.profile_name})
-        # remove empty strings
-        profile_names = {p for p in profile_names if p}
-
-        # validate that referenced profiles exist in DB
-        if profile_names:
-            q_exist = await session.execute(
-                select(CapacityProfile.name).where(CapacityProfile.name.in_(profile_names))
+    # Verificar se a empresa existe
+    company = await session.get(Company, schedule_data.company_id)
+    if not company:
+        raise HTTPException(status_code=404, detail="Empresa não encontrada. Tente recarregar a página para atualizar a lista de empresas.")
+
+    # gather referenced profile names from capacities and categories
+    profile_names = {c.profile_name for c in schedule_data.capacities}
+    profile_names.update({c.profile_name for c in schedule_data.capacities_spot})
+    # include profiles referenced on categories (eg. Perdidas)
+    profile_names.update({c.profile_name for c in schedule_data.categories if c.profile_name})
+    # remove empty strings
+    profile_names = {p for p in profile_names if p}
+
+    # validate that referenced profiles exist in DB and fetch their ids and weights
+    profiles = await _load_profiles(session, profile_names)
+    refs = await _load_references(session, {c.category_name for c in schedule_data.categories}, profile_names)
+
+    # Calculate total capacity (regular and spot) and prepare objects
+    capacities_to_add, total_capacity, _ = _build_capacities(schedule_data.capacities, profiles, spot=False)
+    capacities_spot_to_add, total_capacity_spot, total_vehicles_spot = _build_capacities(
+        schedule_data.capacities_spot, profiles, spot=True
+    )
+    total_vehicles = sum(cat.count for cat in schedule_data.categories if cat.category_name in ["Carros em rota", "Reentrega", "Em viagem", "Diária"])
+
+    # Create schedule
+    schedule = Schedule(
+        company_id=schedule_data.company_id,
+        uf=schedule_data.uf.upper(),
+        schedule_date=schedule_data.schedule_date,
+        categories=[
+            ScheduleCategory(
+                category_id=refs.category_ids[cat.category_name],
+                count=cat.count,
+                profile_id=profiles[cat.profile_name][0] if cat.profile_name else None,
+                lost_plates=[
+                    LostPlate(plate_number=lp.plate_number, reason=lp.reason)
+                    for lp in cat.lost_plates
+                ]
             )
-            existing = {r[0] for r in q_exist.all()}
-            missing = profile_names - existing
-            if missing:
-                raise HTTPException(status_code=400, detail=f"Perfis não encontrados: {', '.join(sorted(missing))}")
-        profile_weights = {}
-        if profile_names:
-            query = await session.execute(
-                select(CapacityProfile).where(CapacityProfile.name.in_(profile_names))
+            for cat in schedule_data.categories if cat.count > 0
+        ],
+        capacities=capacities_to_add,
+        capacities_spot=capacities_spot_to_add
+    )
+
+    session.add(schedule)
+    try:
+        # flush for the new id; the history entry goes in the same transaction
+        await session.flush()
+        await history.record(
+            session, schedule.id, "create", {}, history.snapshot(schedule, refs), principal.user_id, principal.role
+        )
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        print(f"Erro ao salvar agendamento: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro ao salvar no banco de dados: {str(e)}")
+
+    # ids were populated on flush and expire_on_commit=False keeps the
+    # collections in memory, so the response is built without re-fetching
+
+    result = ScheduleResponse(
+        id=schedule.id,
+        company_id=schedule.company_id,
+        uf=schedule.uf,
+        schedule_date=schedule.schedule_date,
+        created_at=schedule.created_at,
+        categories=[
+            ScheduleCategoryResponse(
+                id=cat.id,
+                category_name=refs.category(cat.category_id),
+                count=cat.count,
+                profile_name=refs.profile(cat.profile_id),
+                lost_plates=[LostPlateCreate(plate_number=lp.plate_number, reason=lp.reason) for lp in cat.lost_plates]
             )
-            for p in query.scalars().all():
-                profile_weights[p.name] = p.weight
-
-        # Calculate total capacity (regular) and prepare objects
-        total_capacity = 0
-        capacities_to_add = []
-        for cap in schedule_data.capacities:
-            weight = profile_weights.get(cap.profile_name, 0)
-            total_weight = cap.vehicle_count * weight
-            total_capacity += total_weight
-            capacities_to_add.append(
-                ScheduleCapacity(
-                    profile_name=cap.profile_name,
-                    vehicle_count=cap.vehicle_count,
-                    total_weight_kg=total_weight
-                )
+            for cat in schedule.categories
+        ],
+        capacities=[
+            ScheduleCapacityResponse(
+                id=cap.id,
+                profile_name=refs.profile(cap.profile_id),
+                vehicle_count=cap.vehicle_count,
+                total_weight_kg=cap.total_weight_kg
             )
-            
-        total_vehicles = sum(cat.count for cat in schedule_data.categories if cat.category_name in ["Carros em rota", "Reentrega", "Em viagem", "Diária"])
-
-        # Spot capacities
-        total_capacity_spot = 0
-        total_vehicles_spot = 0
-        capacities_spot_to_add = []
-        for cap in schedule_data.capacities_spot:
-            weight = profile_weights.get(cap.profile_name, 0)
-            total_weight = cap.vehicle_count * weight
-            total_capacity_spot += total_weight
-            total_vehicles_spot += cap.vehicle_count
-            capacities_spot_to_add.append(
-                ScheduleCapacitySpot(
-                    profile_name=cap.profile_name,
-                    vehicle_count=cap.vehicle_count,
-                    total_weight_kg=total_weight
-                )
+            for cap in schedule.capacities
+        ],
+        capacities_spot=[
+            ScheduleCapacitySpotResponse(
+                id=cap.id,
+                profile_name=refs.profile(cap.profile_id),
+                vehicle_count=cap.vehicle_count,
+                total_weight_kg=cap.total_weight_kg
             )
+            for cap in schedule.capacities_spot
+        ],
+        total_capacity_kg=total_capacity,
+        total_capacity_spot_kg=total_capacity_spot,
+        total_vehicles=total_vehicles,
+        total_vehicles_spot=total_vehicles_spot
+    )
 
-        # Create schedule
-        schedule = Schedule(
-            company_id=schedule_data.company_id,
-            uf=schedule_data.uf.upper(),
-            schedule_date=schedule_data.schedule_date,
-            categories=[
-                ScheduleCategory(
-                    category_name=cat.category_name,
-                    count=cat.count,
-                    profile_name=cat.profile_name or "",
-                    lost_plates=[
-                        LostPlate(plate_number=lp.plate_number, reason=lp.reason)
-                        for lp in cat.lost_plates
-                    ]
+    return result
+
+
+@router.put("/schedules/{schedule_id}", response_model=ScheduleResponse)
+@query_budget(18)
+async def update_schedule(
+    schedule_id: int,
+    schedule_data: ScheduleCreate,
+    authorized: Annotated[bool, Depends(verify_admin)],
+    principal: Annotated[Principal, Depends(get_principal)],
+    queued: WriteQueueDep,
+    session: SessionDep,
+):
+    # Only admin can update past schedules
+    # Validate similar rules as creation
+    for cat in schedule_data.categories:
+        if cat.category_name == "Indisponíveis":
+            if cat.count != len(cat.lost_plates):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Para {cat.count} viagens indisponíveis, informe {cat.count} placas e motivos"
                 )
-                for cat in schedule_data.categories if cat.count > 0
-            ],
-            capacities=capacities_to_add,
-            capacities_spot=capacities_spot_to_add
+            for lp in cat.lost_plates:
+                if not lp.plate_number.strip() or not lp.reason.strip():
+                    raise HTTPException(status_code=400, detail="Cada viagem indisponível precisa de placa e motivo")
+        if cat.category_name == "Perdidas":
+            if not cat.profile_name or not cat.profile_name.strip():
+                raise HTTPException(status_code=400, detail="Para viagens perdidas, informe o perfil do veículo")
+
+    # load schedule with relationships
+    query = select(Schedule).where(Schedule.id == schedule_id).options(
+        selectinload(Schedule.categories).selectinload(ScheduleCategory.lost_plates),
+        selectinload(Schedule.all_capacities)
+    )
+    result_exec = await session.execute(query)
+    schedule = result_exec.scalars().first()
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Agendamento não encontrado")
+
+    # gather referenced profile names from capacities and categories for validation
+    profile_names = {c.profile_name for c in schedule_data.capacities}
+    profile_names.update({c.profile_name for c in schedule_data.capacities_spot})
+    profile_names.update({c.profile_name for c in schedule_data.categories if c.profile_name})
+    profile_names = {p for p in profile_names if p}
+
+    # validate existence of referenced profiles and lookup ids/weights for capacity calculations
+    profiles = await _load_profiles(session, profile_names)
+    refs = await _load_references(session, {c.category_name for c in schedule_data.categories}, profile_names)
+    # previous state for the history (its ids may predate this worker's cache)
+    before = history.snapshot(schedule, await references_for(session, [schedule]))
+
+    # build new relations
+    capacities_to_add, total_capacity, _ = _build_capacities(schedule_data.capacities, profiles, spot=False)
+    capacities_spot_to_add, total_capacity_spot, total_vehicles_spot = _build_capacities(
+        schedule_data.capacities_spot, profiles, spot=True
+    )
+    total_vehicles = sum(cat.count for cat in schedule_data.categories if cat.category_name in ["Carros em rota", "Reentrega", "Em viagem", "Diária"])
+
+    # categories
+    categories_to_add = []
+    for cat in schedule_data.categories:
+        categories_to_add.append(
+            ScheduleCategory(
+                category_id=refs.category_ids[cat.category_name],
+                count=cat.count,
+                profile_id=profiles[cat.profile_name][0] if cat.profile_name else None,
+                lost_plates=[LostPlate(plate_number=lp.plate_number, reason=lp.reason) for lp in cat.lost_plates]
+            )
         )
 
-        session.add(schedule)
-        try:
-            await session.commit()
-        except Exception as e:
-            await session.rollback()
-            print(f"Erro ao salvar agendamento: {e}")
-            raise HTTPException(status_code=500, detail=f"Erro ao salvar no banco de dados: {str(e)}")
-
-        # Re-fetch with relationships loaded
-        query = select(Schedule).where(Schedule.id == schedule.id).options(
-            selectinload(Schedule.categories).selectinload(ScheduleCategory.lost_plates),
-            selectinload(Schedule.capacities),
-            selectinload(Schedule.capacities_spot)
+    # apply updates
+    schedule.uf = schedule_data.uf.upper()
+    schedule.schedule_date = schedule_data.schedule_date
+    schedule.categories = categories_to_add
+    schedule.capacities = capacities_to_add
+    schedule.capacities_spot = capacities_spot_to_add
+    schedule.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    session.add(schedule)
+    try:
+        await history.record(
+            session, schedule.id, "update", before, history.snapshot(schedule, refs), principal.user_id, principal.role
         )
-        result_exec = await session.execute(query)
-        schedule = result_exec.scalars().first()
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        print(f"Erro ao atualizar agendamento: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro ao atualizar no banco: {str(e)}")
+
+    # the new collections are still in memory with their ids; no re-fetch needed
+
+    return ScheduleResponse(
+        id=schedule.id,
+        company_id=schedule.company_id,
+        uf=schedule.uf,
+        schedule_date=schedule.schedule_date,
+        created_at=schedule.created_at,
+        updated_at=schedule.updated_at,
+        categories=[ScheduleCategoryResponse(id=cat.id, category_name=refs.category(cat.category_id), count=cat.count, profile_name=refs.profile(cat.profile_id), lost_plates=[LostPlateCreate(plate_number=lp.plate_number, reason=lp.reason) for lp in cat.lost_plates]) for cat in schedule.categories],
+        capacities=[ScheduleCapacityResponse(id=cap.id, profile_name=refs.profile(cap.profile_id), vehicle_count=cap.vehicle_count, total_weight_kg=cap.total_weight_kg) for cap in schedule.capacities],
+        capacities_spot=[ScheduleCapacitySpotResponse(id=cap.id, profile_name=refs.profile(cap.profile_id), vehicle_count=cap.vehicle_count, total_weight_kg=cap.total_weight_kg) for cap in schedule.capacities_spot],
+        total_capacity_kg=total_capacity,
+        total_capacity_spot_kg=total_capacity_spot,
+        total_vehicles=total_vehicles,
+        total_vehicles_spot=total_vehicles_spot
+    )
+
 
-        result = ScheduleResponse(
+@router.get("/schedules", response_model=List[ScheduleResponse])
+@query_budget(4)
+async def get_schedules(
+    session: ReplicaSessionDep,
+    company_id: Optional[int] = None,
+    uf: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    format: Literal["json", "columnar"] = "json",
+    principal: Optional[Principal] = Depends(get_optional_principal),
+):
+    # default window, max range per role and a COUNT before long periods (app/query_guard.py)
+    start_date, end_date = resolve_window("schedules", principal, start_date, end_date)
+    conditions = [Schedule.schedule_date >= start_date]
+    if company_id:
+        conditions.append(Schedule.company_id == company_id)
+    if uf:
+        conditions.append(Schedule.uf == uf.upper())
+    if end_date:
+        conditions.append(Schedule.schedule_date <= end_date)
+    await check_size(session, "schedules", conditions, start_date, end_date)
+
+    # one query with the children nested as JSON, no ORM objects (app/hydration.py)
+    schedules = await load_schedules(session, *conditions)
+    refs = await references_for(session, schedules)
+
+    if format == "columnar":
+        # colunas com tabelas de strings (ver app/columnar.py), sem passar pelo pydantic
+        return JSONResponse(encode_schedules(schedules, refs))
+
+    active = refs.category_id_set(["Carros em rota", "Reentrega", "Em viagem", "Diária"])
+    response = []
+    for schedule in schedules:
+        total_capacity = sum(cap.total_weight_kg for cap in schedule.capacities)
+        total_vehicles = sum(cat.count for cat in schedule.categories if cat.category_id in active)
+        total_capacity_spot = sum(cap.total_weight_kg for cap in schedule.capacities_spot)
+        total_vehicles_spot = sum(cap.vehicle_count for cap in schedule.capacities_spot)
+
+        response.append(ScheduleResponse(
             id=schedule.id,
             company_id=schedule.company_id,
             uf=schedule.uf,
@@ -166,9 +364,9 @@ async def create_schedule(schedule_data: ScheduleCreate, authorized: bool = Depe
             categories=[
                 ScheduleCategoryResponse(
                     id=cat.id,
-                    category_name=cat.category_name,
+                    category_name=refs.category(cat.category_id),
                     count=cat.count,
-                    profile_name=cat.profile_name,
+                    profile_name=refs.profile(cat.profile_id),
                     lost_plates=[LostPlateCreate(plate_number=lp.plate_number, reason=lp.reason) for lp in cat.lost_plates]
                 )
                 for cat in schedule.categories
@@ -176,7 +374,7 @@ async def create_schedule(schedule_data: ScheduleCreate, authorized: bool = Depe
             capacities=[
                 ScheduleCapacityResponse(
                     id=cap.id,
-                    profile_name=cap.profile_name,
+                    profile_name=refs.profile(cap.profile_id),
                     vehicle_count=cap.vehicle_count,
                     total_weight_kg=cap.total_weight_kg
                 )
@@ -185,7 +383,7 @@ async def create_schedule(schedule_data: ScheduleCreate, authorized: bool = Depe
             capacities_spot=[
                 ScheduleCapacitySpotResponse(
                     id=cap.id,
-                    profile_name=cap.profile_name,
+                    profile_name=refs.profile(cap.profile_id),
                     vehicle_count=cap.vehicle_count,
                     total_weight_kg=cap.total_weight_kg
                 )
@@ -195,214 +393,17 @@ async def create_schedule(schedule_data: ScheduleCreate, authorized: bool = Depe
             total_capacity_spot_kg=total_capacity_spot,
             total_vehicles=total_vehicles,
             total_vehicles_spot=total_vehicles_spot
-        )
-
-        return result
-
-
-@router.put("/schedules/{schedule_id}", response_model=ScheduleResponse)
-async def update_schedule(schedule_id: int, schedule_data: ScheduleCreate, authorized: bool = Depends(verify_admin)):
-    # Only admin can update past schedules
-    # Validate similar rules as creation
-    for cat in schedule_data.categories:
-        if cat.category_name == "Indisponíveis":
-            if cat.count != len(cat.lost_plates):
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Para {cat.count} viagens indisponíveis, informe {cat.count} placas e motivos"
-                )
-            for lp in cat.lost_plates:
-                if not lp.plate_number.strip() or not lp.reason.strip():
-                    raise HTTPException(status_code=400, detail="Cada viagem indisponível precisa de placa e motivo")
-        if cat.category_name == "Perdidas":
-            if not cat.profile_name or not cat.profile_name.strip():
-                raise HTTPException(status_code=400, detail="Para viagens perdidas, informe o perfil do veículo")
-
-    async with async_session() as session:
-        # load schedule with relationships
-        query = select(Schedule).where(Schedule.id == schedule_id).options(
-            selectinload(Schedule.categories).selectinload(ScheduleCategory.lost_plates),
-            selectinload(Schedule.capacities),
-            selectinload(Schedule.capacities_spot)
-        )
-        result_exec = await session.execute(query)
-        schedule = result_exec.scalars().first()
-        if not schedule:
-            raise HTTPException(status_code=404, detail="Agendamento não encontrado")
-
-        # gather referenced profile names from capacities and categories for validation
-        profile_names = {c.profile_name for c in schedule_data.capacities}
-        profile_names.update({c.profile_name for c in schedule_data.capacities_spot})
-        profile_names.update({c.profile_name for c in schedule_data.categories if c.profile_name})
-        profile_names = {p for p in profile_names if p}
-
-        # validate existence of referenced profiles
-        if profile_names:
-            q_exist = await session.execute(
-                select(CapacityProfile.name).where(CapacityProfile.name.in_(profile_names))
-            )
-            existing = {r[0] for r in q_exist.all()}
-            missing = profile_names - existing
-            if missing:
-                raise HTTPException(status_code=400, detail=f"Perfis não encontrados: {', '.join(sorted(missing))}")
-
-        # lookup profile weights for capacity calculations
-        profile_weights = {}
-        cap_names = {c.profile_name for c in schedule_data.capacities}.union({c.profile_name for c in schedule_data.capacities_spot})
-        cap_names = {p for p in cap_names if p}
-        if cap_names:
-            q = await session.execute(select(CapacityProfile).where(CapacityProfile.name.in_(cap_names)))
-            for p in q.scalars().all():
-                profile_weights[p.name] = p.weight
-
-        # build new relations
-        capacities_to_add = []
-        total_capacity = 0
-        for cap in schedule_data.capacities:
-            weight = profile_weights.get(cap.profile_name, 0)
-            total_weight = cap.vehicle_count * weight
-            total_capacity += total_weight
-            capacities_to_add.append(ScheduleCapacity(profile_name=cap.profile_name, vehicle_count=cap.vehicle_count, total_weight_kg=total_weight))
-            
-        total_vehicles = sum(cat.count for cat in schedule_data.categories if cat.category_name in ["Carros em rota", "Reentrega", "Em viagem", "Diária"])
-
-        capacities_spot_to_add = []
-        total_capacity_spot = 0
-        total_vehicles_spot = 0
-        for cap in schedule_data.capacities_spot:
-            weight = profile_weights.get(cap.profile_name, 0)
-            total_weight = cap.vehicle_count * weight
-            total_capacity_spot += total_weight
-            total_vehicles_spot += cap.vehicle_count
-            capacities_spot_to_add.append(ScheduleCapacitySpot(profile_name=cap.profile_name, vehicle_count=cap.vehicle_count, total_weight_kg=total_weight))
-
-        # categories
-        categories_to_add = []
-        for cat in schedule_data.categories:
-            categories_to_add.append(
-                ScheduleCategory(
-                    category_name=cat.category_name,
-                    count=cat.count,
-                    profile_name=cat.profile_name or "",
-                    lost_plates=[LostPlate(plate_number=lp.plate_number, reason=lp.reason) for lp in cat.lost_plates]
-                )
-            )
-
-        # apply updates
-        schedule.uf = schedule_data.uf.upper()
-        schedule.schedule_date = schedule_data.schedule_date
-        schedule.categories = categories_to_add
-        schedule.capacities = capacities_to_add
-        schedule.capacities_spot = capacities_spot_to_add
-        schedule.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
-
-        session.add(schedule)
-        try:
-            await session.commit()
-        except Exception as e:
-            await session.rollback()
-            print(f"Erro ao atualizar agendamento: {e}")
-            raise HTTPException(status_code=500, detail=f"Erro ao atualizar no banco: {str(e)}")
-
-        # re-fetch for response
-        resq = select(Schedule).where(Schedule.id == schedule.id).options(
-            selectinload(Schedule.categories).selectinload(ScheduleCategory.lost_plates),
-            selectinload(Schedule.capacities),
-            selectinload(Schedule.capacities_spot)
-        )
-        r = await session.execute(resq)
-        schedule = r.scalars().first()
-
-        return ScheduleResponse(
-            id=schedule.id,
-            company_id=schedule.company_id,
-            uf=schedule.uf,
-            schedule_date=schedule.schedule_date,
-            created_at=schedule.created_at,
-            updated_at=schedule.updated_at,
-            categories=[ScheduleCategoryResponse(id=cat.id, category_name=cat.category_name, count=cat.count, profile_name=cat.profile_name, lost_plates=[LostPlateCreate(plate_number=lp.plate_number, reason=lp.reason) for lp in cat.lost_plates]) for cat in schedule.categories],
-            capacities=[ScheduleCapacityResponse(id=cap.id, profile_name=cap.profile_name, vehicle_count=cap.vehicle_count, total_weight_kg=cap.total_weight_kg) for cap in schedule.capacities],
-            capacities_spot=[ScheduleCapacitySpotResponse(id=cap.id, profile_name=cap.profile_name, vehicle_count=cap.vehicle_count, total_weight_kg=cap.total_weight_kg) for cap in schedule.capacities_spot],
-            total_capacity_kg=total_capacity,
-            total_capacity_spot_kg=total_capacity_spot,
-            total_vehicles=total_vehicles,
-            total_vehicles_spot=total_vehicles_spot
-        )
+        ))
 
+    return response
 
-@router.get("/schedules", response_model=List[ScheduleResponse])
-async def get_schedules(
-    company_id: Optional[int] = None,
-    uf: Optional[str] = None,
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None
-):
-    async with async_session() as session:
-        query = select(Schedule).options(
-            selectinload(Schedule.categories).selectinload(ScheduleCategory.lost_plates),
-            selectinload(Schedule.capacities),
-            selectinload(Schedule.capacities_spot)
-        )
 
-        if company_id:
-            query = query.where(Schedule.company_id == company_id)
-        if uf:
-            query = query.where(Schedule.uf == uf.upper())
-        if start_date:
-            query = query.where(Schedule.schedule_date >= start_date)
-        if end_date:
-            query = query.where(Schedule.schedule_date <= end_date)
-
-        query = query.order_by(Schedule.schedule_date.desc())
-
-        result = await session.execute(query)
-        schedules = result.scalars().all()
-
-        response = []
-        for schedule in schedules:
-            total_capacity = sum(cap.total_weight_kg for cap in schedule.capacities)
-            total_vehicles = sum(cat.count for cat in schedule.categories if cat.category_name in ["Carros em rota", "Reentrega", "Em viagem", "Diária"])
-            total_capacity_spot = sum(cap.total_weight_kg for cap in schedule.capacities_spot)
-            total_vehicles_spot = sum(cap.vehicle_count for cap in schedule.capacities_spot)
-
-            response.append(ScheduleResponse(
-                id=schedule.id,
-                company_id=schedule.company_id,
-                uf=schedule.uf,
-                schedule_date=schedule.schedule_date,
-                created_at=schedule.created_at,
-                categories=[
-                    ScheduleCategoryResponse(
-                        id=cat.id,
-                        category_name=cat.category_name,
-                        count=cat.count,
-                        profile_name=cat.profile_name,
-                        lost_plates=[LostPlateCreate(plate_number=lp.plate_number, reason=lp.reason) for lp in cat.lost_plates]
-                    )
-                    for cat in schedule.categories
-                ],
-                capacities=[
-                    ScheduleCapacityResponse(
-                        id=cap.id,
-                        profile_name=cap.profile_name,
-                        vehicle_count=cap.vehicle_count,
-                        total_weight_kg=cap.total_weight_kg
-                    )
-                    for cap in schedule.capacities
-                ],
-                capacities_spot=[
-                    ScheduleCapacitySpotResponse(
-                        id=cap.id,
-                        profile_name=cap.profile_name,
-                        vehicle_count=cap.vehicle_count,
-                        total_weight_kg=cap.total_weight_kg
-                    )
-                    for cap in schedule.capacities_spot
-                ],
-                total_capacity_kg=total_capacity,
-                total_capacity_spot_kg=total_capacity_spot,
-                total_vehicles=total_vehicles,
-                total_vehicles_spot=total_vehicles_spot
-            ))
-
-        return response
+@router.get("/schedules/{schedule_id}/history", response_model=List[ScheduleHistoryEntry])
+@query_budget(2)
+async def get_schedule_history(schedule_id: int, session: ReplicaSessionDep, authorized: bool = Depends(verify_admin)):
+    """Alterações do agendamento, mais antigas primeiro (ver app/history.py)."""
+    entries = await history.load_history(session, schedule_id)
+    # agendamentos anteriores ao histórico não têm entradas
+    if not entries and await session.get(Schedule, schedule_id) is None:
+        raise HTTPException(status_code=404, detail="Agendamento não encontrado")
+    return entries
@@ -13,6 +13,10 @@ class LoginRequest(BaseModel):
     password: str
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
 class ScheduleCategoryCreate(BaseModel):
     category_name: str
     count: int
@@ -39,6 +43,12 @@ class ScheduleCreate(BaseModel):
     capacities_spot: List[ScheduleCapacitySpotCreate] = []
 
 
+class ScheduleImport(ScheduleCreate):
+    """Linha do import_schedules.py: datas originais opcionais (padrão: o horário da carga)."""
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
 class ScheduleCategoryResponse(BaseModel):
     id: int
     category_name: str
@@ -89,6 +99,16 @@ class ScheduleResponse(BaseModel):
         from_attributes = True
 
 
+class ScheduleHistoryEntry(BaseModel):
+    id: int
+    changed_at: datetime
+    action: str
+    user_id: Optional[int] = None
+    username: Optional[str] = None
+    role: Optional[str] = None
+    changes: dict
+
+
 class CompanyCreate(BaseModel):
     name: str
     vehicle_goal: Optional[int] = 0
@@ -0,0 +1,215 @@
+"""Arquivos estáticos do frontend (build do Vite copiado para ``backend/static``).
+
+Tudo é lido para a memória uma única vez: servir um asset ou a SPA não
+custa nenhum acesso ao disco. Para cada arquivo são usadas as variantes
+``.br``/``.gz`` geradas no build por ``compress_static.py``, escolhidas
+pelo ``Accept-Encoding`` do navegador.
+
+- ``/assets``: nomes com hash do Vite (``index-3fa9c1d2.js``) recebem
+  ``Cache-Control: immutable`` de um ano; os demais são revalidados.
+- ``index.html``: servido para ``/`` e para as rotas da SPA com ETag e
+  ``no-cache``, então o navegador só baixa de novo após um deploy.
+
+Brotli requer o pacote ``brotli``; sem ele só há gzip.
+"""
+from dataclasses import dataclass, field
+import gzip
+import hashlib
+import mimetypes
+from pathlib import Path
+import re
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+
+# Vite acrescenta 8 caracteres de hash (base64url) ao nome: index-BqS7xk2a.js.
+# Exatamente 8 e com algum dígito ou maiúscula, para "logo-original.png" não
+# passar por hash (um hash só de minúsculas, raro, apenas perde o immutable)
+HASHED_NAME = re.compile(r"-(?=[\w-]{0,7}[A-Z0-9])[A-Za-z0-9_-]{8}\.\w+$")
+COMPRESSIBLE = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".ico"}
+MIN_COMPRESS_SIZE = 1024
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# preferência do servidor entre as codificações aceitas
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+@dataclass
+class StaticFile:
+    content_type: str
+    etag: str
+    cache_control: str
+    # codificação ("identity", "br", "gzip") -> conteúdo
+    bodies: Dict[str, bytes] = field(default_factory=dict)
+
+
+def _content_type(path: Path) -> str:
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/javascript", "image/svg+xml"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def load_file(path: Path, cache_control: str, compress: bool = False) -> StaticFile:
+    """Lê o arquivo e as variantes pré-comprimidas; ``compress`` gera as que faltarem."""
+    data = path.read_bytes()
+    static_file = StaticFile(
+        content_type=_content_type(path),
+        etag='"' + hashlib.sha1(data).hexdigest()[:20] + '"',
+        cache_control=cache_control,
+        bodies={"identity": data},
+    )
+    for encoding, suffix in ENCODINGS:
+        variant = path.with_name(path.name + suffix)
+        if variant.is_file():
+            static_file.bodies[encoding] = variant.read_bytes()
+        elif compress:
+            compressed = _compress(data, encoding)
+            if compressed is not None:
+                static_file.bodies[encoding] = compressed
+    return static_file
+
+
+def _compress(data: bytes, encoding: str) -> Optional[bytes]:
+    if encoding == "br":
+        if brotli is None:
+            return None
+        compressed = brotli.compress(data, quality=11)
+    else:
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    # não vale a pena servir variantes que quase não economizam
+    return compressed if len(compressed) < len(data) * 0.9 else None
+
+
+def accepted_encodings(scope) -> Dict[str, float]:
+    """``Accept-Encoding`` como {codificação: q}."""
+    for name, value in scope.get("headers", []):
+        if name == b"accept-encoding":
+            accepted = {}
+            for item in value.decode("latin-1").lower().split(","):
+                coding, _, params = item.strip().partition(";")
+                q = 1.0
+                if params.strip().startswith("q="):
+                    try:
+                        q = float(params.strip()[2:])
+                    except ValueError:
+                        q = 0.0
+                accepted[coding.strip()] = q
+            return accepted
+    return {}
+
+
+def _choose_encoding(scope, static_file: StaticFile) -> str:
+    accepted = accepted_encodings(scope)
+    for encoding, _ in ENCODINGS:
+        if encoding in static_file.bodies and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value
+    return None
+
+
+def _etag(static_file: StaticFile, encoding: str) -> str:
+    """ETag forte por representação: ``"<sha1>"``, ``"<sha1>-br"``, ``"<sha1>-gzip"``."""
+    if encoding == "identity":
+        return static_file.etag
+    return static_file.etag[:-1] + f'-{encoding}"'
+
+
+def build_response(scope, static_file: StaticFile) -> Response:
+    encoding = _choose_encoding(scope, static_file)
+    headers = {
+        "etag": _etag(static_file, encoding),
+        "cache-control": static_file.cache_control,
+    }
+    if len(static_file.bodies) > 1:
+        headers["vary"] = "Accept-Encoding"
+    if_none_match = _header(scope, b"if-none-match")
+    if if_none_match is not None and headers["etag"].encode() in if_none_match:
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["content-encoding"] = encoding
+    body = static_file.bodies[encoding]
+    if scope.get("method") == "HEAD":
+        headers["content-length"] = str(len(body))
+        body = b""
+    return Response(body, headers=headers, media_type=static_file.content_type)
+
+
+class AssetFiles:
+    """Substitui o ``StaticFiles`` em ``/assets`` com o diretório indexado na memória."""
+
+    def __init__(self, directory: Path):
+        self.files: Dict[str, StaticFile] = {}
+        variant_suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        for path in sorted(Path(directory).rglob("*")):
+            if not path.is_file() or path.name.endswith(variant_suffixes):
+                continue
+            cache_control = IMMUTABLE if HASHED_NAME.search(path.name) else REVALIDATE
+            relative = path.relative_to(directory).as_posix()
+            self.files[relative] = load_file(path, cache_control)
+
+    async def __call__(self, scope, receive, send):
+        # o Mount deixa o prefixo em root_path (mesma lógica do StaticFiles)
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if path.startswith(root_path):
+            path = path[len(root_path):]
+        static_file = self.files.get(path.lstrip("/"))
+        if static_file is None or scope.get("method") not in ("GET", "HEAD"):
+            response = Response("Not Found", status_code=404, media_type="text/plain")
+        else:
+            response = build_response(scope, static_file)
+        await response(scope, receive, send)
+
+
+class SpaIndex:
+    """``index.html`` carregado uma vez, comprimido na memória se o build não trouxe variantes."""
+
+    def __init__(self, path: Path = STATIC_DIR / "index.html"):
+        self.file = load_file(path, REVALIDATE, compress=True) if path.is_file() else None
+
+    def response(self, request: Request) -> Optional[Response]:
+        if self.file is None:
+            return None
+        return build_response(request.scope, self.file)
+
+
+def compress_directory(directory: Path) -> None:
+    """Gera ``.br``/``.gz`` ao lado dos arquivos comprimíveis (etapa de build)."""
+    before = after = 0
+    for path in sorted(Path(directory).rglob("*")):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE:
+            continue
+        data = path.read_bytes()
+        if len(data) < MIN_COMPRESS_SIZE:
+            continue
+        best = len(data)
+        for encoding, suffix in ENCODINGS:
+            compressed = _compress(data, encoding)
+            if compressed is not None:
+                path.with_name(path.name + suffix).write_bytes(compressed)
+                best = min(best, len(compressed))
+        before += len(data)
+        after += best
+        print(f"{path.relative_to(directory)}: {len(data)} -> {best} bytes")
+    if before:
+        print(f"Total: {before} -> {after} bytes ({after / before:.0%})")
+    if brotli is None:
+        print("AVISO: pacote 'brotli' não instalado, apenas .gz foi gerado")
@@ -0,0 +1,151 @@
+"""Detector de bloqueio do event loop (modo debug).
+
+Uma thread separada acompanha um "heartbeat" agendado no event loop. Se o
+heartbeat atrasa mais que ``BLOCKING_THRESHOLD_MS`` é porque algum código
+síncrono está segurando o loop (bcrypt, openpyxl, agregações grandes...):
+a thread registra no log a rota da requisição em execução e a pilha da
+thread do loop naquele instante, e incrementa
+``logisched_event_loop_blocked_total``.
+
+Ativado com ``BLOCKING_WATCHDOG=true`` (ou ``DEBUG=true``).
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+from fastapi import FastAPI
+
+from . import metrics
+from .instrumentation import route_template
+
+logger = logging.getLogger("logisched.watchdog")
+
+WATCHDOG_ENABLED = (
+    os.getenv("BLOCKING_WATCHDOG", os.getenv("DEBUG", "false")).lower() == "true"
+)
+BLOCKING_THRESHOLD_MS = float(os.getenv("BLOCKING_THRESHOLD_MS", 100))
+STACK_DEPTH = int(os.getenv("BLOCKING_STACK_DEPTH", 8))
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# task -> scope da requisição que ela está atendendo
+_active_scopes: "weakref.WeakKeyDictionary[asyncio.Task, dict]" = weakref.WeakKeyDictionary()
+
+
+class BlockingWatchdogMiddleware:
+    """Associa cada task à requisição para o watchdog saber qual rota bloqueou."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            task = asyncio.current_task()
+            if task is not None:
+                _active_scopes[task] = scope
+        await self.app(scope, receive, send)
+
+
+class LoopWatchdog:
+    def __init__(self, threshold_ms: float = BLOCKING_THRESHOLD_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = self.threshold / 4
+        self.loop = None
+        self.loop_thread_id = None
+        self.last_beat = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._handle = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.perf_counter()
+        self._beat()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _beat(self) -> None:
+        self.last_beat = time.perf_counter()
+        self._handle = self.loop.call_later(self.interval, self._beat)
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            beat = self.last_beat
+            stalled = time.perf_counter() - beat
+            # relata cada travamento uma única vez, no momento em que passa do limiar
+            if stalled < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            self._report(stalled)
+
+    def _report(self, stalled: float) -> None:
+        route = "other"
+        task = asyncio.current_task(self.loop)
+        scope = _active_scopes.get(task) if task is not None else None
+        if scope is not None:
+            route = f"{scope.get('method', '')} {route_template(scope)}"
+        metrics.EVENT_LOOP_BLOCKED.labels(route).inc()
+
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = "".join(traceback.format_list(_interesting_frames(frame))) if frame else ""
+        if task is not None:
+            # código síncrono rodando via greenlet (SQLAlchemy) não mostra o
+            # endpoint na pilha da thread; a pilha da coroutine mostra
+            awaiting = [
+                fs for fs in traceback.StackSummary.extract(
+                    (f, f.f_lineno) for f in task.get_stack()
+                )
+                if fs.filename.startswith(APP_DIR) and "site-packages" not in fs.filename
+            ]
+            if awaiting:
+                stack = "".join(traceback.format_list(awaiting)) + stack
+        logger.warning(
+            "Event loop bloqueado há %.0f ms (limiar %.0f ms) em %s\n%s",
+            stalled * 1000, self.threshold * 1000, route, stack,
+        )
+
+
+def _interesting_frames(frame) -> traceback.StackSummary:
+    """Frames do nosso código (backend/) mais os ``STACK_DEPTH`` mais internos."""
+    summary = traceback.extract_stack(frame)
+    innermost = len(summary) - STACK_DEPTH
+    return traceback.StackSummary.from_list([
+        fs for i, fs in enumerate(summary)
+        if i >= innermost or (fs.filename.startswith(APP_DIR) and "site-packages" not in fs.filename)
+    ])
+
+
+_watchdog: LoopWatchdog | None = None
+
+
+def install(app: FastAPI) -> None:
+    """Adiciona o middleware de rastreio quando o watchdog está ativo."""
+    if WATCHDOG_ENABLED:
+        app.add_middleware(BlockingWatchdogMiddleware)
+
+
+def start() -> None:
+    global _watchdog
+    if WATCHDOG_ENABLED and _watchdog is None:
+        _watchdog = LoopWatchdog()
+        _watchdog.start(asyncio.get_running_loop())
+
+
+def stop() -> None:
+    global _watchdog
+    if _watchdog is not None:
+        _watchdog.stop()
+        _watchdog = None
@@ -0,0 +1,151 @@
+"""Arquiva períodos fechados: tira agendamentos antigos das tabelas ativas.
+
+Os agendamentos com ``schedule_date`` anterior a ``--before`` (primeiro dia
+de um mês já encerrado) são gravados, com categorias, placas e capacidades,
+e removidos das tabelas ativas, um mês por transação:
+
+- ``--to table`` (padrão): uma linha por agendamento em ``schedule_archive``,
+  com o estado em JSON no formato de ``history.snapshot``;
+- ``--to file``: um ``schedules_AAAA-MM.jsonl.gz`` por mês em ``--dir``
+  (o arquivo é gravado e sincronizado antes de apagar as linhas).
+
+Com ``schedules`` particionada (``partition_schedules.py``) as partições dos
+meses esvaziados são removidas. O histórico de alterações
+(``schedule_history``) não é tocado.
+
+Uso (a partir de backend/):
+    python archive_schedules.py --before 2025-01-01 --dry-run
+    python archive_schedules.py --before 2025-01-01
+    python archive_schedules.py --before 2025-01-01 --to file --dir archive
+"""
+import argparse
+import asyncio
+from datetime import date
+import gzip
+import json
+import os
+import sys
+import time
+
+from sqlalchemy import delete, func, insert, select, text
+
+from app.database import async_session, engine
+from app.history import snapshot
+from app.hydration import load_schedules
+from app.migrations import is_partitioned, month_start, table_exists
+from app.models import LostPlate, Schedule, ScheduleArchive, ScheduleCapacity, ScheduleCategory
+from app.references import references_for
+
+# ids por DELETE ... IN (abaixo do limite de parâmetros do SQLite)
+DELETE_BATCH = 500
+
+
+def _archived(row, refs) -> dict:
+    return {
+        "id": row.id,
+        "company_id": row.company_id,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+        **snapshot(row, refs),
+    }
+
+
+def _write_file(path: str, records: list) -> None:
+    with open(path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+            for record in records:
+                out.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode() + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+async def _delete(session, ids: list) -> None:
+    for i in range(0, len(ids), DELETE_BATCH):
+        chunk = ids[i:i + DELETE_BATCH]
+        categories = select(ScheduleCategory.id).where(ScheduleCategory.schedule_id.in_(chunk))
+        await session.execute(delete(LostPlate).where(LostPlate.schedule_category_id.in_(categories)))
+        await session.execute(delete(ScheduleCategory).where(ScheduleCategory.schedule_id.in_(chunk)))
+        await session.execute(delete(ScheduleCapacity).where(ScheduleCapacity.schedule_id.in_(chunk)))
+        await session.execute(delete(Schedule).where(Schedule.id.in_(chunk)))
+
+
+async def archive_month(start: date, end: date, to: str, directory: str, dry_run: bool) -> int:
+    async with async_session() as session:
+        rows = await load_schedules(
+            session, Schedule.schedule_date >= start, Schedule.schedule_date < end, order_by=Schedule.id
+        )
+        if not rows or dry_run:
+            return len(rows)
+        refs = await references_for(session, rows)
+        records = [_archived(row, refs) for row in rows]
+        if to == "file":
+            _write_file(os.path.join(directory, f"schedules_{start:%Y-%m}.jsonl.gz"), records)
+        else:
+            await session.execute(insert(ScheduleArchive), [
+                {
+                    "id": record["id"],
+                    "company_id": record["company_id"],
+                    "schedule_date": date.fromisoformat(record["schedule_date"]),
+                    "snapshot": json.dumps(record, ensure_ascii=False, separators=(",", ":")),
+                }
+                for record in records
+            ])
+        await _delete(session, [row.id for row in rows])
+        await session.commit()
+    return len(rows)
+
+
+async def _drop_empty_partition(start: date) -> None:
+    async with engine.begin() as conn:
+        name = f"schedules_y{start.year}m{start.month:02d}"
+        if not await is_partitioned(conn, "schedules") or not await table_exists(conn, name):
+            return
+        if (await conn.execute(text(f"SELECT 1 FROM {name} LIMIT 1"))).first() is None:
+            print(f"  Dropping partition {name}")
+            await conn.execute(text(f"DROP TABLE {name}"))
+
+
+async def archive(before: date, to: str, directory: str, dry_run: bool) -> bool:
+    print(f"Usando DATABASE_URL={os.getenv('DATABASE_URL')}")
+    if before.day != 1 or before > month_start(date.today()):
+        print("--before deve ser o primeiro dia de um mês já encerrado (ex.: 2025-01-01).")
+        return False
+    if to == "file":
+        os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    total = 0
+    try:
+        async with async_session() as session:
+            oldest = (await session.execute(
+                select(func.min(Schedule.schedule_date)).where(Schedule.schedule_date < before)
+            )).scalar()
+        month = month_start(oldest) if oldest else before
+        while month < before:
+            next_month = month_start(month, 1)
+            count = await archive_month(month, next_month, to, directory, dry_run)
+            if count:
+                print(f"{month:%Y-%m}: {count} agendamentos{' (dry-run)' if dry_run else ''}")
+            total += count
+            if not dry_run:
+                await _drop_empty_partition(month)
+            month = next_month
+    except Exception as e:
+        print(f"Erro ao arquivar (os meses já concluídos ficam arquivados): {e}")
+        return False
+    finally:
+        await engine.dispose()
+    print(f"Total: {total} agendamentos em {time.perf_counter() - started:.1f}s.")
+    return True
+
+
+if __name__ == "__main__":
+    if os.name == 'nt':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    parser = argparse.ArgumentParser(description="Arquiva agendamentos de períodos fechados")
+    parser.add_argument("--before", type=date.fromisoformat, required=True,
+                        help="arquiva agendamentos com data anterior (primeiro dia de um mês)")
+    parser.add_argument("--to", choices=["table", "file"], default="table")
+    parser.add_argument("--dir", default="archive", help="diretório dos arquivos (com --to file)")
+    parser.add_argument("--dry-run", action="store_true", help="só conta o que seria arquivado")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(archive(args.before, args.to, args.dir, args.dry_run)) else 1)
@@ -0,0 +1,66 @@
+"""Custo de autenticação por requisição, antes e depois do cache de tokens.
+
+Mede (1) a verificação isolada do JWT com python-jose, (2) a mesma
+verificação via ``decode_token`` com o cache quente e (3) uma requisição
+autenticada completa (``GET /api/admin/timings``, que não acessa o banco)
+com o cache desligado e ligado.
+
+Uso (a partir de backend/):
+    python -m benchmarks.auth_overhead --iterations 20000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from jose import jwt
+
+from app import auth
+from main import app
+
+
+def _per_call_us(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def _per_request_us(client: httpx.AsyncClient, headers: dict, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        response = await client.get("/api/admin/timings", headers=headers)
+        response.raise_for_status()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def main(iterations: int, requests: int):
+    token = auth.create_access_token({"role": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    raw = _per_call_us(lambda: jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]), iterations)
+    auth.decode_token(token)
+    cached = _per_call_us(lambda: auth.decode_token(token), iterations)
+    print(f"jwt.decode (antes):          {raw:8.1f} µs/chamada")
+    print(f"decode_token com cache:      {cached:8.1f} µs/chamada  ({raw / cached:.0f}x)")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        original_size = auth.TOKEN_CACHE_SIZE
+        auth.TOKEN_CACHE_SIZE = 0
+        auth._token_cache.clear()
+        await _per_request_us(client, headers, 50)  # aquecimento
+        before = await _per_request_us(client, headers, requests)
+        auth.TOKEN_CACHE_SIZE = original_size
+        await _per_request_us(client, headers, 50)
+        after = await _per_request_us(client, headers, requests)
+    print(f"requisição sem cache:        {before:8.1f} µs")
+    print(f"requisição com cache:        {after:8.1f} µs  (-{before - after:.1f} µs por requisição)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.requests))
@@ -0,0 +1,80 @@
+"""Bytes na rede e custo de CPU da compressão das respostas JSON.
+
+Busca ``/api/schedules`` e ``/api/dashboard/metrics`` sem compressão e, para
+cada codificação suportada por ``app/compression.py``, mede o tamanho
+comprimido, o tempo de CPU de compressão (corpo inteiro e em pedaços de
+64 KiB com flush, como numa resposta em streaming) e o tempo estimado de
+transferência num link lento de filial. Use um banco populado com
+``generate_data.py``.
+
+Uso (a partir de backend/):
+    python -m benchmarks.compression --link-kbps 2000 --repeat 3
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app import auth, compression
+from main import app
+
+ENDPOINTS = ("/api/schedules", "/api/dashboard/metrics")
+CHUNK = 64 * 1024
+
+
+def _cpu_ms(fn, repeat: int) -> tuple[float, bytes]:
+    best = float("inf")
+    out = b""
+    for _ in range(repeat):
+        started = time.process_time()
+        out = fn()
+        best = min(best, time.process_time() - started)
+    return best * 1000, out
+
+
+def _whole(encoding: str, body: bytes) -> bytes:
+    return compression.Encoder(encoding).compress(body, last=True)
+
+
+def _streamed(encoding: str, body: bytes) -> bytes:
+    encoder = compression.Encoder(encoding)
+    chunks = [body[i:i + CHUNK] for i in range(0, len(body), CHUNK)] or [b""]
+    return b"".join(encoder.compress(chunk, last=i == len(chunks) - 1) for i, chunk in enumerate(chunks))
+
+
+async def _fetch(client: httpx.AsyncClient, path: str, headers: dict) -> bytes:
+    response = await client.get(path, headers={**headers, "Accept-Encoding": "identity"})
+    response.raise_for_status()
+    return response.content
+
+
+async def main(link_kbps: float, repeat: int):
+    token = auth.create_access_token({"role": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        bodies = {path: await _fetch(client, path, headers) for path in ENDPOINTS}
+
+    encodings = list(compression.available_encodings())
+    print(f"Codificações disponíveis: {', '.join(encodings)}  (link de {link_kbps:.0f} kbit/s)")
+    for path, body in bodies.items():
+        wire_ms = len(body) * 8 / link_kbps
+        print(f"\n{path}: {len(body):,} bytes sem compressão (~{wire_ms:,.0f} ms no link)")
+        print(f"  {'codificação':<12} {'bytes':>11} {'razão':>7} {'CPU':>9} {'CPU stream':>11} {'no link':>10}")
+        for encoding in encodings:
+            cpu, compressed = _cpu_ms(lambda: _whole(encoding, body), repeat)
+            cpu_stream, streamed = _cpu_ms(lambda: _streamed(encoding, body), repeat)
+            print(
+                f"  {encoding:<12} {len(compressed):>11,} {len(compressed) / len(body):>7.1%} "
+                f"{cpu:>7.1f}ms {cpu_stream:>9.1f}ms {len(compressed) * 8 / link_kbps + cpu:>8,.0f}ms"
+                f"  (stream {len(streamed):,} bytes)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--link-kbps", type=float, default=2000, help="banda do link da filial")
+    parser.add_argument("--repeat", type=int, default=3, help="melhor de N medições de CPU")
+    args = parser.parse_args()
+    asyncio.run(main(args.link_kbps, args.repeat))
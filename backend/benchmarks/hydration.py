@@ -0,0 +1,100 @@
+"""Carga de agendamentos: ORM (selectinload/subqueryload) x JSON aninhado.
+
+Compara, sobre o mesmo filtro, os três jeitos de trazer agendamentos com
+categorias, placas e capacidades:
+
+- ``selectinload``: uma query por relacionamento, com IN de até 500 ids;
+- ``subqueryload``: uma query por relacionamento, repetindo o filtro;
+- ``json``: ``app/hydration.py``, uma query só e nenhum objeto do ORM.
+
+Para cada um mostra a mediana do tempo total (query + montagem dos
+objetos), o número de queries e o pico de memória Python (medido numa
+rodada separada). Use um banco populado com ``generate_data.py`` (o
+``DATABASE_URL`` de sempre).
+
+Uso (a partir de backend/):
+    python -m benchmarks.hydration --repeat 5 --start-date 2025-01-01
+"""
+import argparse
+import asyncio
+from datetime import date
+import statistics
+import time
+import tracemalloc
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload, subqueryload
+
+from app.database import engine, read_session
+from app.hydration import load_schedules
+from app.instrumentation import count_queries, instrument_engine
+from app.models import Schedule, ScheduleCategory
+
+
+async def _orm(session, conditions, loader):
+    query = select(Schedule).options(
+        loader(Schedule.categories).options(loader(ScheduleCategory.lost_plates)),
+        loader(Schedule.all_capacities),
+    ).where(*conditions).order_by(Schedule.schedule_date.desc())
+    return (await session.execute(query)).scalars().all()
+
+
+STRATEGIES = {
+    "selectinload": lambda session, conditions: _orm(session, conditions, selectinload),
+    "subqueryload": lambda session, conditions: _orm(session, conditions, subqueryload),
+    "json": lambda session, conditions: load_schedules(session, *conditions),
+}
+
+
+def _summary(schedules) -> tuple:
+    """Contagens usadas para conferir que as estratégias trazem os mesmos dados."""
+    categories = sum(len(s.categories) for s in schedules)
+    plates = sum(len(c.lost_plates) for s in schedules for c in s.categories)
+    capacities = sum(len(s.all_capacities) for s in schedules)
+    return len(schedules), categories, plates, capacities
+
+
+async def _load(strategy: str, conditions):
+    # sessão nova a cada rodada: identity map vazio, como numa requisição
+    async with read_session() as session:
+        with count_queries() as stats:
+            schedules = await STRATEGIES[strategy](session, conditions)
+    return schedules, stats.sql_count
+
+
+async def run(strategy: str, conditions, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        schedules, queries = await _load(strategy, conditions)
+        times.append(time.perf_counter() - started)
+    # memória numa rodada à parte: o tracemalloc deixa a carga várias vezes mais lenta
+    tracemalloc.start()
+    await _load(strategy, conditions)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "ms": statistics.median(times) * 1000, "queries": queries,
+        "peak_mb": peak / 2**20, "summary": _summary(schedules),
+    }
+
+
+async def main(repeat: int, start_date) -> None:
+    instrument_engine(engine)
+    conditions = [Schedule.schedule_date >= start_date] if start_date else []
+    results = {strategy: await run(strategy, conditions, repeat) for strategy in STRATEGIES}
+    schedules, categories, plates, capacities = results["json"]["summary"]
+    print(f"{schedules} agendamentos, {categories} categorias, {plates} placas, {capacities} capacidades\n")
+    print(f"{'estratégia':<14}{'mediana':>10}{'queries':>9}{'pico mem':>11}")
+    for strategy, result in results.items():
+        mark = "" if result["summary"] == results["json"]["summary"] else "  (dados diferentes!)"
+        print(f"{strategy:<14}{result['ms']:>8.0f} ms{result['queries']:>9}{result['peak_mb']:>8.1f} MB{mark}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--start-date", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat, args.start_date))
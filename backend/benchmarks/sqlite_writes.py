@@ -0,0 +1,168 @@
+"""Vazão de escrita no SQLite com vários clientes salvando ao mesmo tempo.
+
+Cada configuração roda num processo novo (as variáveis ``SQLITE_*`` são lidas
+no import de ``app.database``) sobre uma cópia do banco de ``DATABASE_URL``,
+que não é alterado. ``--clients`` clientes chamam a API em paralelo durante
+``--seconds`` segundos: cada um cria um agendamento e depois o atualiza, em
+loop (``POST`` + ``PUT /api/schedules``). Para cada configuração mostra
+escritas/s, latência p50/p95 e quantas falharam (ex.: "database is locked").
+
+Configurações comparadas:
+
+- ``produção``: os padrões de ``app/database.py`` (WAL, synchronous=NORMAL,
+  BEGIN IMMEDIATE e fila de escrita);
+- ``sem fila``: ``SQLITE_WRITE_QUEUE=false``, as transações disputam o lock
+  do arquivo esperando o busy_timeout;
+- ``synchronous=FULL``: fsync a cada commit.
+
+O banco precisa estar migrado e ter empresas, categorias e perfis
+(``generate_data.py``).
+
+Uso (a partir de backend/):
+    python -m benchmarks.sqlite_writes --clients 16 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy.engine import make_url
+
+CONFIGS = {
+    "produção": {},
+    "sem fila": {"SQLITE_WRITE_QUEUE": "false"},
+    "synchronous=FULL": {"SQLITE_SYNCHRONOUS": "FULL"},
+}
+
+
+def _payload(refs: dict, client: int, count: int) -> dict:
+    return {
+        "company_id": refs["companies"][client % len(refs["companies"])],
+        "uf": "BAHIA",
+        "schedule_date": "2025-01-01",
+        "categories": [
+            {"category_name": name, "count": count, "lost_plates": []} for name in refs["categories"]
+        ],
+        "capacities": [{"profile_name": name, "vehicle_count": count} for name in refs["profiles"]],
+        "capacities_spot": [],
+    }
+
+
+async def _references() -> dict:
+    from sqlalchemy import select
+
+    from app.database import read_session
+    from app.models import CapacityProfile, Category, Company
+
+    async with read_session() as session:
+        companies = (await session.execute(select(Company.id).order_by(Company.id))).scalars().all()
+        # as categorias que não exigem placas ou perfil
+        categories = (await session.execute(
+            select(Category.name).where(Category.name.in_(["Carros em rota", "Reentrega", "Em viagem", "Diária"]))
+        )).scalars().all()
+        profiles = (await session.execute(
+            select(CapacityProfile.name).where(CapacityProfile.spot.is_(False)).limit(2)
+        )).scalars().all()
+    return {"companies": companies, "categories": categories, "profiles": profiles}
+
+
+async def _client(http, headers, refs, client: int, deadline: float, latencies: list, errors: dict):
+    count = 0
+    while time.perf_counter() < deadline:
+        count += 1
+        started = time.perf_counter()
+        response = await http.post("/api/schedules", json=_payload(refs, client, count), headers=headers)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors[response.text[:80]] = errors.get(response.text[:80], 0) + 1
+            continue
+        started = time.perf_counter()
+        response = await http.put(
+            f"/api/schedules/{response.json()['id']}", json=_payload(refs, client, count + 1), headers=headers
+        )
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors[response.text[:80]] = errors.get(response.text[:80], 0) + 1
+
+
+async def child(clients: int, seconds: float) -> dict:
+    import httpx
+
+    from app import auth
+    from app.database import engine
+    from main import app
+
+    refs = await _references()
+    headers = {"Authorization": f"Bearer {auth.create_access_token({'role': 'admin'})}"}
+    latencies, errors = [], {}
+    # exceções não tratadas viram 500, como no uvicorn
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http:
+        started = time.perf_counter()
+        deadline = started + seconds
+        await asyncio.gather(*(
+            _client(http, headers, refs, n, deadline, latencies, errors) for n in range(clients)
+        ))
+        elapsed = time.perf_counter() - started
+    await engine.dispose()
+    latencies.sort()
+    failed = sum(errors.values())
+    return {
+        "writes_per_s": (len(latencies) - failed) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "failed": failed,
+        "errors": errors,
+    }
+
+
+def run_config(source: str, env: dict, clients: int, seconds: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "bench.db")
+        shutil.copyfile(source, database)
+        child_env = {
+            **os.environ, **env,
+            "DATABASE_URL": f"sqlite+aiosqlite:///{database}",
+            "RATE_LIMIT_ENABLED": "false",
+            "AUTO_MIGRATE": "false",
+        }
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.sqlite_writes", "--child",
+             "--clients", str(clients), "--seconds", str(seconds)],
+            env=child_env, capture_output=True, text=True, check=True,
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(clients: int, seconds: float) -> int:
+    url = make_url(os.getenv("DATABASE_URL") or "sqlite+aiosqlite:///./local.db")
+    if not url.drivername.startswith("sqlite") or url.database in (None, "", ":memory:"):
+        print("DATABASE_URL deve apontar para um arquivo SQLite.")
+        return 1
+    print(f"{clients} clientes por {seconds:.0f}s sobre uma cópia de {url.database}\n")
+    print(f"{'configuração':<20}{'escritas/s':>11}{'p50':>10}{'p95':>10}{'falhas':>8}")
+    for name, env in CONFIGS.items():
+        result = run_config(url.database, env, clients, seconds)
+        print(f"{name:<20}{result['writes_per_s']:>11.1f}{result['p50_ms']:>7.0f} ms"
+              f"{result['p95_ms']:>7.0f} ms{result['failed']:>8}")
+        for error, count in result["errors"].items():
+            print(f"    {count}x {error}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.clients, args.seconds))))
+    else:
+        sys.exit(main(args.clients, args.seconds))
@@ -0,0 +1,54 @@
+"""Tempo de cold start de um worker: import de ``main`` + lifespan.
+
+Cada rodada é um processo Python novo (como um worker recém-criado pelo
+uvicorn) que importa ``main`` e executa o startup do lifespan. O banco deve
+estar migrado (``python upgrade_db.py``), senão o tempo inclui a migração.
+
+Uso (a partir de backend/):
+    python -m benchmarks.startup --runs 5 --target-ms 1500
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+_CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def startup():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+print(json.dumps({"import_ms": (imported - started) * 1000, "lifespan_ms": (ready - imported) * 1000}))
+"""
+
+
+def run_once() -> dict:
+    out = subprocess.run([sys.executable, "-c", _CHILD], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(runs: int, target_ms: float) -> int:
+    samples = [run_once() for _ in range(runs)]
+    imports = [s["import_ms"] for s in samples]
+    lifespans = [s["lifespan_ms"] for s in samples]
+    totals = [a + b for a, b in zip(imports, lifespans)]
+    print(f"import main:  mediana {statistics.median(imports):7.0f} ms")
+    print(f"lifespan:     mediana {statistics.median(lifespans):7.0f} ms")
+    total = statistics.median(totals)
+    status = "OK" if total <= target_ms else "ACIMA DA META"
+    print(f"total:        mediana {total:7.0f} ms  (meta {target_ms:.0f} ms: {status})")
+    return 0 if total <= target_ms else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=1500)
+    args = parser.parse_args()
+    sys.exit(main(args.runs, args.target_ms))
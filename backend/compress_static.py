@@ -0,0 +1,12 @@
+"""Gera as variantes .br/.gz do build do frontend (rodado no Dockerfile).
+
+Uso (a partir de backend/):
+    python compress_static.py [diretório]   # padrão: static/
+"""
+import sys
+from pathlib import Path
+
+from app.static import STATIC_DIR, compress_directory
+
+if __name__ == "__main__":
+    compress_directory(Path(sys.argv[1]) if len(sys.argv) > 1 else STATIC_DIR)
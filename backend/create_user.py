@@ -1,15 +1,11 @@
 import asyncio
 import os
 import sys
-import bcrypt
 from sqlalchemy import select
+from app.auth import hash_password  # usa o custo configurado em BCRYPT_ROUNDS
 from app.database import async_session
 from app.models import User
 
-def hash_password(password: str) -> str:
-    """Gera o hash da senha usando bcrypt, compatível com auth.py."""
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-
 async def create_user(username, password, role):
     print(f"Conectando ao banco de dados...")
     async with async_session() as session:
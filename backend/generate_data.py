@@ -0,0 +1,305 @@
+"""Gerador de dados sintéticos para testes de volume.
+
+Cria anos de agendamentos para um número configurável de empresas, UFs e
+perfis de capacidade, com distribuição de categorias parecida com a de
+produção (inclui "Indisponíveis" com placas/motivos e "Perdidas" com perfil).
+
+As linhas são geradas com chaves locais ligando os filhos aos pais e
+carregadas por ``app/bulk_load.py`` (COPY no Postgres, executemany no
+SQLite), que atribui os ids definitivos.  A mesma semente e o mesmo
+período geram sempre o mesmo conjunto; sem ``--end-date`` o período termina
+hoje, então para reproduzir uma carga passe a data final.
+
+Uso:
+    python generate_data.py --years 3 --companies 10 --ufs 5 --profiles 6 --seed 42 --end-date 2025-06-30
+"""
+import argparse
+import asyncio
+import os
+import random
+import string
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app import history
+from app.bulk_load import load_rows
+from app.constants import CATEGORIES, PROFILE_WEIGHTS
+from app.database import async_session, engine, Base
+from app.models import (
+    Company,
+    Uf,
+    Category,
+    CapacityProfile,
+    CapacityProfileCompany,
+    Schedule,
+    ScheduleCategory,
+    LostPlate,
+    ScheduleCapacity,
+)
+
+# (média de veículos por agendamento, probabilidade de aparecer)
+CATEGORY_DISTRIBUTION = {
+    "Carros em rota": (18, 0.98),
+    "Reentrega": (3, 0.55),
+    "Em viagem": (6, 0.70),
+    "Indisponíveis": (2, 0.45),
+    "Perdidas": (1.5, 0.35),
+    "Diária": (4, 0.50),
+    "Spot/Parado": (2, 0.30),
+}
+
+LOST_REASONS = [
+    "Manutenção",
+    "Sem motorista",
+    "Pneu furado",
+    "Documentação vencida",
+    "Acidente",
+    "Falta de ajudante",
+]
+
+UF_NAMES = [
+    "BAHIA", "CEARÁ", "PERNAMBUCO", "SERGIPE", "ALAGOAS", "PARAÍBA",
+    "RIO GRANDE DO NORTE", "PIAUÍ", "MARANHÃO", "MINAS GERAIS",
+]
+
+SPOT_WEIGHTS = {"Carreta Spot": 27000, "Bitruck Spot": 18000}
+
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    """Amostra de Poisson (Knuth) — suficiente para as médias pequenas usadas aqui."""
+    limit = pow(2.718281828459045, -mean)
+    k, p = 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def _plate(rng: random.Random) -> str:
+    """Placa no padrão Mercosul (ABC1D23)."""
+    letters = string.ascii_uppercase
+    return (
+        "".join(rng.choice(letters) for _ in range(3))
+        + rng.choice(string.digits)
+        + rng.choice(letters)
+        + "".join(rng.choice(string.digits) for _ in range(2))
+    )
+
+
+async def _ensure_reference_data(conn, rng, n_companies, n_ufs, n_profiles, n_spot_profiles):
+    """Garante empresas, UFs, categorias e perfis; retorna o que será usado na geração."""
+    existing = {r.name: r for r in (await conn.execute(select(Company.id, Company.name))).all()}
+    names = [f"Empresa {i:03d}" for i in range(1, n_companies + 1)]
+    missing = [{"name": n, "vehicle_goal": rng.randint(10, 60)} for n in names if n not in existing]
+    if missing:
+        await conn.execute(insert(Company.__table__), missing)
+    companies = [
+        r.id for r in (await conn.execute(select(Company.id).where(Company.name.in_(names)))).all()
+    ]
+
+    ufs = (UF_NAMES * (n_ufs // len(UF_NAMES) + 1))[:n_ufs]
+    ufs = [u if i < len(UF_NAMES) else f"{u} {i // len(UF_NAMES)}" for i, u in enumerate(ufs)]
+    have_ufs = set((await conn.execute(select(Uf.name))).scalars().all())
+    if set(ufs) - have_ufs:
+        await conn.execute(insert(Uf.__table__), [{"name": u} for u in ufs if u not in have_ufs])
+
+    have_cats = set((await conn.execute(select(Category.name))).scalars().all())
+    if set(CATEGORIES) - have_cats:
+        await conn.execute(
+            insert(Category.__table__), [{"name": c} for c in CATEGORIES if c not in have_cats]
+        )
+
+    base = list(PROFILE_WEIGHTS.items())
+    regular = {}
+    for i in range(n_profiles):
+        name, weight = base[i % len(base)]
+        if i >= len(base):
+            name, weight = f"{name} {i // len(base) + 1}", weight + 500 * (i // len(base))
+        regular[name] = weight
+    spot_base = list(SPOT_WEIGHTS.items())
+    spot = {}
+    for i in range(n_spot_profiles):
+        name, weight = spot_base[i % len(spot_base)]
+        if i >= len(spot_base):
+            name = f"{name} {i // len(spot_base) + 1}"
+        spot[name] = weight
+
+    have_profiles = set((await conn.execute(select(CapacityProfile.name))).scalars().all())
+    new_profiles = [
+        {"name": n, "weight": w, "spot": False} for n, w in regular.items() if n not in have_profiles
+    ] + [{"name": n, "weight": w, "spot": True} for n, w in spot.items() if n not in have_profiles]
+    if new_profiles:
+        await conn.execute(insert(CapacityProfile.__table__), new_profiles)
+        created = (await conn.execute(
+            select(CapacityProfile.id).where(CapacityProfile.name.in_([p["name"] for p in new_profiles]))
+        )).scalars().all()
+        # perfis novos ficam ligados a um subconjunto aleatório das empresas geradas
+        links = [
+            {"profile_id": pid, "company_id": cid}
+            for pid in created
+            for cid in companies
+            if rng.random() < 0.6
+        ]
+        if links:
+            await conn.execute(insert(CapacityProfileCompany.__table__), links)
+
+    return companies, ufs, regular, spot
+
+
+def _generate_rows(rng, company_ufs, regular, spot, start, end, ids, category_ids, profile_ids):
+    """Gera (em memória) as linhas de um intervalo de datas, com chaves locais em ``id``."""
+    schedules, categories, plates, capacities = [], [], [], []
+    regular_names = list(regular)
+    spot_names = list(spot)
+
+    day = start
+    while day <= end:
+        # domingos têm bem menos lançamentos
+        presence = 0.25 if day.weekday() == 6 else 0.92
+        for cid, uf_names in company_ufs.items():
+            for uf in uf_names:
+                if rng.random() > presence:
+                    continue
+                sid = ids["schedules"]
+                ids["schedules"] += 1
+                created = datetime.combine(day, datetime.min.time()) + timedelta(
+                    hours=rng.randint(6, 10), minutes=rng.randint(0, 59)
+                )
+                schedules.append({
+                    "id": sid,
+                    "company_id": cid,
+                    "uf": uf,
+                    "schedule_date": day,
+                    "created_at": created,
+                    "updated_at": created + timedelta(hours=2) if rng.random() < 0.05 else None,
+                })
+
+                for name, (mean, prob) in CATEGORY_DISTRIBUTION.items():
+                    if rng.random() > prob:
+                        continue
+                    count = _poisson(rng, mean)
+                    if count <= 0:
+                        continue
+                    cat_id = ids["schedule_categories"]
+                    ids["schedule_categories"] += 1
+                    categories.append({
+                        "id": cat_id,
+                        "schedule_id": sid,
+                        "category_id": category_ids[name],
+                        "count": count,
+                        "profile_id": profile_ids[rng.choice(regular_names)] if name == "Perdidas" else None,
+                    })
+                    if name == "Indisponíveis":
+                        for _ in range(count):
+                            plates.append({
+                                "id": ids["lost_plates"],
+                                "schedule_category_id": cat_id,
+                                "plate_number": _plate(rng),
+                                "reason": rng.choice(LOST_REASONS),
+                            })
+                            ids["lost_plates"] += 1
+
+                for profile in rng.sample(regular_names, k=rng.randint(1, len(regular_names))):
+                    vehicles = rng.randint(1, 12)
+                    capacities.append({
+                        "id": ids["schedule_capacities"],
+                        "schedule_id": sid,
+                        "profile_id": profile_ids[profile],
+                        "vehicle_count": vehicles,
+                        "total_weight_kg": vehicles * regular[profile],
+                        "spot": False,
+                    })
+                    ids["schedule_capacities"] += 1
+
+                if spot_names and rng.random() < 0.2:
+                    profile = rng.choice(spot_names)
+                    vehicles = rng.randint(1, 4)
+                    capacities.append({
+                        "id": ids["schedule_capacities"],
+                        "schedule_id": sid,
+                        "profile_id": profile_ids[profile],
+                        "vehicle_count": vehicles,
+                        "total_weight_kg": vehicles * spot[profile],
+                        "spot": True,
+                    })
+                    ids["schedule_capacities"] += 1
+        day += timedelta(days=1)
+
+    return schedules, categories, plates, capacities
+
+
+async def generate(args):
+    rng = random.Random(args.seed)
+    end = args.end_date or date.today()
+    start = args.start_date or end - timedelta(days=int(365 * args.years) - 1)
+    print(f"Usando DATABASE_URL={os.getenv('DATABASE_URL')}")
+    print(f"Gerando agendamentos de {start} a {end} (seed={args.seed})")
+
+    child_models = [Schedule, ScheduleCategory, LostPlate, ScheduleCapacity]
+    try:
+        async with engine.begin() as conn:
+            if args.reset:
+                await conn.run_sync(Base.metadata.drop_all)
+                await history.clear(conn)
+            await conn.run_sync(Base.metadata.create_all)
+            companies, ufs, regular, spot = await _ensure_reference_data(
+                conn, rng, args.companies, args.ufs, args.profiles, args.spot_profiles
+            )
+            ids = {m.__tablename__: 1 for m in child_models}
+            # as tabelas filhas guardam categoria/perfil por id
+            category_ids = dict((await conn.execute(select(Category.name, Category.id))).all())
+            profile_ids = dict((await conn.execute(select(CapacityProfile.name, CapacityProfile.id))).all())
+        # UFs de cada empresa: sorteadas uma vez para o período inteiro
+        company_ufs = {cid: rng.sample(ufs, k=min(len(ufs), rng.randint(1, 2))) for cid in companies}
+
+        totals = {m.__tablename__: 0 for m in child_models}
+        started = time.perf_counter()
+        # gera e insere um mês por vez para manter a memória sob controle
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=30), end)
+            batches = _generate_rows(
+                rng, company_ufs, regular, spot, chunk_start, chunk_end, ids, category_ids, profile_ids
+            )
+            async with async_session() as session:
+                counts = await load_rows(await session.connection(), *batches, batch_size=args.batch_size)
+                await session.commit()
+            for table, n in counts.items():
+                totals[table] += n
+            chunk_start = chunk_end + timedelta(days=1)
+
+        elapsed = time.perf_counter() - started
+        total_rows = sum(totals.values())
+        for table, n in totals.items():
+            print(f"  {table}: {n} linhas")
+        print(f"Total: {total_rows} linhas em {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9):,.0f} linhas/s)")
+    except Exception as e:
+        print(f"Erro ao gerar dados: {e}")
+        print("Verifique se a variável DATABASE_URL está correta e se o servidor está acessível.")
+    finally:
+        await engine.dispose()
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Gera histórico sintético de agendamentos.")
+    parser.add_argument("--years", type=float, default=1, help="anos de histórico (padrão: 1)")
+    parser.add_argument("--start-date", type=date.fromisoformat, help="data inicial (AAAA-MM-DD)")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="data final (padrão: hoje; fixe para reproduzir a carga)")
+    parser.add_argument("--companies", type=int, default=5)
+    parser.add_argument("--ufs", type=int, default=3)
+    parser.add_argument("--profiles", type=int, default=4, help="perfis de capacidade regulares")
+    parser.add_argument("--spot-profiles", type=int, default=2, help="perfis de capacidade spot")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000, help="linhas por executemany (SQLite)")
+    parser.add_argument("--reset", action="store_true", help="apaga e recria as tabelas antes")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    if os.name == 'nt':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    asyncio.run(generate(_parse_args()))
@@ -0,0 +1,124 @@
+"""Importa agendamentos em massa de um arquivo JSON Lines (planilhas, TMS).
+
+Cada linha é um agendamento no formato do ``POST /api/schedules``, com
+``created_at``/``updated_at`` opcionais::
+
+    {"company_id": 1, "uf": "BAHIA", "schedule_date": "2024-03-01",
+     "categories": [{"category_name": "Reentrega", "count": 3}],
+     "capacities": [{"profile_name": "Toco", "vehicle_count": 10}]}
+
+As linhas vão em lotes de ``--batch-size`` agendamentos, um por transação,
+por ``app/bulk_load.py`` (COPY no Postgres). Linhas inválidas ou com
+categoria/perfil inexistente são mostradas e puladas. Se um lote falhar os
+anteriores ficam gravados: corrija e rode de novo com ``--replace``, que
+troca os agendamentos de mesma empresa, UF e data em vez de duplicá-los.
+
+Uso (a partir de backend/):
+    python import_schedules.py backfill.jsonl.gz --dry-run
+    python import_schedules.py backfill.jsonl.gz --replace
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import sys
+import time
+
+from pydantic import ValidationError
+
+from app.bulk_load import LOAD_ORDER, load_lookups, load_rows, records_to_rows
+from app.database import async_session, engine
+from app.schemas import ScheduleImport
+
+# mostra só os primeiros erros de validação
+MAX_ERRORS_SHOWN = 20
+
+
+def _read_lines(path: str):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as source:
+        for number, line in enumerate(source, 1):
+            if line.strip():
+                yield number, line
+
+
+def _validate(line: str, category_ids: dict, profiles: dict):
+    record = ScheduleImport.model_validate_json(line)
+    unknown = {c.category_name for c in record.categories} - category_ids.keys()
+    unknown |= {
+        name
+        for name in [c.profile_name for c in record.categories if c.profile_name]
+        + [c.profile_name for c in record.capacities + record.capacities_spot]
+        if name not in profiles
+    }
+    if unknown:
+        raise ValueError(f"categorias/perfis não encontrados: {', '.join(sorted(unknown))}")
+    return record
+
+
+async def _load_batch(batch: list, category_ids: dict, profiles: dict, replace: bool, dry_run: bool) -> dict:
+    rows = records_to_rows(batch, category_ids, profiles)
+    if dry_run:
+        return {table.name: len(r) for (table, _, _), r in zip(LOAD_ORDER, rows)}
+    async with async_session() as session:
+        conn = await session.connection()
+        counts = await load_rows(conn, *rows, replace=replace)
+        await session.commit()
+    return counts
+
+
+async def import_schedules(path: str, batch_size: int, replace: bool, dry_run: bool) -> bool:
+    print(f"Usando DATABASE_URL={os.getenv('DATABASE_URL')}")
+    started = time.perf_counter()
+    totals, errors = {}, 0
+    try:
+        async with engine.connect() as conn:
+            category_ids, profiles = await load_lookups(conn)
+        batch = []
+        lines = _read_lines(path)
+        while True:
+            for number, line in lines:
+                try:
+                    batch.append(_validate(line, category_ids, profiles))
+                except (ValidationError, ValueError) as e:
+                    errors += 1
+                    if errors <= MAX_ERRORS_SHOWN:
+                        print(f"  linha {number} ignorada: {' '.join(str(e).split())[:300]}")
+                    continue
+                if len(batch) >= batch_size:
+                    break
+            if not batch:
+                break
+            counts = await _load_batch(batch, category_ids, profiles, replace, dry_run)
+            for table, n in counts.items():
+                totals[table] = totals.get(table, 0) + n
+            elapsed = time.perf_counter() - started
+            print(f"{totals['schedules']} agendamentos ({elapsed:.1f}s){' (dry-run)' if dry_run else ''}")
+            batch = []
+    except Exception as e:
+        print(f"Erro ao importar (os lotes anteriores ficam gravados): {e}")
+        return False
+    finally:
+        await engine.dispose()
+
+    elapsed = time.perf_counter() - started
+    for table, n in totals.items():
+        print(f"  {table}: {n} linhas{' apagadas' if table == 'replaced' else ''}")
+    loaded = sum(n for table, n in totals.items() if table != "replaced")
+    print(f"Total: {loaded} linhas em {elapsed:.1f}s ({loaded / max(elapsed, 1e-9):,.0f} linhas/s)")
+    if errors:
+        print(f"{errors} linhas ignoradas.")
+    return errors == 0
+
+
+if __name__ == "__main__":
+    if os.name == 'nt':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    parser = argparse.ArgumentParser(description="Importa agendamentos de um arquivo JSON Lines")
+    parser.add_argument("path", help="arquivo .jsonl (ou .jsonl.gz)")
+    parser.add_argument("--batch-size", type=int, default=20000, help="agendamentos por transação")
+    parser.add_argument("--replace", action="store_true",
+                        help="substitui agendamentos existentes de mesma empresa, UF e data")
+    parser.add_argument("--dry-run", action="store_true", help="só valida e conta")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(import_schedules(args.path, args.batch_size, args.replace, args.dry_run)) else 1)
@@ -1,11 +1,15 @@
 import os
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from pathlib import Path
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
+
+from app import metrics
+from app.static import SpaIndex
 
 from app import create_app
 
 app: FastAPI = create_app()
+spa_index = SpaIndex()
 
 
 @app.get("/health")
@@ -13,6 +17,18 @@ async def health_check():
     return {"status": "ok"}
 
 
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    # scrape protegido opcionalmente por token (Authorization: Bearer <METRICS_TOKEN>)
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Não autorizado")
+    body, content_type = metrics.render_latest()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/manual-de-uso")
 async def serve_manual():
     # Build path relative to this file's directory to avoid CWD issues.
@@ -24,23 +40,22 @@ async def serve_manual():
 
 
 @app.get("/")
-async def serve_root():
-    ROOT_DIR = Path(__file__).resolve().parent
-    index_path = ROOT_DIR / "static" / "index.html"
-    if index_path.exists():
-        return FileResponse(index_path)
+async def serve_root(request: Request):
+    # index.html is kept in memory (see app/static.py)
+    response = spa_index.response(request)
+    if response is not None:
+        return response
     return {"message": "Frontend files not found. Please build the frontend."}
 
 
 @app.get("/{full_path:path}")
-async def serve_spa(full_path: str):
-    ROOT_DIR = Path(__file__).resolve().parent
-    index_path = ROOT_DIR / "static" / "index.html"
+async def serve_spa(full_path: str, request: Request):
     # if it looks like an API path, let FastAPI return 404 if not matched by routers
     if full_path.startswith("api/"):
         raise HTTPException(status_code=404, detail="Not Found")
-    if index_path.exists():
-        return FileResponse(index_path)
+    response = spa_index.response(request)
+    if response is not None:
+        return response
     return {"message": "Frontend files not found. Please build the frontend."}
 
 
@@ -0,0 +1,123 @@
+"""Converte ``schedules`` numa tabela particionada por mês (Postgres, opcional).
+
+Cada mês de ``schedule_date`` vira uma partição ``schedules_yAAAAmMM`` (mais
+uma ``schedules_default`` para datas fora delas). Consultas com período, como
+as do dashboard, da listagem e da exportação, leem só as partições do
+intervalo; o arquivamento (``archive_schedules.py``) remove as partições dos
+meses que esvaziou.
+
+A conversão roda numa transação só e bloqueia ``schedules`` enquanto copia
+os dados: rode numa janela de manutenção, com os workers parados. Mudanças
+no schema:
+
+- a chave primária passa a ser ``(id, schedule_date)``, exigência do Postgres
+  para tabelas particionadas; ``id`` continua vindo da mesma sequence;
+- as FKs das tabelas filhas para ``schedules.id`` são removidas (uma FK não
+  pode apontar para parte da chave de uma tabela particionada). As filhas
+  continuam indexadas por ``schedule_id``; elas só são gravadas junto com o
+  agendamento e o arquivamento as remove junto com ele.
+
+As tabelas filhas não são particionadas: elas não têm ``schedule_date`` e
+são lidas pelo índice de ``schedule_id`` a partir dos agendamentos já
+filtrados. Depois da conversão, ``upgrade_db.py`` cria as partições dos
+próximos meses a cada execução.
+
+Uso (a partir de backend/):
+    python partition_schedules.py --dry-run
+    python partition_schedules.py
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.migrations import ensure_monthly_partitions, is_partitioned
+
+INDEXES = {
+    "ix_schedules_schedule_date": "schedule_date",
+    "ix_schedules_company_id_schedule_date": "company_id, schedule_date",
+}
+
+
+async def _child_foreign_keys(conn) -> list:
+    result = await conn.execute(text(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = 'schedules'::regclass ORDER BY 1, 2"
+    ))
+    return result.all()
+
+
+async def convert(conn, dry_run: bool) -> None:
+    min_date = (await conn.execute(text("SELECT MIN(schedule_date) FROM schedules"))).scalar()
+    foreign_keys = await _child_foreign_keys(conn)
+    sequence = (await conn.execute(text("SELECT pg_get_serial_sequence('schedules', 'id')"))).scalar()
+    print(f"Primeiro mês: {min_date:%Y-%m}" if min_date else "Tabela vazia")
+    for table, name in foreign_keys:
+        print(f"  FK removida: {table}.{name}")
+    if dry_run:
+        return
+
+    await conn.execute(text("LOCK TABLE schedules IN ACCESS EXCLUSIVE MODE"))
+    for table, name in foreign_keys:
+        await conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+
+    # a tabela antiga sai do caminho com os seus índices (os nomes são reaproveitados)
+    await conn.execute(text("ALTER TABLE schedules RENAME TO schedules_unpartitioned"))
+    await conn.execute(text("ALTER INDEX IF EXISTS schedules_pkey RENAME TO schedules_unpartitioned_pkey"))
+    for index in INDEXES:
+        await conn.execute(text(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_unpartitioned"))
+
+    await conn.execute(text(
+        "CREATE TABLE schedules (LIKE schedules_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (schedule_date)"
+    ))
+    await conn.execute(text("ALTER TABLE schedules ADD PRIMARY KEY (id, schedule_date)"))
+    await conn.execute(text("ALTER TABLE schedules ADD FOREIGN KEY (company_id) REFERENCES companies (id)"))
+    await conn.execute(text("CREATE TABLE schedules_default PARTITION OF schedules DEFAULT"))
+    await ensure_monthly_partitions(conn, "schedules", first_month=min_date)
+
+    copied = await conn.execute(text("INSERT INTO schedules SELECT * FROM schedules_unpartitioned"))
+    print(f"  {copied.rowcount} agendamentos copiados")
+    if sequence:
+        # senão o DROP da tabela antiga levaria a sequence junto
+        await conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY schedules.id"))
+    await conn.execute(text("DROP TABLE schedules_unpartitioned"))
+    for index, columns in INDEXES.items():
+        await conn.execute(text(f"CREATE INDEX {index} ON schedules ({columns})"))
+    await conn.execute(text("ANALYZE schedules"))
+
+
+async def partition_schedules(dry_run: bool) -> bool:
+    print(f"Usando DATABASE_URL={os.getenv('DATABASE_URL')}")
+    if engine.dialect.name != "postgresql":
+        print("Particionamento só é suportado no Postgres.")
+        return False
+    started = time.perf_counter()
+    try:
+        async with engine.begin() as conn:
+            if await is_partitioned(conn, "schedules"):
+                print("schedules já é particionada; conferindo as partições dos próximos meses.")
+                await ensure_monthly_partitions(conn, "schedules")
+                return True
+            await convert(conn, dry_run)
+    except Exception as e:
+        print(f"Erro ao particionar schedules (nada foi alterado): {e}")
+        return False
+    finally:
+        await engine.dispose()
+    if not dry_run:
+        print(f"schedules particionada em {time.perf_counter() - started:.1f}s.")
+    return True
+
+
+if __name__ == "__main__":
+    if os.name == 'nt':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    parser = argparse.ArgumentParser(description="Particiona schedules por mês (Postgres)")
+    parser.add_argument("--dry-run", action="store_true", help="só mostra o que seria alterado")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(partition_schedules(args.dry_run)) else 1)
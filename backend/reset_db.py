@@ -1,6 +1,7 @@
 import asyncio
 import os
 
+from app import history
 from app.database import engine, Base, async_session
 from app.models import Company, Uf, Category, CapacityProfile
 
@@ -14,6 +15,8 @@ async def reset_database():
             # Remove todas as tabelas e recria (reseta IDs e Schema)
             await conn.run_sync(Base.metadata.drop_all)
             await conn.run_sync(Base.metadata.create_all)
+            # o histórico fica fora do metadata (particionado no Postgres): só esvazia
+            await history.clear(conn)
         
         print("Tabelas recriadas. Inserindo dados iniciais...")
         
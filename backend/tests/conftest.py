@@ -0,0 +1,93 @@
+"""Fixtures dos testes: banco SQLite temporário já migrado e cliente da API.
+
+As configurações (``DATABASE_URL``, rate limit, bcrypt...) são lidas no
+import de ``app``, então o ambiente é montado aqui antes de qualquer import.
+Rode a partir de ``backend/``::
+
+    python -m pytest -q
+"""
+import os
+from pathlib import Path
+import sys
+import tempfile
+
+TMP_DIR = Path(tempfile.mkdtemp(prefix="logisched-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR / 'primary.db'}"
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ["AUTO_MIGRATE"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["QUERY_BUDGET_STRICT"] = "true"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["SECRET_KEY"] = "chave-dos-testes"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from app import auth  # noqa: E402
+from app.constants import PROFILE_WEIGHTS  # noqa: E402
+from app.database import async_session, engine  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.models import CapacityProfile, User  # noqa: E402
+from main import app  # noqa: E402
+
+ADMIN_PASSWORD = "senha-admin"
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    # um event loop para a sessão inteira: o engine e o pool são globais
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def database(anyio_backend):
+    """Banco migrado com empresas, categorias, perfis e um usuário admin."""
+    await run_migrations(engine)
+    async with async_session() as session:
+        session.add_all(
+            CapacityProfile(name=name, weight=weight, spot=False) for name, weight in PROFILE_WEIGHTS.items()
+        )
+        session.add(CapacityProfile(name="Spot Truck", weight=14000, spot=True))
+        session.add(User(username="admin", password=auth.hash_password(ADMIN_PASSWORD), role="admin"))
+        await session.commit()
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client(database):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+
+@pytest.fixture
+def admin_headers() -> dict:
+    return {"Authorization": f"Bearer {auth.create_access_token({'role': 'admin'})}"}
+
+
+def schedule_payload(schedule_date: str = "2025-01-02", company_id: int = 1) -> dict:
+    """Agendamento com todas as coleções preenchidas (várias linhas em cada)."""
+    return {
+        "company_id": company_id,
+        "uf": "bahia",
+        "schedule_date": schedule_date,
+        "categories": [
+            {"category_name": "Carros em rota", "count": 2, "lost_plates": []},
+            {"category_name": "Reentrega", "count": 1, "lost_plates": []},
+            {
+                "category_name": "Indisponíveis",
+                "count": 2,
+                "lost_plates": [
+                    {"plate_number": "ABC1D23", "reason": "Manutenção"},
+                    {"plate_number": "XYZ9K87", "reason": "Sem motorista"},
+                ],
+            },
+        ],
+        "capacities": [
+            {"profile_name": "HR", "vehicle_count": 2},
+            {"profile_name": "Toco", "vehicle_count": 1},
+        ],
+        "capacities_spot": [{"profile_name": "Spot Truck", "vehicle_count": 1}],
+    }
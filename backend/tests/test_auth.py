@@ -0,0 +1,88 @@
+"""Sessões com refresh token: rotação, revogação e denylist (app/auth.py)."""
+import bcrypt
+from fastapi import HTTPException
+import pytest
+from sqlalchemy import select
+
+from app import auth
+from app.database import async_session
+from app.models import User
+from app.routers import auth as auth_routes
+
+from conftest import ADMIN_PASSWORD
+
+pytestmark = pytest.mark.anyio
+
+
+async def _login(client) -> dict:
+    response = await client.post("/api/auth/login", json={"username": "admin", "password": ADMIN_PASSWORD})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def _sync_denylist():
+    # o que run_denylist_sync faz a cada DENYLIST_SYNC_SECONDS em cada worker
+    async with async_session() as session:
+        await auth.sync_denylist(session)
+
+
+def _bearer(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+async def test_refresh_keeps_session_valid(client):
+    tokens = await _login(client)
+    response = await client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200, response.text
+    refreshed = response.json()
+
+    await _sync_denylist()
+
+    assert auth.decode_token(refreshed["access_token"]).session_id not in auth._denylist
+    assert (await client.get("/api/admin/ufs", headers=_bearer(refreshed))).status_code == 200
+    # o access token anterior continua válido até expirar
+    assert (await client.get("/api/admin/ufs", headers=_bearer(tokens))).status_code == 200
+
+
+async def test_reused_refresh_token_revokes_session(client):
+    tokens = await _login(client)
+    refreshed = (await client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})).json()
+
+    replay = await client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert replay.status_code == 401
+    # o par emitido na rotação também morre
+    again = await client.post("/api/auth/refresh", json={"refresh_token": refreshed["refresh_token"]})
+    assert again.status_code == 401
+    await _sync_denylist()
+    assert (await client.get("/api/admin/ufs", headers=_bearer(refreshed))).status_code == 401
+
+
+async def test_logout_revokes_session(client):
+    tokens = await _login(client)
+    other = await _login(client)
+    response = await client.post("/api/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+
+    await _sync_denylist()
+
+    assert (await client.get("/api/admin/ufs", headers=_bearer(tokens))).status_code == 401
+    assert (await client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})).status_code == 401
+    # outras sessões do mesmo usuário não são afetadas
+    assert (await client.get("/api/admin/ufs", headers=_bearer(other))).status_code == 200
+
+
+async def test_login_succeeds_when_rehash_is_rejected(client, monkeypatch):
+    # senha gravada com outro custo: o login tenta regravar com BCRYPT_ROUNDS
+    old_hash = bcrypt.hashpw(b"senha-antiga", bcrypt.gensalt(rounds=auth.BCRYPT_ROUNDS + 1)).decode()
+    async with async_session() as session:
+        session.add(User(username="rehash", password=old_hash, role="collab"))
+        await session.commit()
+
+    async def pool_full(password):
+        raise HTTPException(status_code=429, detail="Muitos logins simultâneos.")
+
+    monkeypatch.setattr(auth_routes, "hash_password_async", pool_full)
+    response = await client.post("/api/auth/login", json={"username": "rehash", "password": "senha-antiga"})
+    assert response.status_code == 200, response.text
+    async with async_session() as session:
+        assert (await session.execute(select(User.password).where(User.username == "rehash"))).scalar() == old_hash
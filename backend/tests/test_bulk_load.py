@@ -0,0 +1,92 @@
+"""Carga em massa pelo caminho do SQLite (app/bulk_load.py)."""
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from app.bulk_load import load_lookups, load_rows, records_to_rows
+from app.database import async_session
+from app.models import LostPlate, Schedule, ScheduleCategory
+from app.schemas import ScheduleImport
+
+from conftest import schedule_payload
+
+pytestmark = pytest.mark.anyio
+
+DAYS = ("2022-03-01", "2022-03-02")
+IN_LOAD = Schedule.schedule_date.in_([date.fromisoformat(day) for day in DAYS])
+
+
+def _records(days=DAYS) -> list:
+    return [ScheduleImport(**schedule_payload(day)) for day in days]
+
+
+async def _load(rows: tuple, replace: bool = False) -> dict:
+    async with async_session() as session:
+        counts = await load_rows(await session.connection(), *rows, replace=replace)
+        await session.commit()
+    return counts
+
+
+async def _rows(records: list) -> tuple:
+    async with async_session() as session:
+        return records_to_rows(records, *await load_lookups(await session.connection()))
+
+
+async def _count(model, *conditions) -> int:
+    async with async_session() as session:
+        return (await session.execute(select(func.count()).select_from(model).where(*conditions))).scalar()
+
+
+def _content(schedule: dict) -> dict:
+    """Agendamento da API sem ids nem datas de criação."""
+    return {
+        "company_id": schedule["company_id"],
+        "uf": schedule["uf"],
+        "schedule_date": schedule["schedule_date"],
+        "categories": sorted(
+            (c["category_name"], c["count"], [(p["plate_number"], p["reason"]) for p in c["lost_plates"]])
+            for c in schedule["categories"]
+        ),
+        "capacities": sorted((c["profile_name"], c["vehicle_count"]) for c in schedule["capacities"]),
+        "capacities_spot": sorted((c["profile_name"], c["vehicle_count"]) for c in schedule["capacities_spot"]),
+    }
+
+
+@pytest.fixture
+async def loaded(database) -> dict:
+    """Dois agendamentos com categorias, placas e capacidades (recarregados a cada teste)."""
+    return await _load(await _rows(_records()), replace=True)
+
+
+async def test_load_maps_local_keys_to_new_ids(loaded):
+    assert {k: v for k, v in loaded.items() if k != "replaced"} == {
+        "schedules": 2, "schedule_categories": 6, "lost_plates": 4, "schedule_capacities": 6,
+    }
+    # cada categoria no seu agendamento, cada placa na sua categoria
+    schedule_ids = select(Schedule.id).where(IN_LOAD)
+    category_ids = select(ScheduleCategory.id).where(ScheduleCategory.schedule_id.in_(schedule_ids))
+    assert await _count(ScheduleCategory, ScheduleCategory.schedule_id.in_(schedule_ids)) == 6
+    assert await _count(LostPlate, LostPlate.schedule_category_id.in_(category_ids)) == 4
+
+
+async def test_loaded_rows_round_trip_through_api(loaded, client, admin_headers):
+    response = await client.get(f"/api/schedules?start_date={DAYS[0]}&end_date={DAYS[-1]}", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    expected = [_content({**payload, "uf": payload["uf"].upper()}) for payload in map(schedule_payload, DAYS)]
+    assert sorted(map(_content, response.json()), key=lambda s: s["schedule_date"]) == expected
+
+
+async def test_replace_does_not_duplicate(loaded):
+    counts = await _load(await _rows(_records()), replace=True)
+    assert counts["replaced"] == 2
+    assert await _count(Schedule, IN_LOAD) == 2
+    assert await _count(ScheduleCategory, ScheduleCategory.schedule_id.in_(select(Schedule.id).where(IN_LOAD))) == 6
+
+
+async def test_child_with_unknown_parent_key_is_rejected(database):
+    schedules, categories, plates, capacities = await _rows(_records(["2022-04-01"]))
+    plates[0]["schedule_category_id"] = 99
+    with pytest.raises(ValueError, match="lost_plates"):
+        await _load((schedules, categories, plates, capacities))
+    assert await _count(Schedule, Schedule.schedule_date == date(2022, 4, 1)) == 0
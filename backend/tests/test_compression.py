@@ -0,0 +1,70 @@
+"""Compressão das respostas (app/compression.py)."""
+import gzip
+import json
+import threading
+
+import pytest
+
+from app import compression
+
+pytestmark = pytest.mark.anyio
+
+
+async def _respond(body: bytes, monkeypatch, vary: bytes = None):
+    """Resposta JSON passada pelo middleware; retorna (headers, corpo, threads usadas)."""
+    threads = set()
+    compress = compression.Encoder.compress
+
+    def tracking_compress(self, data, last):
+        threads.add(threading.current_thread() is threading.main_thread())
+        return compress(self, data, last)
+
+    async def app(scope, receive, send):
+        headers = [(b"content-type", b"application/json")]
+        if vary is not None:
+            headers.append((b"vary", vary))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/schedules",
+             "headers": [(b"accept-encoding", b"gzip")]}
+    monkeypatch.setattr(compression.Encoder, "compress", tracking_compress)
+    await compression.CompressionMiddleware(app)(scope, None, send)
+    return dict(sent[0]["headers"]), sent[1]["body"], threads
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(compression, "COMPRESSION_ENCODINGS", ["gzip"])
+
+
+async def test_large_body_is_compressed_off_the_event_loop(gzip_only, monkeypatch):
+    body = json.dumps([{"id": n, "category_name": "Carros em rota"} for n in range(20000)]).encode()
+    assert len(body) > compression.COMPRESSION_THREAD_MIN_SIZE
+    headers, compressed, threads = await _respond(body, monkeypatch)
+    assert headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(compressed) == body
+    assert threads == {False}
+
+
+async def test_small_body_is_compressed_inline(gzip_only, monkeypatch):
+    body = json.dumps([{"id": n} for n in range(200)]).encode()
+    headers, compressed, threads = await _respond(body, monkeypatch)
+    assert gzip.decompress(compressed) == body
+    assert threads == {True}
+
+
+@pytest.mark.parametrize("vary, expected", [
+    (None, b"Accept-Encoding"),
+    (b"Origin", b"Origin, Accept-Encoding"),
+    (b"Accept-Encoding", b"Accept-Encoding"),
+    (b"Origin, accept-encoding", b"Origin, accept-encoding"),
+])
+async def test_vary_lists_accept_encoding_once(gzip_only, monkeypatch, vary, expected):
+    headers, _, _ = await _respond(b"x" * 4096, monkeypatch, vary)
+    assert headers[b"vary"] == expected
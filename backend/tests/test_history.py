@@ -0,0 +1,58 @@
+"""Histórico de alterações (app/history.py e GET /api/schedules/{id}/history)."""
+import pytest
+
+from conftest import ADMIN_PASSWORD, schedule_payload
+
+pytestmark = pytest.mark.anyio
+
+DAY = "2025-05-06"
+
+
+@pytest.fixture
+async def user_headers(client) -> dict:
+    # login de usuário: o histórico guarda o user_id e devolve o username
+    response = await client.post("/api/auth/login", json={"username": "admin", "password": ADMIN_PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def test_create_and_update_are_recorded(client, user_headers):
+    created = await client.post("/api/schedules", json=schedule_payload(DAY), headers=user_headers)
+    assert created.status_code == 200, created.text
+    schedule_id = created.json()["id"]
+
+    payload = schedule_payload(DAY)
+    payload["uf"] = "ceará"
+    payload["categories"][1]["count"] = 4  # Reentrega
+    payload["capacities"] = [
+        {"profile_name": "HR", "vehicle_count": 2},
+        {"profile_name": "Truck", "vehicle_count": 1},
+    ]
+    updated = await client.put(f"/api/schedules/{schedule_id}", json=payload, headers=user_headers)
+    assert updated.status_code == 200, updated.text
+
+    response = await client.get(f"/api/schedules/{schedule_id}/history", headers=user_headers)
+    assert response.status_code == 200, response.text
+    create, update = response.json()
+
+    assert (create["action"], create["username"], create["role"]) == ("create", "admin", "admin")
+    # na criação tudo vem de null
+    assert create["changes"]["uf"] == [None, "BAHIA"]
+    assert create["changes"]["schedule_date"] == [None, DAY]
+    assert create["changes"]["categories"]["Indisponíveis"] == [
+        None, [[2, "", [["ABC1D23", "Manutenção"], ["XYZ9K87", "Sem motorista"]]]]
+    ]
+    assert create["changes"]["capacities_spot"] == {"Spot Truck": [None, [[1, 14000]]]}
+
+    # na edição só o que mudou; perfil removido/adicionado vira null do outro lado
+    assert update["action"] == "update"
+    assert update["changes"] == {
+        "uf": ["BAHIA", "CEARÁ"],
+        "categories": {"Reentrega": [[[1, "", []]], [[4, "", []]]]},
+        "capacities": {"Toco": [[[1, 7000]], None], "Truck": [None, [[1, 14000]]]},
+    }
+
+
+async def test_history_of_unknown_schedule(client, admin_headers):
+    response = await client.get("/api/schedules/999999/history", headers=admin_headers)
+    assert response.status_code == 404
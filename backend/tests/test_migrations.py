@@ -0,0 +1,113 @@
+"""Migração de um banco anterior às migrações versionadas (app/migrations.py).
+
+O banco "legado" tem o schema de antes da migração 4: nomes de categoria e
+perfil em texto nas tabelas filhas e as capacidades spot numa tabela à
+parte, sem ``schema_migrations``.
+"""
+import pytest
+from sqlalchemy import text
+
+from app import database as db
+from app.migrations import SCHEMA_VERSION, column_exists, run_migrations, table_exists
+
+from conftest import TMP_DIR
+
+pytestmark = pytest.mark.anyio
+
+LEGACY_SCHEMA = [
+    "CREATE TABLE companies (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE, "
+    "uf VARCHAR NOT NULL DEFAULT 'BAHIA', vehicle_goal INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE schedules (id INTEGER PRIMARY KEY, company_id INTEGER NOT NULL REFERENCES companies(id), "
+    "uf VARCHAR NOT NULL, schedule_date DATE NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME)",
+    "CREATE TABLE schedule_categories (id INTEGER PRIMARY KEY, schedule_id INTEGER NOT NULL REFERENCES schedules(id), "
+    "category_name VARCHAR NOT NULL, count INTEGER NOT NULL, profile_name VARCHAR NOT NULL)",
+    "CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE)",
+    "CREATE TABLE capacity_profiles (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE, "
+    "weight INTEGER NOT NULL, spot BOOLEAN NOT NULL)",
+    "CREATE TABLE lost_plates (id INTEGER PRIMARY KEY, "
+    "schedule_category_id INTEGER NOT NULL REFERENCES schedule_categories(id), "
+    "plate_number VARCHAR NOT NULL, reason VARCHAR NOT NULL)",
+    "CREATE TABLE schedule_capacities (id INTEGER PRIMARY KEY, schedule_id INTEGER NOT NULL REFERENCES schedules(id), "
+    "profile_name VARCHAR NOT NULL, vehicle_count INTEGER NOT NULL, total_weight_kg INTEGER NOT NULL)",
+    "CREATE TABLE schedule_capacity_spots (id INTEGER PRIMARY KEY, "
+    "schedule_id INTEGER NOT NULL REFERENCES schedules(id), "
+    "profile_name VARCHAR NOT NULL, vehicle_count INTEGER NOT NULL, total_weight_kg INTEGER NOT NULL)",
+]
+
+# "Categoria Antiga", "Carreta" e "Spot Antigo" só existem nas tabelas filhas
+LEGACY_DATA = [
+    "INSERT INTO companies (id, name) VALUES (1, '3 Corações')",
+    "INSERT INTO categories (id, name) VALUES (1, 'Carros em rota')",
+    "INSERT INTO capacity_profiles (id, name, weight, spot) VALUES (1, 'HR', 1500, 0), (2, 'Spot Truck', 14000, 1)",
+    "INSERT INTO schedules (id, company_id, uf, schedule_date, created_at) "
+    "VALUES (1, 1, 'BAHIA', '2024-02-01', '2024-01-31 10:00:00')",
+    "INSERT INTO schedule_categories (id, schedule_id, category_name, count, profile_name) "
+    "VALUES (1, 1, 'Carros em rota', 3, ''), (2, 1, 'Categoria Antiga', 1, 'HR')",
+    "INSERT INTO lost_plates (schedule_category_id, plate_number, reason) VALUES (2, 'ABC1D23', 'Manutenção')",
+    "INSERT INTO schedule_capacities (schedule_id, profile_name, vehicle_count, total_weight_kg) "
+    "VALUES (1, 'HR', 2, 3000), (1, 'Carreta', 1, 25000)",
+    "INSERT INTO schedule_capacity_spots (schedule_id, profile_name, vehicle_count, total_weight_kg) "
+    "VALUES (1, 'Spot Truck', 1, 14000), (1, 'Spot Antigo', 2, 20000)",
+]
+
+
+@pytest.fixture(scope="module")
+async def legacy_engine(database):
+    path = TMP_DIR / "legacy.db"
+    path.unlink(missing_ok=True)
+    legacy = db.make_engine(f"sqlite+aiosqlite:///{path}")
+    async with legacy.begin() as conn:
+        for sql in LEGACY_SCHEMA + LEGACY_DATA:
+            await conn.execute(text(sql))
+    await run_migrations(legacy)
+    yield legacy
+    await legacy.dispose()
+
+
+async def _rows(engine, sql: str) -> list:
+    async with engine.connect() as conn:
+        return [tuple(row) for row in (await conn.execute(text(sql))).all()]
+
+
+async def test_all_migrations_applied(legacy_engine):
+    assert await _rows(legacy_engine, "SELECT MAX(version) FROM schema_migrations") == [(SCHEMA_VERSION,)]
+    async with legacy_engine.connect() as conn:
+        assert not await table_exists(conn, "schedule_capacity_spots")
+        assert not await column_exists(conn, "schedule_categories", "category_name")
+        for table in ("schedule_categories", "schedule_capacities"):
+            assert not await column_exists(conn, table, "profile_name")
+
+
+async def test_unknown_names_become_reference_rows(legacy_engine):
+    categories = dict(await _rows(legacy_engine, "SELECT name, id FROM categories"))
+    assert categories["Carros em rota"] == 1  # existente mantém o id
+    assert "Categoria Antiga" in categories
+    profiles = {name: (weight, bool(spot)) for name, weight, spot in
+                await _rows(legacy_engine, "SELECT name, weight, spot FROM capacity_profiles")}
+    assert profiles["HR"] == (1500, False)
+    # perfis que só aparecem no histórico voltam com peso 0
+    assert profiles["Carreta"] == (0, False)
+    assert profiles["Spot Antigo"] == (0, True)
+
+
+async def test_child_rows_keep_their_names(legacy_engine):
+    assert await _rows(legacy_engine, (
+        "SELECT sc.id, c.name, sc.count, p.name FROM schedule_categories sc "
+        "JOIN categories c ON c.id = sc.category_id "
+        "LEFT JOIN capacity_profiles p ON p.id = sc.profile_id ORDER BY sc.id"
+    )) == [(1, "Carros em rota", 3, None), (2, "Categoria Antiga", 1, "HR")]
+    assert await _rows(legacy_engine, "SELECT schedule_category_id, plate_number, reason FROM lost_plates") == [
+        (2, "ABC1D23", "Manutenção"),
+    ]
+
+
+async def test_spot_capacities_merged(legacy_engine):
+    assert await _rows(legacy_engine, (
+        "SELECT sc.schedule_id, p.name, sc.vehicle_count, sc.total_weight_kg, sc.spot "
+        "FROM schedule_capacities sc JOIN capacity_profiles p ON p.id = sc.profile_id ORDER BY sc.id"
+    )) == [
+        (1, "HR", 2, 3000, 0),
+        (1, "Carreta", 1, 25000, 0),
+        (1, "Spot Truck", 1, 14000, 1),
+        (1, "Spot Antigo", 2, 20000, 1),
+    ]
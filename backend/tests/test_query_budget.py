@@ -0,0 +1,94 @@
+"""Quantidade de queries por endpoint (ver ``query_budget`` em app/instrumentation.py).
+
+Os números são fixos e não dependem do tamanho do payload nem do período:
+uma mudança aqui é um N+1 novo (ou uma query a menos, e então o teste e o
+``@query_budget`` do endpoint descem juntos). No SQLite o BEGIN conta.
+"""
+import pytest
+from sqlalchemy import text
+
+from app import instrumentation, references
+from app.database import async_session
+from app.instrumentation import count_queries
+from app.models import Company
+
+from conftest import schedule_payload
+
+pytestmark = pytest.mark.anyio
+
+PERIOD = "start_date=2025-01-01&end_date=2025-01-31"
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    """Conta as queries das requisições no próprio teste, sem o TimingMiddleware.
+
+    O cache de referências começa vazio: a contagem não depende de qual
+    teste rodou antes.
+    """
+    monkeypatch.setattr(instrumentation, "TIMING_ENABLED", False)
+    references.invalidate()
+
+    async def request(call):
+        with count_queries() as stats:
+            response = await call
+        assert response.status_code == 200, response.text
+        return response, stats.budget_count
+
+    return request
+
+
+async def test_create_schedule(client, admin_headers, counted):
+    _, queries = await counted(client.post("/api/schedules", json=schedule_payload(), headers=admin_headers))
+    # BEGIN, empresa, perfis, referências, schedule, 1 INSERT por coleção, histórico
+    assert queries == 9
+
+
+async def test_update_schedule(client, admin_headers, counted):
+    created = await client.post("/api/schedules", json=schedule_payload(), headers=admin_headers)
+    payload = schedule_payload()
+    payload["capacities"].append({"profile_name": "Truck", "vehicle_count": 3})
+    _, queries = await counted(
+        client.put(f"/api/schedules/{created.json()['id']}", json=payload, headers=admin_headers)
+    )
+    # BEGIN, schedule + 3 coleções, perfis, histórico, UPDATE,
+    # INSERT e DELETE por coleção
+    assert queries == 14
+
+
+async def test_list_schedules(client, admin_headers, counted):
+    for day in ("2025-01-03", "2025-01-04", "2025-01-05"):
+        await client.post("/api/schedules", json=schedule_payload(day), headers=admin_headers)
+    response, queries = await counted(client.get(f"/api/schedules?{PERIOD}", headers=admin_headers))
+    assert len(response.json()) >= 3
+    # BEGIN, COUNT do query_guard, agendamentos com os filhos em JSON
+    assert queries == 3
+
+
+async def test_dashboard_metrics(client, admin_headers, counted):
+    await client.post("/api/schedules", json=schedule_payload(), headers=admin_headers)
+    _, queries = await counted(client.get(f"/api/dashboard/metrics?{PERIOD}", headers=admin_headers))
+    assert queries == 4
+
+
+async def test_export(client, admin_headers, counted):
+    await client.post("/api/schedules", json=schedule_payload(), headers=admin_headers)
+    _, queries = await counted(client.get(f"/api/schedules/export?{PERIOD}", headers=admin_headers))
+    assert queries == 4
+
+
+async def test_loop_of_inserts_is_not_discounted(database):
+    # um flush com várias linhas conta uma vez; um flush por linha conta todas
+    async with async_session() as session:
+        await session.execute(text("SELECT 1"))
+        with count_queries() as batched:
+            session.add_all(Company(name=f"Lote {n}") for n in range(3))
+            await session.flush()
+        with count_queries() as loop:
+            for n in range(3):
+                session.add(Company(name=f"Loop {n}"))
+                await session.flush()
+        await session.rollback()
+    assert batched.sql_count == 3
+    assert batched.budget_count == 1
+    assert loop.budget_count == 3
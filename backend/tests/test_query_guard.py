@@ -0,0 +1,69 @@
+"""Janela padrão e limites das leituras por período (app/query_guard.py)."""
+from datetime import date, timedelta
+
+from fastapi import HTTPException
+import pytest
+
+from app import query_guard
+from app.auth import Principal
+from app.database import async_session
+from app.models import Schedule
+
+from conftest import schedule_payload
+
+pytestmark = pytest.mark.anyio
+
+ADMIN = Principal(role="admin", expires_at=0)
+COLLAB = Principal(role="collab", expires_at=0)
+
+
+def test_default_window_without_dates():
+    start, end = query_guard.resolve_window("schedules", None, None, None)
+    assert start == date.today() - timedelta(days=query_guard.DEFAULT_WINDOW_DAYS - 1)
+    # sem data final: inclui o que já está agendado à frente
+    assert end is None
+
+
+def test_only_end_date_counts_window_backwards():
+    end_date = date(2025, 6, 30)
+    start, end = query_guard.resolve_window("schedules", None, None, end_date)
+    assert (start, end) == (end_date - timedelta(days=query_guard.DEFAULT_WINDOW_DAYS - 1), end_date)
+
+
+def test_end_before_start_is_rejected():
+    with pytest.raises(HTTPException) as exc:
+        query_guard.resolve_window("schedules", ADMIN, date(2025, 2, 1), date(2025, 1, 31))
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("principal, allowed", [(None, 93), (COLLAB, 366), (ADMIN, 1096)])
+def test_range_limit_per_role(principal, allowed):
+    start = date(2024, 1, 1)
+    resolved = query_guard.resolve_window("schedules", principal, start, start + timedelta(days=allowed - 1))
+    assert resolved[0] == start
+    with pytest.raises(HTTPException) as exc:
+        query_guard.resolve_window("schedules", principal, start, start + timedelta(days=allowed))
+    assert exc.value.status_code == 400
+    assert f"máximo de {allowed} dias" in exc.value.detail
+
+
+async def test_admin_token_raises_range_limit_on_api(client, admin_headers):
+    url = "/api/dashboard/metrics?start_date=2024-01-01&end_date=2024-06-30"
+    assert (await client.get(url)).status_code == 400
+    assert (await client.get(url, headers=admin_headers)).status_code == 200
+
+
+async def test_check_size_rejects_large_periods(client, admin_headers):
+    for day in ("2023-05-02", "2023-05-20"):
+        response = await client.post("/api/schedules", json=schedule_payload(day), headers=admin_headers)
+        assert response.status_code == 200, response.text
+    start, end = date(2023, 5, 1), date(2023, 6, 30)
+    conditions = [Schedule.schedule_date >= start, Schedule.schedule_date <= end]
+    async with async_session() as session:
+        await query_guard.check_size(session, "schedules", conditions, start, end, limit=2)
+        with pytest.raises(HTTPException) as exc:
+            await query_guard.check_size(session, "schedules", conditions, start, end, limit=1)
+        # períodos dentro da janela padrão não passam pelo COUNT
+        await query_guard.check_size(session, "schedules", conditions, start, date(2023, 5, 30), limit=1)
+    assert exc.value.status_code == 400
+    assert "Consulta com 2 agendamentos" in exc.value.detail
@@ -0,0 +1,57 @@
+"""Baldes do rate limit (app/ratelimit.py): por sessão verificada e por IP."""
+import secrets
+
+import pytest
+
+from app import auth, ratelimit
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_REDIS_URL", None)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_CAPACITY", 3)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_IP_CAPACITY", 5)
+    # recarga desprezível durante o teste
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_REFILL_PER_SEC", 0.001)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_IP_REFILL_PER_SEC", 0.001)
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    middleware = ratelimit.RateLimitMiddleware(app)
+
+    async def request(token: str, ip: str = "10.0.0.1") -> int:
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/api/companies", "client": (ip, 1234),
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+        }
+        await middleware(scope, None, send)
+        return sent[0]["status"]
+
+    return request
+
+
+def _session_token() -> str:
+    return auth.create_access_token({"role": "collab", "sid": secrets.token_hex(8)})
+
+
+async def test_random_tokens_share_the_ip_bucket(limiter):
+    statuses = [await limiter(secrets.token_urlsafe(24)) for _ in range(4)]
+    assert statuses == [200, 200, 200, 429]
+
+
+async def test_verified_sessions_have_own_bucket_within_ip_limit(limiter):
+    first, second = _session_token(), _session_token()
+    assert [await limiter(first) for _ in range(4)] == [200, 200, 200, 429]
+    # a outra sessão tem o próprio balde, mas o IP já gastou 4 de 5
+    assert [await limiter(second) for _ in range(2)] == [200, 429]
+    assert await limiter(second, ip="10.0.0.2") == 200
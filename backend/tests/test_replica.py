@@ -0,0 +1,68 @@
+"""Roteamento de leituras para a réplica (``get_replica_session`` em app/database.py).
+
+A "réplica" é um segundo arquivo SQLite migrado mas sem replicação: o que o
+primário grava não aparece nele, então a resposta mostra de onde veio a
+leitura.
+"""
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import database as db
+from app.migrations import run_migrations
+
+from conftest import TMP_DIR, schedule_payload
+
+pytestmark = pytest.mark.anyio
+
+DAY = "2025-03-10"
+LIST = f"/api/schedules?start_date={DAY}&end_date={DAY}"
+
+
+@pytest.fixture(scope="module")
+async def replica_engine(database):
+    replica = db.make_engine(f"sqlite+aiosqlite:///{TMP_DIR / 'replica.db'}")
+    await run_migrations(replica)
+    yield replica
+    await replica.dispose()
+
+
+@pytest.fixture
+async def replica(replica_engine, client, admin_headers, monkeypatch):
+    """Réplica configurada e um agendamento que só existe no primário."""
+    created = await client.post("/api/schedules", json=schedule_payload(DAY), headers=admin_headers)
+    assert created.status_code == 200, created.text
+    monkeypatch.setattr(db, "replica_engine", replica_engine)
+    monkeypatch.setattr(db, "replica_session", async_sessionmaker(
+        db._read_only(replica_engine), class_=AsyncSession, expire_on_commit=False, autoflush=False
+    ))
+    monkeypatch.setattr(db, "replica_lag", 0.0)
+    return created.json()["id"]
+
+
+def _ids(response) -> list:
+    assert response.status_code == 200, response.text
+    return [schedule["id"] for schedule in response.json()]
+
+
+async def test_reads_go_to_replica_without_cookie(replica, client, admin_headers):
+    assert _ids(await client.get(LIST, headers=admin_headers)) == []
+
+
+async def test_read_after_write_goes_to_primary(replica, client, admin_headers):
+    response = await client.post("/api/schedules", json=schedule_payload(DAY), headers=admin_headers)
+    assert db.LAST_WRITE_COOKIE in response.cookies
+
+    ids = _ids(await client.get(LIST, headers=admin_headers))
+    assert replica in ids and response.json()["id"] in ids
+
+
+async def test_old_write_cookie_reads_replica(replica, client, admin_headers, monkeypatch):
+    await client.post("/api/schedules", json=schedule_payload(DAY), headers=admin_headers)
+    # a janela de read-your-writes já passou
+    monkeypatch.setattr(db, "REPLICA_READ_AFTER_WRITE_SECONDS", 0)
+    assert _ids(await client.get(LIST, headers=admin_headers)) == []
+
+
+async def test_lagging_replica_falls_back_to_primary(replica, client, admin_headers, monkeypatch):
+    monkeypatch.setattr(db, "replica_lag", db.REPLICA_MAX_LAG_SECONDS + 1)
+    assert replica in _ids(await client.get(LIST, headers=admin_headers))
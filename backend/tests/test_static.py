@@ -0,0 +1,63 @@
+"""Arquivos estáticos em memória (app/static.py)."""
+import gzip
+
+import pytest
+
+from app import static
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("name, hashed", [
+    ("index-BqS7xk2a.js", True),
+    ("vendor-B-x_ab1d.css", True),
+    ("logo-transparent.png", False),
+    ("logo-original.png", False),
+    ("favicon.ico", False),
+])
+def test_hashed_names(name, hashed):
+    assert bool(static.HASHED_NAME.search(name)) is hashed
+
+
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+    monkeypatch.setattr(static, "brotli", None)
+    data = b"console.log('logisched');" * 100
+    (tmp_path / "index-BqS7xk2a.js").write_bytes(data)
+    (tmp_path / "index-BqS7xk2a.js.gz").write_bytes(gzip.compress(data))
+    (tmp_path / "logo-transparent.png").write_bytes(b"png")
+    return static.AssetFiles(tmp_path)
+
+
+async def _get(assets, path: str, headers: dict):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "root_path": "",
+             "headers": [(k.encode(), v.encode()) for k, v in headers.items()]}
+    await assets(scope, None, send)
+    return sent[0]["status"], {k.decode(): v.decode() for k, v in sent[0]["headers"]}
+
+
+async def test_cache_control(assets):
+    _, headers = await _get(assets, "/index-BqS7xk2a.js", {})
+    assert headers["cache-control"] == static.IMMUTABLE
+    _, headers = await _get(assets, "/logo-transparent.png", {})
+    assert headers["cache-control"] == static.REVALIDATE
+
+
+async def test_etag_per_encoding(assets):
+    _, identity = await _get(assets, "/index-BqS7xk2a.js", {})
+    _, gzipped = await _get(assets, "/index-BqS7xk2a.js", {"accept-encoding": "gzip"})
+    assert gzipped["content-encoding"] == "gzip"
+    assert identity["etag"] != gzipped["etag"]
+
+    status, _ = await _get(assets, "/index-BqS7xk2a.js", {"accept-encoding": "gzip", "if-none-match": gzipped["etag"]})
+    assert status == 304
+    # a ETag do corpo sem compressão não valida o corpo gzip (nem o contrário)
+    status, _ = await _get(assets, "/index-BqS7xk2a.js", {"accept-encoding": "gzip", "if-none-match": identity["etag"]})
+    assert status == 200
+    status, _ = await _get(assets, "/index-BqS7xk2a.js", {"if-none-match": gzipped["etag"]})
+    assert status == 200
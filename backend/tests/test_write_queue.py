@@ -0,0 +1,33 @@
+"""Fila de escrita do SQLite (``sqlite_writer``/``WriteQueueDep`` em app/database.py)."""
+import pytest
+
+from app import database as db
+
+from conftest import ADMIN_PASSWORD, schedule_payload
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def queue_busy(monkeypatch):
+    """Outra escrita segurando a vez na fila do worker."""
+    monkeypatch.setattr(db, "SQLITE_WRITE_QUEUE_TIMEOUT", 0.2)
+    await db._sqlite_write_lock.acquire()
+    yield
+    db._sqlite_write_lock.release()
+
+
+async def test_login_does_not_wait_for_write_queue(queue_busy, client):
+    response = await client.post("/api/auth/login", json={"username": "admin", "password": ADMIN_PASSWORD})
+    assert response.status_code == 200, response.text
+
+
+async def test_unauthenticated_write_does_not_take_queue(queue_busy, client):
+    response = await client.post("/api/schedules", json=schedule_payload("2025-04-01"))
+    assert response.status_code == 401
+
+
+async def test_create_schedule_waits_for_write_queue(queue_busy, client, admin_headers):
+    response = await client.post("/api/schedules", json=schedule_payload("2025-04-01"), headers=admin_headers)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
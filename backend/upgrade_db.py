@@ -1,95 +1,49 @@
+import argparse
 import asyncio
 import os
-from sqlalchemy import text
-from app.database import engine, Base
+import sys
+import time
 
-async def upgrade_database():
-    """Automated migration script that adds new tables and columns without dropping data.
+from app.database import engine
+from app.migrations import ensure_partitions, run_migrations, MigrationError, SCHEMA_VERSION
 
-    - Creates any tables that didn't exist (schedule_capacities, schedule_capacity_spots, etc.)
-    - Adds the `reason` column to `lost_plates` if missing.
-    - Adds the `profile_name` column to `schedule_categories` if missing.
+async def upgrade_database(dry_run: bool = False) -> bool:
+    """Apply pending schema migrations (see app/migrations.py).
 
-    Run this script after pulling the latest changes to bring an existing database up to date.
-    It is safe to run multiple times.
+    Run this once before starting the API workers (the Docker image does it
+    on every start). Applied migrations are recorded in `schema_migrations`,
+    so it is safe to run multiple times. With `--dry-run` it only lists the
+    pending migrations.
     """
     print("Running database upgrade...")
     print(f"Using DATABASE_URL={os.getenv('DATABASE_URL')}")
+    started = time.perf_counter()
+    ok = True
     try:
-        async with engine.connect() as conn:
-            # Transaction for initial table creation
-            async with conn.begin():
-                await conn.run_sync(Base.metadata.create_all)
-
-            is_sqlite = conn.dialect.name == 'sqlite'
-
-            # --- Add 'reason' column to lost_plates ---
-            async with conn.begin():
-                has_column = False
-                if is_sqlite:
-                    result = await conn.execute(text("PRAGMA table_info('lost_plates')"))
-                    columns = [row[1] for row in result.all()]
-                    if 'reason' in columns:
-                        has_column = True
-                else: # PostgreSQL and other DBs
-                    res = await conn.execute(text("SELECT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = 'lost_plates' AND column_name = 'reason')"))
-                    if res.scalar():
-                        has_column = True
-                
-                if not has_column:
-                    print("Adding 'reason' column to lost_plates table")
-                    if is_sqlite:
-                        await conn.execute(text("ALTER TABLE lost_plates ADD COLUMN reason TEXT DEFAULT ''"))
-                    else:
-                        await conn.execute(text("ALTER TABLE lost_plates ADD COLUMN reason VARCHAR(255) DEFAULT ''"))
-
-            # --- Add 'profile_name' column to schedule_categories ---
-            async with conn.begin():
-                has_column = False
-                if is_sqlite:
-                    result = await conn.execute(text("PRAGMA table_info('schedule_categories')"))
-                    columns = [row[1] for row in result.all()]
-                    if 'profile_name' in columns:
-                        has_column = True
-                else: # PostgreSQL and other DBs
-                    res = await conn.execute(text("SELECT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = 'schedule_categories' AND column_name = 'profile_name')"))
-                    if res.scalar():
-                        has_column = True
-
-                if not has_column:
-                    print("Adding 'profile_name' column to schedule_categories table")
-                    if is_sqlite:
-                        await conn.execute(text("ALTER TABLE schedule_categories ADD COLUMN profile_name TEXT DEFAULT ''"))
-                    else:
-                        await conn.execute(text("ALTER TABLE schedule_categories ADD COLUMN profile_name VARCHAR(255) DEFAULT ''"))
-
-            # --- Add 'vehicle_goal' column to companies ---
-            async with conn.begin():
-                has_column = False
-                if is_sqlite:
-                    result = await conn.execute(text("PRAGMA table_info('companies')"))
-                    columns = [row[1] for row in result.all()]
-                    if 'vehicle_goal' in columns:
-                        has_column = True
-                else: # PostgreSQL and other DBs
-                    res = await conn.execute(text("SELECT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = 'companies' AND column_name = 'vehicle_goal')"))
-                    if res.scalar():
-                        has_column = True
-
-                if not has_column:
-                    print("Adding 'vehicle_goal' column to companies table")
-                    await conn.execute(text("ALTER TABLE companies ADD COLUMN vehicle_goal INTEGER DEFAULT 0"))
-
+        applied = await run_migrations(engine, dry_run=dry_run)
+        if not applied:
+            print(f"Schema already at version {SCHEMA_VERSION}.")
+        if not dry_run:
+            # monthly partitions (Postgres) for the coming months
+            await ensure_partitions(engine)
+    except MigrationError as e:
+        ok = False
+        print(f"Erro de migração: {e}")
     except Exception as e:
+        ok = False
         print(f"Erro ao atualizar banco de dados: {e}")
         print("Verifique a conexão com o banco (DATABASE_URL), talvez ele não esteja acessível a partir deste host.")
     finally:
         await engine.dispose()
-    print("Database upgrade complete.")
+    if ok and not dry_run:
+        print(f"Database upgrade complete in {time.perf_counter() - started:.2f}s.")
+    return ok
 
 if __name__ == '__main__':
     # windows event loop fix
-    import os
     if os.name == 'nt':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    asyncio.run(upgrade_database())
+    parser = argparse.ArgumentParser(description="Apply pending database migrations")
+    parser.add_argument("--dry-run", action="store_true", help="only list pending migrations")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(upgrade_database(args.dry_run)) else 1)
@@ -0,0 +1,90 @@
+import axios from 'axios'
+
+// Access tokens are short-lived; when the API answers 401 we trade the
+// refresh token for a new pair once and replay the original request.
+
+const ACCESS_KEY = 'admin_token'
+const REFRESH_KEY = 'refresh_token'
+
+let refreshing = null
+
+export function storeSession(data) {
+  localStorage.setItem(ACCESS_KEY, data.access_token)
+  if (data.refresh_token) localStorage.setItem(REFRESH_KEY, data.refresh_token)
+}
+
+export function clearSession() {
+  const refreshToken = localStorage.getItem(REFRESH_KEY)
+  localStorage.removeItem(ACCESS_KEY)
+  localStorage.removeItem(REFRESH_KEY)
+  delete axios.defaults.headers.common['Authorization']
+  if (refreshToken) {
+    axios.post('/api/auth/logout', { refresh_token: refreshToken }).catch(() => {})
+  }
+}
+
+function refreshAccessToken() {
+  const refreshToken = localStorage.getItem(REFRESH_KEY)
+  if (!refreshToken) return Promise.reject(new Error('no refresh token'))
+  // concurrent 401s share a single refresh call
+  if (!refreshing) {
+    refreshing = axios
+      .post('/api/auth/refresh', { refresh_token: refreshToken }, { _skipAuthRefresh: true })
+      .then((res) => {
+        storeSession(res.data)
+        return res.data.access_token
+      })
+      .finally(() => {
+        refreshing = null
+      })
+  }
+  return refreshing
+}
+
+// For endpoints that also answer anonymously (schedule list, dashboard): the
+// token raises the role-based limits, and a dead session falls back to an
+// anonymous request instead of failing the page.
+export function optionalAuthConfig() {
+  const token = localStorage.getItem(ACCESS_KEY)
+  return token ? { headers: { Authorization: `Bearer ${token}` }, _optionalAuth: true } : {}
+}
+
+export function setupAuthInterceptors() {
+  // always send the newest token, even if a page captured an older one
+  axios.interceptors.request.use((config) => {
+    const token = localStorage.getItem(ACCESS_KEY)
+    const auth = config.headers?.Authorization
+    if (token && typeof auth === 'string' && auth.startsWith('Bearer ')) {
+      config.headers.Authorization = `Bearer ${token}`
+    }
+    return config
+  })
+
+  axios.interceptors.response.use(
+    (response) => response,
+    async (error) => {
+      const original = error.config
+      const isAuthCall = original?.url?.includes('/auth/')
+      if (error.response?.status !== 401 || !original || original._retried || original._skipAuthRefresh || isAuthCall) {
+        return Promise.reject(error)
+      }
+      try {
+        const token = await refreshAccessToken()
+        original._retried = true
+        original.headers.Authorization = `Bearer ${token}`
+        if (axios.defaults.headers.common['Authorization']) {
+          axios.defaults.headers.common['Authorization'] = `Bearer ${token}`
+        }
+        return axios(original)
+      } catch (_e) {
+        if (original._optionalAuth) {
+          clearSession()
+          original._retried = true
+          delete original.headers.Authorization
+          return axios(original)
+        }
+        return Promise.reject(error)
+      }
+    }
+  )
+}
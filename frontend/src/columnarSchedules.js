@@ -0,0 +1,66 @@
+import axios from 'axios'
+import { optionalAuthConfig } from './authSession'
+
+// GET /api/schedules?format=columnar sends parallel column arrays with
+// string tables instead of one object per schedule (see backend/app/columnar.py).
+// decodeColumnarSchedules rebuilds the same objects the default format returns.
+
+const lookup = (table) => (index) => (index < 0 ? null : table[index])
+
+function children(start, end, build) {
+  const items = []
+  for (let j = start; j < end; j++) items.push(build(j))
+  return items
+}
+
+export function decodeColumnarSchedules(data) {
+  const uf = lookup(data.strings.uf)
+  const date = lookup(data.strings.date)
+  const category = lookup(data.strings.category)
+  const profile = lookup(data.strings.profile)
+  const { schedules: s, categories: cat, lost_plates: lp, capacities: cap, capacities_spot: spot } = data
+
+  const capacity = (columns) => (j) => ({
+    id: columns.id[j],
+    profile_name: profile(columns.profile_name[j]),
+    vehicle_count: columns.vehicle_count[j],
+    total_weight_kg: columns.total_weight_kg[j],
+  })
+
+  const result = new Array(data.count)
+  for (let i = 0; i < data.count; i++) {
+    result[i] = {
+      id: s.id[i],
+      company_id: s.company_id[i],
+      uf: uf(s.uf[i]),
+      schedule_date: date(s.schedule_date[i]),
+      created_at: s.created_at[i],
+      updated_at: null,
+      categories: children(cat.offsets[i], cat.offsets[i + 1], (j) => ({
+        id: cat.id[j],
+        category_name: category(cat.category_name[j]),
+        count: cat.count[j],
+        profile_name: profile(cat.profile_name[j]),
+        lost_plates: children(lp.offsets[j], lp.offsets[j + 1], (k) => ({
+          plate_number: lp.plate_number[k],
+          reason: lp.reason[k],
+        })),
+      })),
+      capacities: children(cap.offsets[i], cap.offsets[i + 1], capacity(cap)),
+      capacities_spot: children(spot.offsets[i], spot.offsets[i + 1], capacity(spot)),
+      total_capacity_kg: s.total_capacity_kg[i],
+      total_capacity_spot_kg: s.total_capacity_spot_kg[i],
+      total_vehicles: s.total_vehicles[i],
+      total_vehicles_spot: s.total_vehicles_spot[i],
+    }
+  }
+  return result
+}
+
+// params: URLSearchParams or a plain object of query parameters
+export async function fetchSchedules(params = {}) {
+  const query = new URLSearchParams(params)
+  query.set('format', 'columnar')
+  const response = await axios.get(`/api/schedules?${query.toString()}`, optionalAuthConfig())
+  return decodeColumnarSchedules(response.data)
+}
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { storeSession } from '../authSession';
 
 const AuthModal = ({ onAuthenticated }) => {
   const [isOpen, setIsOpen] = useState(true);
@@ -29,7 +30,7 @@ const AuthModal = ({ onAuthenticated }) => {
       });
 
       const token = response.data.access_token;
-      localStorage.setItem('admin_token', token);
+      storeSession(response.data);
       setIsOpen(false);
       if (onAuthenticated) onAuthenticated(token);
       
@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react'
 import axios from 'axios'
 import { Trash2, Plus } from 'lucide-react'
 import AuthModal from '../components/AuthModal'
+import { clearSession } from '../authSession'
 
 function AdminSettings() {
   const [authToken, setAuthToken] = useState(localStorage.getItem('admin_token'))
@@ -34,7 +35,7 @@ function AdminSettings() {
   }
 
   const handleLogout = () => {
-    localStorage.removeItem('admin_token')
+    clearSession()
     setAuthToken(null)
   }
 
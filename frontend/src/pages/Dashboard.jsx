@@ -3,6 +3,8 @@ import axios from 'axios'
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, PieChart, Pie, Cell, Legend, ComposedChart, Line } from 'recharts'
 import { Truck, Package, AlertTriangle, TrendingUp, X, Plus, Trash2 } from 'lucide-react'
 import { normalizeCategoryResponse, getFallbackCategories } from '../constants/categories'
+import { fetchSchedules } from '../columnarSchedules'
+import { optionalAuthConfig } from '../authSession'
 
 const COLORS = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#ec4899']
 
@@ -29,6 +31,8 @@ function Dashboard() {
   const [editCapacities, setEditCapacities] = useState([])
   const [savingEdit, setSavingEdit] = useState(false)
   const [editError, setEditError] = useState(null)
+  // 400 do servidor: período acima do máximo ou agendamentos demais
+  const [fetchError, setFetchError] = useState(null)
   const [allCategories, setAllCategories] = useState(getFallbackCategories())
 
   const mapProfiles = (rawProfiles) =>
@@ -254,15 +258,17 @@ function Dashboard() {
       if (ufFilter) params.append('uf', ufFilter)
 
       // Busca métricas e agendamentos em paralelo para montar o gráfico de evolução
-      const [metricsRes, schedulesRes] = await Promise.all([
-        axios.get(`/api/dashboard/metrics?${params.toString()}`),
-        axios.get(`/api/schedules?${params.toString()}`)
+      const [metricsRes, schedules] = await Promise.all([
+        axios.get(`/api/dashboard/metrics?${params.toString()}`, optionalAuthConfig()),
+        fetchSchedules(params)
       ])
 
       setMetrics(metricsRes.data)
-      processDailyEvolution(schedulesRes.data, companies)
+      processDailyEvolution(schedules, companies)
+      setFetchError(null)
     } catch (error) {
       console.error('Erro ao buscar métricas:', error)
+      setFetchError(error.response?.data?.detail || 'Erro ao buscar métricas')
     } finally {
       setLoading(false)
     }
@@ -453,60 +459,66 @@ function Dashboard() {
     }
   }
   
-  const formatKgFull = (kg) => {
-    return kg.toLocaleString('pt-BR')
-  }
-
-  const formatUf = (uf) => {
-    const normalized = (uf || '').toString().trim().toUpperCase()
-    if (normalized === 'BAHIA') return 'BA'
-    if (normalized === 'PERNAMBUCO') return 'PE'
-    if (normalized === 'CEARÁ' || normalized === 'CEARA') return 'CE'
-    return uf
-  }
+  const formatKgFull = (kg) => {
+    return kg.toLocaleString('pt-BR')
+  }
+
+  const formatUf = (uf) => {
+    const normalized = (uf || '').toString().trim().toUpperCase()
+    if (normalized === 'BAHIA') return 'BA'
+    if (normalized === 'PERNAMBUCO') return 'PE'
+    if (normalized === 'CEARÁ' || normalized === 'CEARA') return 'CE'
+    return uf
+  }
   
-  if (loading) {
-    return (
-      <div className="flex items-center justify-center h-64">
-        <div className="animate-spin rounded-full h-12 w-12 border-b-2 border-primary-600"></div>
-      </div>
-    )
-  }
-
-  const totalAvailabilityVehicles = metrics?.capacity_by_company?.length
-    ? metrics.capacity_by_company.reduce((sum, item) => sum + (Number(item.vehicles) || 0), 0)
-    : (metrics?.total_vehicles || 0)
-
-  const daysBelowGoal = dailyEvolution.reduce((count, day) => {
-    if (companyFilter) {
-      const realized = Number(day.realizado) || 0
-      const goal = Number(day.meta) || 0
-      return goal > 0 && realized < goal ? count + 1 : count
-    }
-
-    const totals = companies.reduce((acc, company) => {
-      const companyName = company.name
-      const realized = Number(day[companyName]) || 0
-      const goal = Number(day[`meta_${companyName}`]) || 0
-      acc.realized += realized
-      if (goal > 0) {
-        acc.goal += goal
-      }
-      return acc
-    }, { realized: 0, goal: 0 })
-
-    return totals.goal > 0 && totals.realized < totals.goal ? count + 1 : count
-  }, 0)
-  
-  return (
-    <div>
-      <div className="mb-6 sm:mb-8 flex flex-col sm:flex-row sm:items-center sm:justify-between gap-1">
-        <h1 className="text-2xl sm:text-3xl font-bold text-gray-800">Dashboard</h1>
-        <p className="text-gray-500">Visão geral dos agendamentos</p>
-      </div>
-      
-      {/* Filters */}
-      <div className="mb-6 grid grid-cols-1 md:grid-cols-2 lg:grid-cols-5 gap-3 sm:gap-4 bg-white p-3 sm:p-4 rounded-xl shadow-sm border border-gray-100">
+  if (loading) {
+    return (
+      <div className="flex items-center justify-center h-64">
+        <div className="animate-spin rounded-full h-12 w-12 border-b-2 border-primary-600"></div>
+      </div>
+    )
+  }
+
+  const totalAvailabilityVehicles = metrics?.capacity_by_company?.length
+    ? metrics.capacity_by_company.reduce((sum, item) => sum + (Number(item.vehicles) || 0), 0)
+    : (metrics?.total_vehicles || 0)
+
+  const daysBelowGoal = dailyEvolution.reduce((count, day) => {
+    if (companyFilter) {
+      const realized = Number(day.realizado) || 0
+      const goal = Number(day.meta) || 0
+      return goal > 0 && realized < goal ? count + 1 : count
+    }
+
+    const totals = companies.reduce((acc, company) => {
+      const companyName = company.name
+      const realized = Number(day[companyName]) || 0
+      const goal = Number(day[`meta_${companyName}`]) || 0
+      acc.realized += realized
+      if (goal > 0) {
+        acc.goal += goal
+      }
+      return acc
+    }, { realized: 0, goal: 0 })
+
+    return totals.goal > 0 && totals.realized < totals.goal ? count + 1 : count
+  }, 0)
+  
+  return (
+    <div>
+      <div className="mb-6 sm:mb-8 flex flex-col sm:flex-row sm:items-center sm:justify-between gap-1">
+        <h1 className="text-2xl sm:text-3xl font-bold text-gray-800">Dashboard</h1>
+        <p className="text-gray-500">Visão geral dos agendamentos</p>
+      </div>
+      
+      {fetchError && (
+        <div className="mb-6 p-3 bg-red-50 border border-red-200 rounded text-red-700">
+          {fetchError}
+        </div>
+      )}
+
+      {/* Filters */}
+      <div className="mb-6 grid grid-cols-1 md:grid-cols-2 lg:grid-cols-5 gap-3 sm:gap-4 bg-white p-3 sm:p-4 rounded-xl shadow-sm border border-gray-100">
         <div>
           <label className="block text-sm font-medium text-gray-700 mb-1">Empresa</label>
           <select
@@ -571,32 +583,32 @@ function Dashboard() {
       </div>
       
       {/* Cards */}
-      <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4 sm:gap-6 mb-8">
-        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
+      <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4 sm:gap-6 mb-8">
+        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
           <div className="flex items-center gap-4">
             <div className="p-3 bg-blue-100 rounded-lg">
               <Package className="w-6 h-6 text-blue-600" />
             </div>
-            <div>
-              <p className="text-sm text-gray-500">Total Disponibilidade</p>
-              <p className="text-2xl font-bold text-gray-800">{totalAvailabilityVehicles}</p>
-            </div>
-          </div>
-        </div>
+            <div>
+              <p className="text-sm text-gray-500">Total Disponibilidade</p>
+              <p className="text-2xl font-bold text-gray-800">{totalAvailabilityVehicles}</p>
+            </div>
+          </div>
+        </div>
         
-        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
+        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
           <div className="flex items-center gap-4">
             <div className="p-3 bg-green-100 rounded-lg">
               <Truck className="w-6 h-6 text-green-600" />
             </div>
-            <div>
-              <p className="text-sm text-gray-500">Dias abaixo meta</p>
-              <p className="text-2xl font-bold text-gray-800">{daysBelowGoal}</p>
-            </div>
-          </div>
-        </div>
+            <div>
+              <p className="text-sm text-gray-500">Dias abaixo meta</p>
+              <p className="text-2xl font-bold text-gray-800">{daysBelowGoal}</p>
+            </div>
+          </div>
+        </div>
         
-        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
+        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
           <div className="flex items-center gap-4">
             <div className="p-3 bg-red-100 rounded-lg">
               <AlertTriangle className="w-6 h-6 text-red-600" />
@@ -608,7 +620,7 @@ function Dashboard() {
           </div>
         </div>
         
-        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
+        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
           <div className="flex items-center gap-4">
             <div className="p-3 bg-purple-100 rounded-lg">
               <TrendingUp className="w-6 h-6 text-purple-600" />
@@ -622,27 +634,27 @@ function Dashboard() {
       </div>
       
       {/* Charts */}
-      <div className="grid grid-cols-1 lg:grid-cols-2 gap-4 sm:gap-6 mb-8">
-        {/* Capacity by Company */}
-        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
-          <h2 className="text-lg font-semibold text-gray-800 mb-4">Disponibilidade por Empresa</h2>
-          <div className="h-64 overflow-x-auto">
-            <div className="h-full min-w-[560px] lg:min-w-0">
-              <ResponsiveContainer width="100%" height="100%">
-                <BarChart data={metrics?.capacity_by_company || []}>
-                  <CartesianGrid strokeDasharray="3 3" />
-                  <XAxis dataKey="company" />
-                  <YAxis />
-                  <Tooltip />
-                  <Bar dataKey="vehicles" fill="#3b82f6" radius={[4, 4, 0, 0]} />
-                </BarChart>
-              </ResponsiveContainer>
-            </div>
-          </div>
-        </div>
-        
-        {/* Status Distribution */}
-        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
+      <div className="grid grid-cols-1 lg:grid-cols-2 gap-4 sm:gap-6 mb-8">
+        {/* Capacity by Company */}
+        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
+          <h2 className="text-lg font-semibold text-gray-800 mb-4">Disponibilidade por Empresa</h2>
+          <div className="h-64 overflow-x-auto">
+            <div className="h-full min-w-[560px] lg:min-w-0">
+              <ResponsiveContainer width="100%" height="100%">
+                <BarChart data={metrics?.capacity_by_company || []}>
+                  <CartesianGrid strokeDasharray="3 3" />
+                  <XAxis dataKey="company" />
+                  <YAxis />
+                  <Tooltip />
+                  <Bar dataKey="vehicles" fill="#3b82f6" radius={[4, 4, 0, 0]} />
+                </BarChart>
+              </ResponsiveContainer>
+            </div>
+          </div>
+        </div>
+        
+        {/* Status Distribution */}
+        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
           <h2 className="text-lg font-semibold text-gray-800 mb-4">Distribuição por Status</h2>
           <div className="h-64">
             <ResponsiveContainer width="100%" height="100%">
@@ -670,101 +682,101 @@ function Dashboard() {
         </div>
       </div>
       
-      {/* New Chart Row */}
-      <div className="grid grid-cols-1 gap-6 mb-8">
-        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
-          <h2 className="text-lg font-semibold text-gray-800 mb-4">Evolução Diária: Realizado vs. Meta (Veículos)</h2>
-          <div className="h-80 overflow-x-auto">
-            <div className="h-full min-w-[720px] lg:min-w-0">
-              <ResponsiveContainer width="100%" height="100%">
-                <ComposedChart data={dailyEvolution}>
-                  <CartesianGrid strokeDasharray="3 3" />
-                  <XAxis dataKey="displayDate" />
-                  <YAxis />
-                  <Tooltip />
-                  <Legend />
-                  {companyFilter ? (
-                    <>
-                      <Bar dataKey="realizado" fill="#3b82f6" name="Realizado" barSize={20} radius={[4, 4, 0, 0]} />
-                      <Line type="monotone" dataKey="meta" stroke="#10b981" name="Meta Diária" strokeWidth={3} dot={false} legendType="none" />
-                    </>
-                  ) : (
-                    <>
-                      {companies.map((company, index) => (
-                        <Bar key={company.id} dataKey={company.name} fill={COLORS[index % COLORS.length]} name={company.name} radius={[4, 4, 0, 0]} barSize={20} />
-                      ))}
-                      {companies.map((company, index) => (
-                          <Line 
-                              key={`meta-${company.id}`} 
-                              type="monotone" 
-                              dataKey={`meta_${company.name}`} 
-                              stroke={COLORS[index % COLORS.length]} 
-                              name={`Meta ${company.name}`} 
-                              strokeWidth={2} 
-                              dot={false} 
-                              strokeDasharray="5 5"
-                              legendType="none"
-                          />
-                      ))}
-                    </>
-                  )}
-                </ComposedChart>
-              </ResponsiveContainer>
-            </div>
-          </div>
-        </div>
-      </div>
+      {/* New Chart Row */}
+      <div className="grid grid-cols-1 gap-6 mb-8">
+        <div className="bg-white rounded-xl shadow-sm p-4 sm:p-6 border border-gray-100">
+          <h2 className="text-lg font-semibold text-gray-800 mb-4">Evolução Diária: Realizado vs. Meta (Veículos)</h2>
+          <div className="h-80 overflow-x-auto">
+            <div className="h-full min-w-[720px] lg:min-w-0">
+              <ResponsiveContainer width="100%" height="100%">
+                <ComposedChart data={dailyEvolution}>
+                  <CartesianGrid strokeDasharray="3 3" />
+                  <XAxis dataKey="displayDate" />
+                  <YAxis />
+                  <Tooltip />
+                  <Legend />
+                  {companyFilter ? (
+                    <>
+                      <Bar dataKey="realizado" fill="#3b82f6" name="Realizado" barSize={20} radius={[4, 4, 0, 0]} />
+                      <Line type="monotone" dataKey="meta" stroke="#10b981" name="Meta Diária" strokeWidth={3} dot={false} legendType="none" />
+                    </>
+                  ) : (
+                    <>
+                      {companies.map((company, index) => (
+                        <Bar key={company.id} dataKey={company.name} fill={COLORS[index % COLORS.length]} name={company.name} radius={[4, 4, 0, 0]} barSize={20} />
+                      ))}
+                      {companies.map((company, index) => (
+                          <Line 
+                              key={`meta-${company.id}`} 
+                              type="monotone" 
+                              dataKey={`meta_${company.name}`} 
+                              stroke={COLORS[index % COLORS.length]} 
+                              name={`Meta ${company.name}`} 
+                              strokeWidth={2} 
+                              dot={false} 
+                              strokeDasharray="5 5"
+                              legendType="none"
+                          />
+                      ))}
+                    </>
+                  )}
+                </ComposedChart>
+              </ResponsiveContainer>
+            </div>
+          </div>
+        </div>
+      </div>
       
       {/* Recent Schedules */}
-      <div className="bg-white rounded-xl shadow-sm border border-gray-100">
-        <div className="p-4 sm:p-6 border-b border-gray-100">
-          <h2 className="text-lg font-semibold text-gray-800">Agendamentos Recentes</h2>
-        </div>
-        <div className="px-4 pt-3 text-xs text-gray-500 sm:hidden">Arraste a tabela para o lado para ver todos os dados.</div>
-        <div className="overflow-x-auto">
-          <table className="w-full min-w-[640px] sm:min-w-[860px]">
-            <thead>
-              <tr>
-                <th className="px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Data</th>
-                <th className="px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Empresa</th>
-                <th className="px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">UF</th>
-                <th className="px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Veículos</th>
-                <th className="hidden sm:table-cell px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Disponibilidade</th>
-                <th className="px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Status</th>
-                <th className="hidden sm:table-cell px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Ações</th>
-              </tr>
-            </thead>
-            <tbody className="divide-y divide-gray-100">
-              {metrics?.recent_schedules?.map((schedule, rowIndex) => (
-                <tr key={schedule.id} className="hover:bg-gray-50">
-                  <td className="px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm text-gray-800">
-                      {schedule.schedule_date.split('-').reverse().join('/')}
-                      {schedule.updated_at && (
-                        <div className="hidden sm:block text-xs text-gray-400">Atualizado em: {new Date(schedule.updated_at).toLocaleDateString('pt-BR')}</div>
-                      )}
-                  </td>
-                  <td className="px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm font-medium text-gray-800">
-                    {companies.find(c => c.id === schedule.company_id)?.name || `Empresa ${schedule.company_id}`}
-                  </td>
-                  <td className="px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm text-gray-800">
-                    {formatUf(schedule.uf)}
-                  </td>
-                  <td className="px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm text-gray-600">
-                    {schedule.total_vehicles}
-                  </td>
-                  <td className="hidden sm:table-cell px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm text-gray-600">
-                    {formatKgFull(schedule.total_capacity_kg)} kg
-                  </td>
-                  <td className="px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm text-gray-600">
-                    <div className="flex flex-wrap gap-1">
-                      {schedule.categories.map((cat) => (
-                        <span 
-                          key={cat.id}
-                          tabIndex={0}
-                          className={`group relative cursor-help focus:outline-none focus:ring-2 focus:ring-primary-500 px-2 py-1 rounded-full text-xs ${
-                            cat.category_name === 'Perdidas' 
-                              ? 'bg-red-100 text-red-700' 
-                              : cat.category_name === 'Indisponíveis'
+      <div className="bg-white rounded-xl shadow-sm border border-gray-100">
+        <div className="p-4 sm:p-6 border-b border-gray-100">
+          <h2 className="text-lg font-semibold text-gray-800">Agendamentos Recentes</h2>
+        </div>
+        <div className="px-4 pt-3 text-xs text-gray-500 sm:hidden">Arraste a tabela para o lado para ver todos os dados.</div>
+        <div className="overflow-x-auto">
+          <table className="w-full min-w-[640px] sm:min-w-[860px]">
+            <thead>
+              <tr>
+                <th className="px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Data</th>
+                <th className="px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Empresa</th>
+                <th className="px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">UF</th>
+                <th className="px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Veículos</th>
+                <th className="hidden sm:table-cell px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Disponibilidade</th>
+                <th className="px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Status</th>
+                <th className="hidden sm:table-cell px-2 sm:px-6 py-2 sm:py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Ações</th>
+              </tr>
+            </thead>
+            <tbody className="divide-y divide-gray-100">
+              {metrics?.recent_schedules?.map((schedule, rowIndex) => (
+                <tr key={schedule.id} className="hover:bg-gray-50">
+                  <td className="px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm text-gray-800">
+                      {schedule.schedule_date.split('-').reverse().join('/')}
+                      {schedule.updated_at && (
+                        <div className="hidden sm:block text-xs text-gray-400">Atualizado em: {new Date(schedule.updated_at).toLocaleDateString('pt-BR')}</div>
+                      )}
+                  </td>
+                  <td className="px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm font-medium text-gray-800">
+                    {companies.find(c => c.id === schedule.company_id)?.name || `Empresa ${schedule.company_id}`}
+                  </td>
+                  <td className="px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm text-gray-800">
+                    {formatUf(schedule.uf)}
+                  </td>
+                  <td className="px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm text-gray-600">
+                    {schedule.total_vehicles}
+                  </td>
+                  <td className="hidden sm:table-cell px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm text-gray-600">
+                    {formatKgFull(schedule.total_capacity_kg)} kg
+                  </td>
+                  <td className="px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm text-gray-600">
+                    <div className="flex flex-wrap gap-1">
+                      {schedule.categories.map((cat) => (
+                        <span 
+                          key={cat.id}
+                          tabIndex={0}
+                          className={`group relative cursor-help focus:outline-none focus:ring-2 focus:ring-primary-500 px-2 py-1 rounded-full text-xs ${
+                            cat.category_name === 'Perdidas' 
+                              ? 'bg-red-100 text-red-700' 
+                              : cat.category_name === 'Indisponíveis'
                               ? 'bg-amber-100 text-[#f59e0b]'
                               : cat.category_name === 'Spot/Parado'
                               ? 'bg-gray-100 text-gray-700'
@@ -775,19 +787,19 @@ function Dashboard() {
                         >
                           {cat.category_name}: {cat.count}
                           
-                          {/* Tooltip para Indisponíveis */}
-                          {cat.category_name === 'Indisponíveis' && cat.lost_plates && cat.lost_plates.length > 0 && (
-                            <div className={`hidden group-hover:block group-focus:block absolute left-1/2 transform -translate-x-1/2 w-64 bg-white border border-gray-200 shadow-xl rounded-lg p-3 z-50 ${
-                              rowIndex === 0 ? 'top-full mt-2' : 'bottom-full mb-2'
-                            }`}>
-                              {rowIndex === 0 ? (
-                                <div className="absolute bottom-full left-1/2 transform -translate-x-1/2 -mb-1 border-4 border-transparent border-b-white"></div>
-                              ) : (
-                                <div className="absolute top-full left-1/2 transform -translate-x-1/2 -mt-1 border-4 border-transparent border-t-white"></div>
-                              )}
-                              <p className="font-semibold text-gray-700 mb-2 border-b pb-1 text-left">Motivos ({cat.count})</p>
-                              <div className="max-h-48 overflow-y-auto">
-                                {cat.lost_plates.map((plate, idx) => (
+                          {/* Tooltip para Indisponíveis */}
+                          {cat.category_name === 'Indisponíveis' && cat.lost_plates && cat.lost_plates.length > 0 && (
+                            <div className={`hidden group-hover:block group-focus:block absolute left-1/2 transform -translate-x-1/2 w-64 bg-white border border-gray-200 shadow-xl rounded-lg p-3 z-50 ${
+                              rowIndex === 0 ? 'top-full mt-2' : 'bottom-full mb-2'
+                            }`}>
+                              {rowIndex === 0 ? (
+                                <div className="absolute bottom-full left-1/2 transform -translate-x-1/2 -mb-1 border-4 border-transparent border-b-white"></div>
+                              ) : (
+                                <div className="absolute top-full left-1/2 transform -translate-x-1/2 -mt-1 border-4 border-transparent border-t-white"></div>
+                              )}
+                              <p className="font-semibold text-gray-700 mb-2 border-b pb-1 text-left">Motivos ({cat.count})</p>
+                              <div className="max-h-48 overflow-y-auto">
+                                {cat.lost_plates.map((plate, idx) => (
                                   <div key={idx} className="text-left mb-1 last:mb-0 text-xs leading-tight">
                                     <span className="font-bold text-gray-800">{plate.plate_number || 'S/ Placa'}</span>: <span className="text-gray-600 italic">{plate.reason}</span>
                                   </div>
@@ -796,19 +808,19 @@ function Dashboard() {
                             </div>
                           )}
 
-                          {/* Tooltip para Perdidas */}
-                          {cat.category_name === 'Perdidas' && (
-                            <div className={`hidden group-hover:block group-focus:block absolute left-1/2 transform -translate-x-1/2 w-64 bg-white border border-gray-200 shadow-xl rounded-lg p-3 z-50 whitespace-normal ${
-                              rowIndex === 0 ? 'top-full mt-2' : 'bottom-full mb-2'
-                            }`}>
-                              {rowIndex === 0 ? (
-                                <div className="absolute bottom-full left-1/2 transform -translate-x-1/2 -mb-1 border-4 border-transparent border-b-white"></div>
-                              ) : (
-                                <div className="absolute top-full left-1/2 transform -translate-x-1/2 -mt-1 border-4 border-transparent border-t-white"></div>
-                              )}
-                              <div className="text-left text-xs">
-                                <p><span className="font-bold">Perfil:</span> {cat.profile_name || 'N/A'}</p>
-                                <p><span className="font-bold">Qtd:</span> {cat.count}</p>
+                          {/* Tooltip para Perdidas */}
+                          {cat.category_name === 'Perdidas' && (
+                            <div className={`hidden group-hover:block group-focus:block absolute left-1/2 transform -translate-x-1/2 w-64 bg-white border border-gray-200 shadow-xl rounded-lg p-3 z-50 whitespace-normal ${
+                              rowIndex === 0 ? 'top-full mt-2' : 'bottom-full mb-2'
+                            }`}>
+                              {rowIndex === 0 ? (
+                                <div className="absolute bottom-full left-1/2 transform -translate-x-1/2 -mb-1 border-4 border-transparent border-b-white"></div>
+                              ) : (
+                                <div className="absolute top-full left-1/2 transform -translate-x-1/2 -mt-1 border-4 border-transparent border-t-white"></div>
+                              )}
+                              <div className="text-left text-xs">
+                                <p><span className="font-bold">Perfil:</span> {cat.profile_name || 'N/A'}</p>
+                                <p><span className="font-bold">Qtd:</span> {cat.count}</p>
                                 <p><span className="font-bold">Placa:</span> {cat.lost_plates?.[0]?.plate_number || 'N/A'}</p>
                                 <p><span className="font-bold">Motivo:</span> {cat.lost_plates?.[0]?.reason || 'N/A'}</p>
                               </div>
@@ -818,10 +830,10 @@ function Dashboard() {
                       ))}
                     </div>
                   </td>
-                  <td className="hidden sm:table-cell px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm text-gray-600">
-                    {isAdmin && (
-                      <button
-                        onClick={() => openEditModal(schedule)}
+                  <td className="hidden sm:table-cell px-2 sm:px-6 py-2 sm:py-4 whitespace-nowrap text-sm text-gray-600">
+                    {isAdmin && (
+                      <button
+                        onClick={() => openEditModal(schedule)}
                         className="px-3 py-1 bg-primary-600 text-white rounded text-sm"
                       >
                         Editar
@@ -830,20 +842,20 @@ function Dashboard() {
                   </td>
                 </tr>
               ))}
-              {(!metrics?.recent_schedules || metrics.recent_schedules.length === 0) && (
-                <>
-                  <tr className="sm:hidden">
-                    <td colSpan="5" className="px-2 py-8 text-center text-gray-500">
-                      Nenhum agendamento encontrado
-                    </td>
-                  </tr>
-                  <tr className="hidden sm:table-row">
-                    <td colSpan="7" className="px-6 py-8 text-center text-gray-500">
-                      Nenhum agendamento encontrado
-                    </td>
-                  </tr>
-                </>
-              )}
+              {(!metrics?.recent_schedules || metrics.recent_schedules.length === 0) && (
+                <>
+                  <tr className="sm:hidden">
+                    <td colSpan="5" className="px-2 py-8 text-center text-gray-500">
+                      Nenhum agendamento encontrado
+                    </td>
+                  </tr>
+                  <tr className="hidden sm:table-row">
+                    <td colSpan="7" className="px-6 py-8 text-center text-gray-500">
+                      Nenhum agendamento encontrado
+                    </td>
+                  </tr>
+                </>
+              )}
             </tbody>
           </table>
         </div>
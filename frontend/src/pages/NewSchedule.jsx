@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react'
 import axios from 'axios'
 import { Plus, Trash2, Save, LogOut } from 'lucide-react'
 import AuthModal from '../components/AuthModal'
+import { clearSession } from '../authSession'
 import Toast from '../components/Toast'
 import {
   buildCategoryState,
@@ -73,7 +74,7 @@ function NewSchedule() {
   }
 
   const handleLogout = () => {
-    localStorage.removeItem('admin_token')
+    clearSession()
     setAuthToken(null)
   }
 
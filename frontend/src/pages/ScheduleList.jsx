@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react'
 import axios from 'axios'
 import { FileDown, Filter, X, Plus, Trash2 } from 'lucide-react'
 import { normalizeCategoryResponse, getFallbackCategories } from '../constants/categories'
+import { fetchSchedules as fetchSchedulesColumnar } from '../columnarSchedules'
 
 function ScheduleList() {
   const [schedules, setSchedules] = useState([])
@@ -28,6 +29,8 @@ function ScheduleList() {
   const [editCapacities, setEditCapacities] = useState([])
   const [savingEdit, setSavingEdit] = useState(false)
   const [editError, setEditError] = useState(null)
+  // 400 do servidor: período acima do máximo ou agendamentos demais
+  const [fetchError, setFetchError] = useState(null)
   const [allCategories, setAllCategories] = useState(getFallbackCategories())
 
   const mapProfiles = (rawProfiles) =>
@@ -220,25 +223,24 @@ function ScheduleList() {
   const fetchSchedules = async (filters = {}) => {
     try {
       setLoading(true)
-      let url = '/api/schedules'
-      const params = []
+      const params = {}
 
       const selectedCompanyFilter = filters.companyFilter ?? companyFilter
       const selectedUfFilter = filters.ufFilter ?? ufFilter
       const selectedStartDate = filters.startDate ?? startDate
       const selectedEndDate = filters.endDate ?? endDate
       
-      if (selectedCompanyFilter) params.push(`company_id=${selectedCompanyFilter}`)
-      if (selectedUfFilter) params.push(`uf=${selectedUfFilter}`)
-      if (selectedStartDate) params.push(`start_date=${selectedStartDate}`)
-      if (selectedEndDate) params.push(`end_date=${selectedEndDate}`)
+      if (selectedCompanyFilter) params.company_id = selectedCompanyFilter
+      if (selectedUfFilter) params.uf = selectedUfFilter
+      if (selectedStartDate) params.start_date = selectedStartDate
+      if (selectedEndDate) params.end_date = selectedEndDate
       
-      if (params.length > 0) url += '?' + params.join('&')
-      
-      const response = await axios.get(url)
-      setSchedules(response.data)
+      // formato colunar: payload bem menor em períodos longos
+      setSchedules(await fetchSchedulesColumnar(params))
+      setFetchError(null)
     } catch (err) {
       console.error('Erro ao buscar agendamentos:', err)
+      setFetchError(err.response?.data?.detail || 'Erro ao buscar agendamentos')
     } finally {
       setLoading(false)
     }
@@ -466,6 +468,12 @@ function ScheduleList() {
         </div>
       </div>
       
+      {fetchError && (
+        <div className="mb-6 p-3 bg-red-50 border border-red-200 rounded text-red-700">
+          {fetchError}
+        </div>
+      )}
+
       {/* Filters */}
       <div className={`${showFilters ? 'block' : 'hidden md:block'} bg-white rounded-xl shadow-sm border border-gray-100 p-4 sm:p-6 mb-6`}>
           <form onSubmit={handleFilter} className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-5 gap-3 sm:gap-4 items-end">